@@ -3,6 +3,7 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 import chat.routing
+import sharehub.routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PeerLending.settings')
 
@@ -14,7 +15,7 @@ application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
         URLRouter(
-            chat.routing.websocket_urlpatterns
+            chat.routing.websocket_urlpatterns + sharehub.routing.websocket_urlpatterns
         )
     ),
 })
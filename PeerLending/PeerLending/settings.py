@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 import dj_database_url
 from dotenv import load_dotenv
 
@@ -27,6 +28,8 @@ load_dotenv(os.path.join(BASE_DIR, '.env'))
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get("SECRET_KEY", "fallback-secret-key")
 DEBUG = os.environ.get("DEBUG", "False").lower() in ("true", "1", "yes")
+# `manage.py test`: defaults below switch to what the test suite needs
+TESTING = len(sys.argv) > 1 and sys.argv[1] == "test"
 
 # Hosts and CSRF
 ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "127.0.0.1,localhost").split(",")
@@ -53,13 +56,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [ 
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'sharehub.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'sharehub.instrumentation.SupabaseCallsMiddleware',
 ]
 
 ROOT_URLCONF = 'PeerLending.urls'
@@ -88,13 +92,39 @@ ASGI_APPLICATION = 'PeerLending.asgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+#
+# Connections are kept open between requests (DB_CONN_MAX_AGE seconds, 0 closes
+# them after every request) and checked before reuse when DB_CONN_HEALTH_CHECKS
+# is on, so a request doesn't pay a fresh TLS handshake to Postgres.
+# Persistent connections belong to a thread; under ASGI (daphne) requests run
+# on short-lived threads, so use DB_POOL there instead: psycopg 3's connection
+# pool (pip install "psycopg[pool]") shared by all threads of the process.
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3')  # fallback to SQLite if DATABASE_URL is not found
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+DB_CONN_HEALTH_CHECKS = os.getenv("DB_CONN_HEALTH_CHECKS", "True").lower() in ("true", "1", "yes")
+DB_POOL = os.getenv("DB_POOL", "False").lower() in ("true", "1", "yes")
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Fill the connection pool (DB_POOL) when a worker process starts serving --
+# at its first request, usually the /healthz/ready/ probe -- instead of one
+# connection at a time under the first burst of traffic (sharehub/health.py).
+DB_WARM_ON_STARTUP = os.getenv("DB_WARM_ON_STARTUP", "True").lower() in ("true", "1", "yes")
+
 DATABASES = {
     'default': dj_database_url.config(
-        default=os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3'),  # fallback to SQLite if DATABASE_URL is not found
-        conn_max_age=0, 
-        ssl_require=True    # Enforce SSL for secure connection
+        default=DATABASE_URL,
+        conn_max_age=0 if DB_POOL else DB_CONN_MAX_AGE,  # pooled connections go back to the pool after each request
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        ssl_require=not DATABASE_URL.startswith('sqlite'),  # Enforce SSL for secure connection (SQLite has no sslmode)
     )
 }
+if DB_POOL:
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': DB_POOL_MIN_SIZE,
+        'max_size': DB_POOL_MAX_SIZE,
+        'timeout': DB_POOL_TIMEOUT,
+    }
 
 # Channels / Channel layer
 # We'll use Redis in production (recommended). For local dev you may use InMemoryChannelLayer by
@@ -110,6 +140,65 @@ CHANNEL_LAYERS = {
     },
 }
 
+# chat_heads uses the chat_heads() SQL function (chat/sql/chat_heads.sql) when
+# it is deployed; set to False to always use the batched PostgREST queries.
+CHAT_HEADS_USE_RPC = os.getenv("CHAT_HEADS_USE_RPC", "True").lower() in ("true", "1", "yes")
+
+# get_messages returns at most this many messages per page (?limit= is capped
+# at CHAT_MESSAGES_MAX_PAGE_SIZE); older/newer pages use ?before= / ?after=.
+CHAT_MESSAGES_PAGE_SIZE = int(os.getenv("CHAT_MESSAGES_PAGE_SIZE", "50"))
+CHAT_MESSAGES_MAX_PAGE_SIZE = int(os.getenv("CHAT_MESSAGES_MAX_PAGE_SIZE", "200"))
+
+# unread_count reads the trigger-maintained chat_unread table
+# (chat/sql/chat_unread.sql); set to False to always count messages instead.
+CHAT_UNREAD_USE_COUNTERS = os.getenv("CHAT_UNREAD_USE_COUNTERS", "True").lower() in ("true", "1", "yes")
+
+# Caches
+# "profiles" holds rows of the Supabase `user` table (see sharehub/profiles.py).
+# It is a per-process LRU by default; set PROFILE_CACHE_BACKEND=redis to share it
+# between workers through REDIS_URL.
+PROFILE_CACHE_BACKEND = os.getenv("PROFILE_CACHE_BACKEND", "locmem").lower()
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", "300"))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "profiles": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+        if PROFILE_CACHE_BACKEND == "redis"
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "sharehub-profiles",
+            "OPTIONS": {"MAX_ENTRIES": int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "5000"))},
+        }
+    ),
+    # used by SESSION_BACKEND="cache"; short timeouts so a Redis outage falls back to the database quickly
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "OPTIONS": {"socket_connect_timeout": 0.5, "socket_timeout": 0.5},
+    },
+}
+
+# Sessions hold supabase_user_id, is_admin, user_email and the Supabase tokens,
+# and are read on every signed-in request. SESSION_BACKEND picks where they live:
+#   "db"             -- the django_session table (a query per request)
+#   "cache"          -- Redis (REDIS_URL), written through to the database, which
+#                       also serves them while Redis is unreachable (sharehub/sessions.py)
+#   "signed_cookies" -- the cookie itself, signed with SECRET_KEY: nothing stored
+#                       server-side, but logout can't revoke a copied cookie and the
+#                       tokens are readable (not forgeable) by the browser
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "db").lower()
+SESSION_ENGINE = {
+    "cache": "sharehub.sessions",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}.get(SESSION_BACKEND, "django.contrib.sessions.backends.db")
+SESSION_CACHE_ALIAS = "sessions"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -152,4 +241,93 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-SUPABASE_RESET_REDIRECT = os.getenv("SUPABASE_RESET_REDIRECT", "http://127.0.0.1:8000/reset-password")
\ No newline at end of file
+SUPABASE_RESET_REDIRECT = os.getenv("SUPABASE_RESET_REDIRECT", "http://127.0.0.1:8000/reset-password")
+
+# Local verification of the access tokens kept in the session (sharehub/auth_tokens.py).
+# SUPABASE_JWT_SECRET is the project's legacy HS256 secret; projects on asymmetric
+# signing keys need none and are verified against the cached JWKS instead.
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+SUPABASE_JWKS_CACHE_SECONDS = int(os.getenv("SUPABASE_JWKS_CACHE_SECONDS", "600"))
+SUPABASE_TOKEN_REFRESH_MARGIN = int(os.getenv("SUPABASE_TOKEN_REFRESH_MARGIN", "60"))
+
+# Offline stand-in for Supabase (sharehub/fake_supabase.py): set SUPABASE_FAKE_DB
+# to a SQLite path (or ":memory:") and every client talks to it instead. The
+# test suite always runs against it, in memory unless told otherwise.
+SUPABASE_FAKE_DB = os.getenv("SUPABASE_FAKE_DB", ":memory:" if TESTING else "")
+SUPABASE_FAKE_LATENCY_MS = float(os.getenv("SUPABASE_FAKE_LATENCY_MS", "0"))
+SUPABASE_FAKE_JITTER_MS = float(os.getenv("SUPABASE_FAKE_JITTER_MS", "0"))
+if SUPABASE_FAKE_DB:
+    SUPABASE_URL = SUPABASE_URL or "http://supabase.fake"
+    SUPABASE_KEY = SUPABASE_KEY or "fake-anon-key"
+    SUPABASE_ANON_KEY = SUPABASE_ANON_KEY or SUPABASE_KEY
+    SUPABASE_SERVICE_ROLE_KEY = SUPABASE_SERVICE_ROLE_KEY or "fake-service-role-key"
+    SUPABASE_JWT_SECRET = SUPABASE_JWT_SECRET or "sharehub-fake-supabase"
+
+# Shared keep-alive pool used by every client handed out by sharehub.supabase_client
+SUPABASE_POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "20"))
+SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "10"))
+SUPABASE_POOL_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "10"))
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "False").lower() in ("true", "1", "yes")
+SUPABASE_USER_CLIENT_CACHE_SIZE = int(os.getenv("SUPABASE_USER_CLIENT_CACHE_SIZE", "256"))
+
+# Worker threads that sharehub.query_plan uses to run independent Supabase
+# queries of one view concurrently; 0 runs them one after another.
+QUERY_PLAN_MAX_WORKERS = int(os.getenv("QUERY_PLAN_MAX_WORKERS", "8"))
+
+# Serve home, borrow_items and the chat API from their async versions
+# (sharehub/async_views.py, chat/async_views.py) -- for daphne/ASGI deployments.
+# Both sets stay reachable: the async ones are always mounted under /async/.
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "False").lower() in ("true", "1", "yes")
+
+# Admin dashboard numbers (sharehub/admin_stats.py): computed by the admin_stats()
+# SQL function when deployed and cached as a snapshot for this many seconds.
+ADMIN_STATS_USE_RPC = os.getenv("ADMIN_STATS_USE_RPC", "True").lower() in ("true", "1", "yes")
+ADMIN_STATS_REFRESH_SECONDS = int(os.getenv("ADMIN_STATS_REFRESH_SECONDS", "60"))
+
+# borrow_items shows CATALOG_PAGE_SIZE items and loads more from /api/catalog/
+# while scrolling (?limit= is capped at CATALOG_MAX_PAGE_SIZE).
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "24"))
+CATALOG_MAX_PAGE_SIZE = int(os.getenv("CATALOG_MAX_PAGE_SIZE", "100"))
+
+# Item search (sharehub/search.py): the search_items() SQL function when
+# deployed, else an in-process index rebuilt every SEARCH_INDEX_TTL seconds.
+SEARCH_USE_RPC = os.getenv("SEARCH_USE_RPC", "True").lower() in ("true", "1", "yes")
+SEARCH_INDEX_TTL = int(os.getenv("SEARCH_INDEX_TTL", "300"))
+
+# Search-box suggestions (sharehub/typeahead.py): an in-process index of item
+# titles and categories, patched on every item change and rebuilt from Supabase
+# every TYPEAHEAD_REBUILD_SECONDS to pick up changes made by other processes.
+TYPEAHEAD_REBUILD_SECONDS = int(os.getenv("TYPEAHEAD_REBUILD_SECONDS", "900"))
+
+# Item photos are stored as thumb/card/full variants (sharehub/images.py) in
+# ITEM_IMAGE_FORMAT ("webp", or "jpeg" for older clients) at ITEM_IMAGE_QUALITY.
+ITEM_IMAGE_FORMAT = os.getenv("ITEM_IMAGE_FORMAT", "webp")
+ITEM_IMAGE_QUALITY = int(os.getenv("ITEM_IMAGE_QUALITY", "80"))
+
+# Uploads (sharehub/uploads.py): every file field is an image; files are
+# type-checked from their first bytes, rejected past UPLOAD_MAX_BYTES and kept
+# in memory only up to FILE_UPLOAD_MAX_MEMORY_SIZE before spilling to disk.
+FILE_UPLOAD_HANDLERS = ["sharehub.uploads.BoundedImageUploadHandler"]
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv("FILE_UPLOAD_MAX_MEMORY_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+
+# Background jobs (sharehub/jobs.py, worker: manage.py run_jobs). Jobs are queued
+# in Redis (REDIS_URL), or the sharehub_job table when Redis is unreachable or
+# JOBS_BACKEND="db". JOBS_EAGER runs them inline instead, so DEBUG setups need
+# no worker.
+JOBS_BACKEND = os.getenv("JOBS_BACKEND", "redis").lower()
+JOBS_EAGER = os.getenv("JOBS_EAGER", str(DEBUG)).lower() in ("true", "1", "yes")
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "5"))
+JOBS_RETRY_BASE_SECONDS = int(os.getenv("JOBS_RETRY_BASE_SECONDS", "5"))
+
+# Loan due/overdue scanning (sharehub/overdue.py, manage.py scan_overdue)
+OVERDUE_SCAN_INTERVAL = int(os.getenv("OVERDUE_SCAN_INTERVAL", "300"))
+OVERDUE_DUE_SOON_HOURS = int(os.getenv("OVERDUE_DUE_SOON_HOURS", "24"))
+OVERDUE_USE_RPC = os.getenv("OVERDUE_USE_RPC", "true").lower() in ("true", "1", "yes")
+OVERDUE_USE_PRECOMPUTED = os.getenv("OVERDUE_USE_PRECOMPUTED", "true").lower() in ("true", "1", "yes")
+
+# Supabase call accounting (sharehub/instrumentation.py)
+SUPABASE_INSTRUMENTATION = os.getenv("SUPABASE_INSTRUMENTATION", "true").lower() in ("true", "1", "yes")
+SUPABASE_SERVER_TIMING = os.getenv("SUPABASE_SERVER_TIMING", str(DEBUG)).lower() in ("true", "1", "yes")
+SUPABASE_QUERY_BUDGET_STRICT = os.getenv("SUPABASE_QUERY_BUDGET_STRICT", str(TESTING)).lower() in ("true", "1", "yes")
\ No newline at end of file
@@ -0,0 +1,206 @@
+# PeerLending/chat/async_views.py
+"""
+Async versions of the chat API views, for ASGI deployments (daphne).
+
+They answer exactly like their counterparts in chat/views.py -- same URLs,
+JSON and fallbacks -- but run on the event loop with the async PostgREST
+client, and issue independent queries together with asyncio.gather instead of
+one after another. Which set serves the chat URLs is chosen by ASYNC_VIEWS
+(see chat/urls.py); both are always reachable, the async ones under /async/.
+"""
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from django.http import HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_POST
+
+from sharehub.instrumentation import query_budget
+from sharehub.supabase_client import get_async_service_client
+
+from . import views
+from .realtime import abroadcast_message
+from .views import (
+    _assemble_heads,
+    _heads_conversations_query,
+    _heads_participants_query,
+    _heads_profiles_query,
+    _heads_unread_query,
+    _other_participants,
+    _page_size,
+    inserted_message,
+    message_cursor,
+    message_insert_query,
+    messages_page,
+    messages_page_query,
+    participant_ids,
+    participants_query,
+    supabase_login_required,
+    unread_ids,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def _conversation_ids(client, user_id):
+    parts = await client.from_("conversation_participants").select("conversation_id").eq("user_id", user_id).execute()
+    return [p.get("conversation_id") for p in (getattr(parts, "data", None) or []) if p.get("conversation_id")]
+
+
+async def _achat_heads_batched(client, user_id):
+    conv_ids = await _conversation_ids(client, user_id)
+    if not conv_ids:
+        return []
+
+    convs_resp, all_parts, unread_resp = await asyncio.gather(
+        _heads_conversations_query(client, conv_ids).execute(),
+        _heads_participants_query(client, conv_ids).execute(),
+        _heads_unread_query(client, user_id, conv_ids).execute(),
+    )
+    other_by_conv = _other_participants(user_id, getattr(all_parts, "data", None))
+
+    profiles = {}
+    other_ids = sorted(set(other_by_conv.values()))
+    if other_ids:
+        users_resp = await _heads_profiles_query(client, other_ids).execute()
+        profiles = {u.get("id"): u for u in (getattr(users_resp, "data", None) or [])}
+
+    return _assemble_heads(getattr(convs_resp, "data", []) or [], other_by_conv,
+                           getattr(unread_resp, "data", None), profiles)
+
+
+async def afetch_chat_heads(client, user_id):
+    """fetch_chat_heads() on an async client; shares its "RPC missing" flag."""
+    if views._chat_heads_rpc_feature.available and getattr(settings, "CHAT_HEADS_USE_RPC", True):
+        try:
+            resp = await client.rpc("chat_heads", {"p_user_id": user_id}).execute()
+            return getattr(resp, "data", None) or []
+        except Exception as e:
+            views._chat_heads_rpc_feature.failed(e)
+    return await _achat_heads_batched(client, user_id)
+
+
+async def afetch_unread_total(client, user_id):
+    """fetch_unread_total() on an async client."""
+    if views._unread_counters_feature.available and getattr(settings, "CHAT_UNREAD_USE_COUNTERS", True):
+        try:
+            resp = await client.from_("chat_unread").select("unread").eq("user_id", user_id).gt("unread", 0).execute()
+            return sum(int(r.get("unread") or 0) for r in (getattr(resp, "data", None) or []))
+        except Exception as e:
+            views._unread_counters_feature.failed(e)
+
+    conv_ids = await _conversation_ids(client, user_id)
+    if not conv_ids:
+        return 0
+    resp = await (
+        client.from_("messages")
+        .select("id", count="exact", head=True)
+        .in_("conversation_id", conv_ids)
+        .eq("is_read", False)
+        .neq("sender_id", user_id)
+        .execute()
+    )
+    return getattr(resp, "count", None) or 0
+
+
+async def asave_message(client, conversation_id, sender_id, content):
+    """save_message() on an async client."""
+    return inserted_message(await message_insert_query(client, conversation_id, sender_id, content).execute())
+
+
+async def _is_participant(client, conversation_id, user_id):
+    check = await client.from_("conversation_participants").select("user_id") \
+        .eq("conversation_id", conversation_id).eq("user_id", user_id).maybe_single().execute()
+    return bool(check and not getattr(check, "error", None) and getattr(check, "data", None))
+
+
+@query_budget(8)
+@supabase_login_required
+async def chat_heads(request):
+    user_id = await request.session.aget("supabase_user_id")
+    client = get_async_service_client()
+    if client is None:
+        logger.error("chat_heads: server_client (service role) not configured.")
+        return JsonResponse({"error": "Server chat unavailable (missing service role key)."}, status=500)
+
+    try:
+        return JsonResponse({"results": await afetch_chat_heads(client, user_id)})
+    except Exception as e:
+        logger.exception("chat_heads: unexpected error: %s", e)
+        return JsonResponse({"error": "Internal server error while fetching chat heads."}, status=500)
+
+
+@supabase_login_required
+async def unread_count(request):
+    user_id = await request.session.aget("supabase_user_id")
+    try:
+        return JsonResponse({"unread": await afetch_unread_total(get_async_service_client(), user_id)})
+    except Exception as e:
+        logger.exception("unread_count error: %s", e)
+        return JsonResponse({"unread": 0})
+
+
+@supabase_login_required
+async def get_messages(request, conversation_id):
+    user_id = await request.session.aget("supabase_user_id")
+    client = get_async_service_client()
+    # checked before anything is read: the service-role client bypasses RLS
+    if not await _is_participant(client, conversation_id, user_id):
+        return HttpResponseForbidden("No access")
+
+    before = request.GET.get("before")
+    after = request.GET.get("after")
+    if before and after:
+        return JsonResponse({"error": "Use either before or after, not both"}, status=400)
+    limit = _page_size(request.GET.get("limit"))
+    try:
+        page_query = messages_page_query(client, conversation_id, limit, before=before, after=after)
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+    page = await page_query.execute()
+    msgs, has_more = messages_page(getattr(page, "data", None) or [], limit, after)
+
+    # best-effort mark as read, only for what this page delivered
+    ids = unread_ids(user_id, msgs)
+    if ids:
+        try:
+            await client.from_("messages").update({"is_read": True}).in_("id", ids).execute()
+        except Exception as e:
+            logger.warning("get_messages: mark read failed for %s: %s", conversation_id, e)
+
+    return JsonResponse({
+        "results": msgs,
+        "has_more": has_more,
+        "prev_cursor": message_cursor(msgs[0]) if msgs else before,
+        "next_cursor": message_cursor(msgs[-1]) if msgs else after,
+    })
+
+
+@require_POST
+@supabase_login_required
+async def post_message(request, conversation_id):
+    user_id = await request.session.aget("supabase_user_id")
+    try:
+        payload = json.loads(request.body.decode("utf-8")) if request.body else {}
+    except Exception:
+        payload = {}
+
+    content = payload.get("content") or request.POST.get("content")
+    if not content:
+        return JsonResponse({"error": "Empty message"}, status=400)
+
+    client = get_async_service_client()
+    participants = participant_ids(await participants_query(client, conversation_id).execute())
+    if user_id not in participants:
+        return HttpResponseForbidden("No access")
+
+    try:
+        message = await asave_message(client, conversation_id, user_id, content)
+    except Exception as e:
+        logger.exception("post_message: %s", e)
+        return JsonResponse({"error": "Insert failed"}, status=500)
+
+    await abroadcast_message(message, participants)
+    return JsonResponse({"success": True, "message": message})
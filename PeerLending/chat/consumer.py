@@ -1,15 +1,98 @@
 # chat/consumers.py
+"""
+WebSocket endpoints:
+
+    ws/chat/                     per-user socket: head/unread updates only
+    ws/chat/<conversation_id>/   also joins the conversation and can send
+
+Client -> server:  {"type": "message", "content": "..."}
+Server -> client:  {"type": "message", "message": {...row...}}
+                   {"type": "head", "conversation_id", "sender_id", "last_message", "last_at"}
+                   {"type": "error", "error": "..."}
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
+from sharehub.supabase_client import get_service_client
+
+from .realtime import abroadcast_message, conversation_group, user_group
+from .views import conversation_participant_ids, save_message
+
+logger = logging.getLogger(__name__)
+
+
 class ChatConsumer(AsyncJsonWebsocketConsumer):
     async def connect(self):
-        # Optionally join a group for the conversation here
+        self.user_id = await self._session_user_id()
+        self.conversation_id = self.scope["url_route"]["kwargs"].get("conversation_id")
+        self.participants = []
+        self.joined = []
+
+        client = get_service_client()
+        if not self.user_id or not client:
+            await self.close(code=4401)
+            return
+
+        groups = [user_group(self.user_id)]
+        if self.conversation_id:
+            try:
+                self.participants = await sync_to_async(conversation_participant_ids)(client, self.conversation_id)
+            except Exception as e:
+                logger.warning("ChatConsumer: participant lookup failed for %s: %s", self.conversation_id, e)
+                self.participants = []
+            if self.user_id not in self.participants:
+                await self.close(code=4403)
+                return
+            groups.append(conversation_group(self.conversation_id))
+
+        for group in groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.joined = groups
         await self.accept()
 
     async def disconnect(self, close_code):
-        # Clean up group membership if used
-        pass
+        for group in getattr(self, "joined", []):
+            await self.channel_layer.group_discard(group, self.channel_name)
 
     async def receive_json(self, content, **kwargs):
-        # Basic echo handler — replace with your message broadcast/DB logic
-        await self.send_json({"received": content})
+        if content.get("type") != "message" or not self.conversation_id:
+            await self.send_json({"type": "error", "error": "Unsupported message"})
+            return
+
+        text = (content.get("content") or "").strip()
+        if not text:
+            await self.send_json({"type": "error", "error": "Empty message"})
+            return
+
+        try:
+            message = await sync_to_async(save_message)(
+                get_service_client(), self.conversation_id, self.user_id, text
+            )
+        except Exception as e:
+            logger.exception("ChatConsumer: failed to save message: %s", e)
+            await self.send_json({"type": "error", "error": "Insert failed"})
+            return
+
+        await abroadcast_message(message, self.participants)
+
+    # --- channel layer events ---
+
+    async def chat_message(self, event):
+        await self.send_json({"type": "message", "message": event["message"]})
+
+    async def chat_head(self, event):
+        await self.send_json({
+            "type": "head",
+            "conversation_id": event.get("conversation_id"),
+            "sender_id": event.get("sender_id"),
+            "last_message": event.get("last_message"),
+            "last_at": event.get("last_at"),
+        })
+
+    @database_sync_to_async
+    def _session_user_id(self):
+        session = self.scope.get("session")
+        return session.get("supabase_user_id") if session is not None else None
@@ -0,0 +1,167 @@
+"""
+python manage.py bench_chat_heads [--sizes 1 10 30 100]
+
+Runs chat.views.fetch_chat_heads against an in-memory stand-in for the
+PostgREST client and prints how many calls it made for users with a growing
+number of conversations. The count must stay flat; the old per-conversation
+loop needed 4-8 calls per conversation.
+"""
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+from postgrest.exceptions import APIError
+
+from chat import views as chat_views
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.embeds = []
+        self.filters = []
+        self.order_by = None
+        self.limit_to = None
+        self.embed_order = {}
+        self.embed_limit = {}
+
+    def select(self, columns, **kwargs):
+        for part in columns.split(","):
+            part = part.strip()
+            if "(" in part:
+                self.embeds.append(part.split("(", 1)[0].strip())
+        return self
+
+    def eq(self, col, val):
+        self.filters.append(lambda r: r.get(col) == val)
+        return self
+
+    def neq(self, col, val):
+        self.filters.append(lambda r: r.get(col) != val)
+        return self
+
+    def in_(self, col, vals):
+        vals = set(vals)
+        self.filters.append(lambda r: r.get(col) in vals)
+        return self
+
+    def order(self, col, desc=False, foreign_table=None):
+        if foreign_table:
+            self.embed_order[foreign_table] = (col, desc)
+        else:
+            self.order_by = (col, desc)
+        return self
+
+    def limit(self, n, foreign_table=None):
+        if foreign_table:
+            self.embed_limit[foreign_table] = n
+        else:
+            self.limit_to = n
+        return self
+
+    def execute(self):
+        self.db.calls += 1
+        rows = [dict(r) for r in self.db.tables.get(self.table, []) if all(f(r) for f in self.filters)]
+        if self.order_by:
+            col, desc = self.order_by
+            rows.sort(key=lambda r: r.get(col) or "", reverse=desc)
+        if self.limit_to is not None:
+            rows = rows[:self.limit_to]
+        for child in self.embeds:
+            col, desc = self.embed_order.get(child, ("created_at", False))
+            for r in rows:
+                kids = [k for k in self.db.tables.get(child, []) if k.get("conversation_id") == r.get("id")]
+                kids.sort(key=lambda k: k.get(col) or "", reverse=desc)
+                r[child] = kids[:self.embed_limit.get(child, len(kids))]
+        return _Result(rows)
+
+
+class _MissingFunction:
+    def __init__(self, db, fn):
+        self.db = db
+        self.fn = fn
+
+    def execute(self):
+        # what PostgREST answers when the function isn't in the schema
+        self.db.calls += 1
+        raise APIError({
+            "code": "PGRST202",
+            "message": f"Could not find the function public.{self.fn} in the schema cache",
+            "hint": None,
+            "details": None,
+        })
+
+
+class _CountingClient:
+    """Just enough of the supabase client for fetch_chat_heads."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.calls = 0
+
+    def from_(self, table):
+        return _Query(self, table)
+
+    table = from_
+
+    def rpc(self, fn, params):
+        return _MissingFunction(self, fn)
+
+
+def _dataset(user_id, conversations, messages_per_conversation=5):
+    now = datetime.now(timezone.utc)
+    tables = {"user": [{"id": user_id, "first_name": "Bench", "last_name": "User", "email": "bench@example.com"}],
+              "conversations": [], "conversation_participants": [], "messages": []}
+    for i in range(conversations):
+        conv_id = str(uuid.uuid4())
+        other_id = str(uuid.uuid4())
+        tables["user"].append({"id": other_id, "first_name": f"Peer{i}", "last_name": "", "email": f"peer{i}@example.com"})
+        tables["conversations"].append({"id": conv_id, "item_id": str(uuid.uuid4()), "item_title": f"Item {i}"})
+        tables["conversation_participants"] += [
+            {"conversation_id": conv_id, "user_id": user_id},
+            {"conversation_id": conv_id, "user_id": other_id},
+        ]
+        for j in range(messages_per_conversation):
+            tables["messages"].append({
+                "id": str(uuid.uuid4()),
+                "conversation_id": conv_id,
+                "sender_id": other_id if j % 2 else user_id,
+                "content": f"message {j}",
+                "is_read": j < 3,
+                "created_at": (now - timedelta(minutes=i * 10 + j)).isoformat(),
+            })
+    return tables
+
+
+class Command(BaseCommand):
+    help = "Show that chat_heads makes a constant number of PostgREST calls."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1, 10, 30, 100])
+
+    def handle(self, *args, **options):
+        user_id = str(uuid.uuid4())
+        counts = set()
+        self.stdout.write(f"{'conversations':>14} {'calls':>6} {'ms':>8}")
+        for size in options["sizes"]:
+            client = _CountingClient(_dataset(user_id, size))
+            # the stand-in has no SQL functions, so measure the batched path
+            chat_views._chat_heads_rpc_feature.disable()
+            start = time.perf_counter()
+            heads = chat_views.fetch_chat_heads(client, user_id)
+            elapsed = (time.perf_counter() - start) * 1000
+            assert len(heads) == size
+            counts.add(client.calls)
+            self.stdout.write(f"{size:>14} {client.calls:>6} {elapsed:>8.2f}")
+
+        if len(counts) == 1:
+            self.stdout.write(self.style.SUCCESS("Call count is constant in the number of conversations."))
+        else:
+            self.stdout.write(self.style.ERROR(f"Call count varies with conversation count: {sorted(counts)}"))
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from django.db import migrations
+
+SQL_FILE = Path(__file__).resolve().parent.parent / "sql" / "chat_heads.sql"
+
+
+def create_chat_heads(apps, schema_editor):
+    # The Supabase tables only exist on PostgreSQL; SQLite dev databases
+    # fall back to the batched queries in chat.views.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(SQL_FILE.read_text())
+
+
+def drop_chat_heads(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("drop function if exists public.chat_heads(uuid);")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_chat_heads, drop_chat_heads),
+    ]
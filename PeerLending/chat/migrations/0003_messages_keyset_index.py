@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from django.db import migrations
+
+SQL_FILE = Path(__file__).resolve().parent.parent / "sql" / "messages_keyset.sql"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(SQL_FILE.read_text())
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("drop index if exists public.messages_conversation_keyset_idx;")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_chat_heads_rpc'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
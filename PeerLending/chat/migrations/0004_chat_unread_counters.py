@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from django.db import migrations
+
+SQL_FILE = Path(__file__).resolve().parent.parent / "sql" / "chat_unread.sql"
+
+
+def create_counters(apps, schema_editor):
+    # Postgres only; elsewhere chat.views falls back to a head=True count.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(SQL_FILE.read_text())
+
+
+def drop_counters(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "drop trigger if exists messages_chat_unread on public.messages;"
+        "drop function if exists public.chat_unread_on_message();"
+        "drop function if exists public.chat_unread_bump(uuid, uuid, integer);"
+        "drop table if exists public.chat_unread;"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_messages_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_counters, drop_counters),
+    ]
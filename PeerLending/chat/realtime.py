@@ -0,0 +1,56 @@
+# chat/realtime.py
+"""
+Channel-layer groups used to push chat events to connected sockets.
+
+    conversation_group(id)  every socket open on that conversation
+    user_group(id)          every socket of that user (head/unread updates)
+
+broadcast_message() is for sync code such as the post_message view;
+abroadcast_message() is the same thing for ChatConsumer and the async views.
+Both are best-effort and back off while the layer is down
+(sharehub/channel_layer.py): the message is already saved.
+"""
+from channels.layers import get_channel_layer
+
+from sharehub import channel_layer
+
+
+def conversation_group(conversation_id):
+    return channel_layer.group_name("chat.conversation", conversation_id)
+
+
+def user_group(user_id):
+    return channel_layer.group_name("chat.user", user_id)
+
+
+async def _abroadcast(message, participant_ids):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    conversation_id = message.get("conversation_id")
+    await layer.group_send(conversation_group(conversation_id), {
+        "type": "chat.message",
+        "message": message,
+    })
+    for uid in set(participant_ids or []):
+        await layer.group_send(user_group(uid), {
+            "type": "chat.head",
+            "conversation_id": conversation_id,
+            "sender_id": message.get("sender_id"),
+            "last_message": message.get("content"),
+            "last_at": message.get("created_at"),
+        })
+
+
+async def abroadcast_message(message, participant_ids):
+    """Send a saved message row to its conversation and a head update to each participant."""
+    await channel_layer.asend(_abroadcast, message, participant_ids, what=_what(message))
+
+
+def broadcast_message(message, participant_ids):
+    """abroadcast_message() for sync code."""
+    channel_layer.send(_abroadcast, message, participant_ids, what=_what(message))
+
+
+def _what(message):
+    return f"chat broadcast for conversation {message.get('conversation_id')}"
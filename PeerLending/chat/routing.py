@@ -3,5 +3,6 @@ from django.urls import re_path
 from .consumer import ChatConsumer   # <-- FIXED import
 
 websocket_urlpatterns = [
+    re_path(r'ws/chat/$', ChatConsumer.as_asgi()),
     re_path(r'ws/chat/(?P<conversation_id>[^/]+)/$', ChatConsumer.as_asgi()),
 ]
@@ -0,0 +1,65 @@
+-- chat_heads(p_user_id): every conversation the user takes part in, with the
+-- other participant's profile, the last message and the unread count, in a
+-- single round-trip. Called from chat.views via
+--   server_client.rpc("chat_heads", {"p_user_id": user_id})
+-- Applied by chat/migrations/0002_chat_heads_rpc.py (PostgreSQL only).
+
+create index if not exists conversation_participants_user_id_idx
+    on public.conversation_participants (user_id);
+create index if not exists conversation_participants_conversation_id_idx
+    on public.conversation_participants (conversation_id);
+create index if not exists messages_conversation_id_created_at_idx
+    on public.messages (conversation_id, created_at desc);
+create index if not exists messages_unread_idx
+    on public.messages (conversation_id, sender_id)
+    where is_read = false;
+
+create or replace function public.chat_heads(p_user_id uuid)
+returns json
+language sql
+stable
+as $$
+    select coalesce(json_agg(h order by h.last_at desc nulls last), '[]'::json)
+    from (
+        select
+            c.id as conversation_id,
+            c.item_id,
+            c.item_title,
+            other.user_id as other_id,
+            case when u.id is null then null
+                 else coalesce(
+                     nullif(trim(coalesce(u.first_name, '') || ' ' || coalesce(u.last_name, '')), ''),
+                     u.email,
+                     u.id::text
+                 )
+            end as other_name,
+            u.profile_picture as other_avatar,
+            last_msg.content as last_message,
+            last_msg.created_at as last_at,
+            unread.n as unread_count
+        from public.conversation_participants me
+        join public.conversations c on c.id = me.conversation_id
+        left join lateral (
+            select cp.user_id
+            from public.conversation_participants cp
+            where cp.conversation_id = c.id and cp.user_id <> me.user_id
+            limit 1
+        ) other on true
+        left join public."user" u on u.id = other.user_id
+        left join lateral (
+            select m.content, m.created_at
+            from public.messages m
+            where m.conversation_id = c.id
+            order by m.created_at desc
+            limit 1
+        ) last_msg on true
+        cross join lateral (
+            select count(*) as n
+            from public.messages m
+            where m.conversation_id = c.id
+              and m.is_read = false
+              and m.sender_id <> me.user_id
+        ) unread
+        where me.user_id = p_user_id
+    ) h;
+$$;
@@ -0,0 +1,70 @@
+-- chat_unread: unread message count per (user, conversation), kept up to date
+-- by triggers on public.messages so reading the total is a primary-key lookup
+-- instead of a scan of messages. Read from chat.views.fetch_unread_total.
+-- Applied by chat/migrations/0004_chat_unread_counters.py (PostgreSQL only).
+
+create table if not exists public.chat_unread (
+    user_id uuid not null,
+    conversation_id uuid not null references public.conversations (id) on delete cascade,
+    unread integer not null default 0,
+    primary key (user_id, conversation_id)
+);
+
+-- only the service role reads this table
+alter table public.chat_unread enable row level security;
+
+-- +delta for every participant of conversation_id except sender_id
+create or replace function public.chat_unread_bump(p_conversation_id uuid, p_sender_id uuid, p_delta integer)
+returns void
+language sql
+as $$
+    insert into public.chat_unread as u (user_id, conversation_id, unread)
+    select cp.user_id, p_conversation_id, greatest(p_delta, 0)
+    from public.conversation_participants cp
+    where cp.conversation_id = p_conversation_id
+      and cp.user_id <> p_sender_id
+    on conflict (user_id, conversation_id)
+    do update set unread = greatest(u.unread + p_delta, 0);
+$$;
+
+create or replace function public.chat_unread_on_message()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op = 'INSERT' then
+        if not coalesce(new.is_read, false) then
+            perform public.chat_unread_bump(new.conversation_id, new.sender_id, 1);
+        end if;
+    elsif tg_op = 'UPDATE' then
+        if not coalesce(old.is_read, false) and coalesce(new.is_read, false) then
+            perform public.chat_unread_bump(new.conversation_id, new.sender_id, -1);
+        elsif coalesce(old.is_read, false) and not coalesce(new.is_read, false) then
+            perform public.chat_unread_bump(new.conversation_id, new.sender_id, 1);
+        end if;
+    elsif tg_op = 'DELETE' then
+        if not coalesce(old.is_read, false) then
+            perform public.chat_unread_bump(old.conversation_id, old.sender_id, -1);
+        end if;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists messages_chat_unread on public.messages;
+create trigger messages_chat_unread
+    after insert or delete or update of is_read on public.messages
+    for each row execute function public.chat_unread_on_message();
+
+-- backfill from the current state of messages
+insert into public.chat_unread (user_id, conversation_id, unread)
+select cp.user_id, m.conversation_id, count(*)
+from public.messages m
+join public.conversation_participants cp
+  on cp.conversation_id = m.conversation_id
+ and cp.user_id <> m.sender_id
+where m.is_read = false
+group by cp.user_id, m.conversation_id
+on conflict (user_id, conversation_id) do update set unread = excluded.unread;
@@ -0,0 +1,6 @@
+-- Keyset pagination for chat.views.get_messages.
+-- Pages are ordered by (created_at, id) within a conversation, so this index
+-- serves both ?before= (descending) and ?after= (ascending) scans.
+
+create index if not exists messages_conversation_keyset_idx
+    on public.messages (conversation_id, created_at desc, id desc);
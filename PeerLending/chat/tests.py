@@ -1,3 +1,103 @@
-from django.test import TestCase
+from django.test import override_settings
 
-# Create your tests here.
+from sharehub import channel_layer
+from sharehub.instrumentation import assert_max_calls
+from sharehub.testing import FakeSupabaseTestCase
+
+from . import views
+
+
+class ChatTestCase(FakeSupabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # the stand-in has no SQL functions: test the table fallbacks, as on a
+        # project without the chat migrations
+        for feature in (views._chat_heads_rpc_feature, views._unread_counters_feature):
+            feature.disable()
+            self.addCleanup(feature.reset)
+        self.client = self.login(1)
+        self.conversation_id = self.conversations_of(self.user_ids[1])[0]
+
+    def conversations_of(self, user_id):
+        rows = (
+            self.supabase.from_("conversation_participants").select("conversation_id")
+            .eq("user_id", user_id).execute().data
+        )
+        return sorted(r["conversation_id"] for r in rows)
+
+
+class ChatHeadsTests(ChatTestCase):
+    def test_lists_the_users_conversations(self):
+        resp = self.client.get("/api/chat/heads/")
+        self.assertEqual(resp.status_code, 200)
+        heads = resp.json()["results"]
+        self.assertEqual(sorted(h["conversation_id"] for h in heads), self.conversations_of(self.user_ids[1]))
+
+    def test_budget(self):
+        for url in ("/api/chat/heads/", "/async/api/chat/heads/"):
+            with assert_max_calls(5, url):
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+
+    def test_missing_rpc_is_tried_once(self):
+        views._chat_heads_rpc_feature.reset()
+        with assert_max_calls(6, "first chat_heads"):
+            self.client.get("/api/chat/heads/")
+        self.assertFalse(views._chat_heads_rpc_feature.available)
+        with assert_max_calls(5, "chat_heads"):
+            self.client.get("/api/chat/heads/")
+
+
+class GetMessagesTests(ChatTestCase):
+    def messages_url(self, conversation_id=None, prefix=""):
+        return f"{prefix}/api/chat/{conversation_id or self.conversation_id}/messages/"
+
+    def test_budget(self):
+        for url in (self.messages_url(), self.messages_url(prefix="/async")):
+            with assert_max_calls(3, url):
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+
+    def test_pages_back_with_before(self):
+        first = self.client.get(self.messages_url(), {"limit": 2}).json()
+        self.assertTrue(first["prev_cursor"])
+        older = self.client.get(self.messages_url(), {"limit": 2, "before": first["prev_cursor"]}).json()
+        self.assertTrue(older["results"])
+        self.assertFalse({m["id"] for m in older["results"]} & {m["id"] for m in first["results"]})
+
+    def test_rejects_a_bad_cursor(self):
+        for prefix in ("", "/async"):
+            resp = self.client.get(self.messages_url(prefix=prefix), {"before": "2025-01-01|x),id.neq.0"})
+            self.assertEqual(resp.status_code, 400)
+
+    def test_outsiders_get_403_before_any_messages_are_read(self):
+        theirs = set(self.conversations_of(self.user_ids[2])) - set(self.conversations_of(self.user_ids[1]))
+        self.assertTrue(theirs)
+        for prefix in ("", "/async"):
+            with assert_max_calls(1, "outsider"):
+                resp = self.client.get(self.messages_url(min(theirs), prefix=prefix))
+            self.assertEqual(resp.status_code, 403)
+
+
+@override_settings(CHANNEL_LAYERS={
+    "default": {"BACKEND": "channels_redis.core.RedisChannelLayer", "CONFIG": {"hosts": ["redis://127.0.0.1:1/0"]}},
+})
+class PostMessageTests(ChatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(setattr, channel_layer, "_retry_at", 0.0)
+
+    def post(self, prefix=""):
+        return self.client.post(
+            f"{prefix}/api/chat/{self.conversation_id}/post/", {"content": "still there?"},
+            content_type="application/json",
+        )
+
+    def test_unreachable_layer_is_tried_once(self):
+        with self.assertLogs("sharehub.channel_layer", "WARNING"):
+            resp = self.post()
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.json()["message"]["id"])
+        with self.assertNoLogs("sharehub.channel_layer", "WARNING"):
+            for prefix in ("", "/async"):
+                self.assertEqual(self.post(prefix).status_code, 200)
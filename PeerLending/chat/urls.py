@@ -1,11 +1,19 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# ASYNC_VIEWS picks which version serves the canonical URLs
+hot_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('api/chat/heads/', views.chat_heads, name='chat_heads'),
+    path('api/chat/heads/', hot_views.chat_heads, name='chat_heads'),
     path('api/chat/start/<str:item_id>/', views.start_conversation, name='start_conversation'),
-    path('api/chat/<str:conversation_id>/messages/', views.get_messages, name='chat_messages'),
-    path('api/chat/<str:conversation_id>/post/', views.post_message, name='chat_post_message'),
+    path('api/chat/<str:conversation_id>/messages/', hot_views.get_messages, name='chat_messages'),
+    path('api/chat/<str:conversation_id>/post/', hot_views.post_message, name='chat_post_message'),
     path('api/chat/<str:conversation_id>/delete/', views.delete_conversation, name='delete_conversation'),
-    path('api/chat/unread-count/', views.unread_count, name='chat_unread_count'),
+    path('api/chat/unread-count/', hot_views.unread_count, name='chat_unread_count'),
+    path('async/api/chat/heads/', async_views.chat_heads, name='async_chat_heads'),
+    path('async/api/chat/<str:conversation_id>/messages/', async_views.get_messages, name='async_chat_messages'),
+    path('async/api/chat/<str:conversation_id>/post/', async_views.post_message, name='async_chat_post_message'),
+    path('async/api/chat/unread-count/', async_views.unread_count, name='async_chat_unread_count'),
 ]
@@ -1,22 +1,74 @@
 # PeerLending/chat/views.py
 import json
 import logging
+import uuid
+from datetime import datetime
 from functools import wraps
 
+from asgiref.sync import iscoroutinefunction
 from django.conf import settings
 from django.http import JsonResponse, HttpResponseForbidden
 from django.views.decorators.http import require_POST
-from supabase import create_client as create_supabase_client
+
+from sharehub.instrumentation import query_budget
+from sharehub.profiles import display_name
+from sharehub.supabase_client import OptionalFeature, get_service_client
+
+from .realtime import broadcast_message
 
 SUPABASE_URL = settings.SUPABASE_URL
 SUPABASE_SERVICE_ROLE_KEY = getattr(settings, "SUPABASE_SERVICE_ROLE_KEY", None)
 logger = logging.getLogger(__name__)
 
 # server client uses service role key (must be kept server-side)
-server_client = create_supabase_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY) if SUPABASE_SERVICE_ROLE_KEY else None
+server_client = get_service_client()
+
+
+def conversation_participant_ids(client, conversation_id):
+    """User ids taking part in conversation_id (one query)."""
+    return participant_ids(participants_query(client, conversation_id).execute())
+
+
+def participants_query(client, conversation_id):
+    return client.from_("conversation_participants").select("user_id").eq("conversation_id", conversation_id)
+
+
+def participant_ids(resp):
+    return [p.get("user_id") for p in (getattr(resp, "data", None) or []) if p.get("user_id")]
+
+
+def save_message(client, conversation_id, sender_id, content):
+    """
+    Insert a message row and return it. Shared by post_message and
+    ChatConsumer (and, through the same two helpers below, the async
+    post_message) so every path persists messages the same way.
+    """
+    return inserted_message(message_insert_query(client, conversation_id, sender_id, content).execute())
+
+
+def message_insert_query(client, conversation_id, sender_id, content):
+    return client.from_("messages").insert({
+        "conversation_id": conversation_id,
+        "sender_id": sender_id,
+        "content": content
+    })
+
+
+def inserted_message(ins):
+    if getattr(ins, "error", None) or not getattr(ins, "data", None):
+        raise RuntimeError(f"Insert failed: {getattr(ins, 'error', None)}")
+    return ins.data[0]
 
 
 def supabase_login_required(view_func):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _awrapped(request, *args, **kwargs):
+            if await request.session.aget("supabase_user_id"):
+                return await view_func(request, *args, **kwargs)
+            return HttpResponseForbidden("Not authenticated")
+        return _awrapped
+
     @wraps(view_func)
     def _wrapped(request, *args, **kwargs):
         if request.session.get("supabase_user_id"):
@@ -25,11 +77,125 @@ def supabase_login_required(view_func):
     return _wrapped
 
 
+_chat_heads_rpc_feature = OptionalFeature("chat_heads RPC")
+
+
+def _chat_heads_rpc(client, user_id):
+    """One call to the chat_heads() SQL function (chat/sql/chat_heads.sql)."""
+    resp = client.rpc("chat_heads", {"p_user_id": user_id}).execute()
+    return getattr(resp, "data", None) or []
+
+
+def _chat_heads_batched(client, user_id):
+    """
+    Fallback for databases without chat_heads(): a fixed number of in_()
+    queries no matter how many conversations the user has.
+    """
+    # get conversation ids where current user is participant
+    parts = client.from_("conversation_participants").select("conversation_id").eq("user_id", user_id).execute()
+    conv_ids = [p.get("conversation_id") for p in (getattr(parts, "data", None) or []) if p.get("conversation_id")]
+    if not conv_ids:
+        return []
+
+    convs_resp = _heads_conversations_query(client, conv_ids).execute()
+    # participants -> the other user of every conversation
+    all_parts = _heads_participants_query(client, conv_ids).execute()
+    other_by_conv = _other_participants(user_id, getattr(all_parts, "data", None))
+    # unread counts (messages not from me and not read)
+    unread_resp = _heads_unread_query(client, user_id, conv_ids).execute()
+
+    profiles = {}
+    other_ids = sorted(set(other_by_conv.values()))
+    if other_ids:
+        users_resp = _heads_profiles_query(client, other_ids).execute()
+        profiles = {u.get("id"): u for u in (getattr(users_resp, "data", None) or [])}
+
+    return _assemble_heads(getattr(convs_resp, "data", []) or [], other_by_conv,
+                           getattr(unread_resp, "data", None), profiles)
+
+
+# The batched fallback's queries and the assembly of their results, shared
+# with the async version in chat/async_views.py.
+
+def _heads_conversations_query(client, conv_ids):
+    # conversations, each with its latest message embedded
+    return client.from_("conversations") \
+        .select("*, messages(content,created_at)") \
+        .in_("id", conv_ids) \
+        .order("created_at", desc=True, foreign_table="messages") \
+        .limit(1, foreign_table="messages")
+
+
+def _heads_participants_query(client, conv_ids):
+    return client.from_("conversation_participants").select("conversation_id,user_id").in_("conversation_id", conv_ids)
+
+
+def _heads_unread_query(client, user_id, conv_ids):
+    return client.from_("messages").select("conversation_id").in_("conversation_id", conv_ids).eq("is_read", False).neq("sender_id", user_id)
+
+
+def _heads_profiles_query(client, user_ids):
+    return client.from_("user").select("id,first_name,last_name,email,profile_picture").in_("id", user_ids)
+
+
+def _other_participants(user_id, participant_rows):
+    other_by_conv = {}
+    for p in (participant_rows or []):
+        if p.get("user_id") and p.get("user_id") != user_id:
+            other_by_conv.setdefault(p.get("conversation_id"), p.get("user_id"))
+    return other_by_conv
+
+
+def _assemble_heads(convs, other_by_conv, unread_rows, profiles):
+    unread_by_conv = {}
+    for m in (unread_rows or []):
+        unread_by_conv[m.get("conversation_id")] = unread_by_conv.get(m.get("conversation_id"), 0) + 1
+
+    results = []
+    for c in convs:
+        other = other_by_conv.get(c.get("id"))
+        profile = profiles.get(other)
+        last = (c.get("messages") or [None])[0]
+        results.append({
+            "conversation_id": c.get("id"),
+            "item_id": c.get("item_id"),
+            "item_title": c.get("item_title"),
+            "other_id": other,
+            "other_name": display_name(profile) if profile else None,
+            # avatar field name may differ; try a few common keys
+            "other_avatar": (
+                profile.get("avatar_url") or profile.get("avatar")
+                or profile.get("profile_image") or profile.get("profile_picture")
+            ) if profile else None,
+            "last_message": last.get("content") if last else None,
+            "last_at": last.get("created_at") if last else None,
+            "unread_count": unread_by_conv.get(c.get("id"), 0),
+        })
+
+    results.sort(key=lambda h: h["last_at"] or "", reverse=True)
+    return results
+
+
+def fetch_chat_heads(client, user_id):
+    """
+    Conversation heads for user_id, newest activity first.
+    Uses the chat_heads() RPC when deployed, otherwise the batched fallback;
+    either way the number of PostgREST calls doesn't grow with the number
+    of conversations.
+    """
+    if _chat_heads_rpc_feature.available and getattr(settings, "CHAT_HEADS_USE_RPC", True):
+        try:
+            return _chat_heads_rpc(client, user_id)
+        except Exception as e:
+            _chat_heads_rpc_feature.failed(e)
+    return _chat_heads_batched(client, user_id)
+
+
+@query_budget(8)
 @supabase_login_required
 def chat_heads(request):
     """
-    Robust chat_heads: returns conversation heads along with other participant's name and avatar.
-    Defensive: tolerates different user table names and logs exceptions.
+    Returns conversation heads along with other participant's name and avatar.
     """
     user_id = request.session.get("supabase_user_id")
     if not user_id:
@@ -40,126 +206,180 @@ def chat_heads(request):
         return JsonResponse({"error": "Server chat unavailable (missing service role key)."}, status=500)
 
     try:
-        # get conversation ids where current user is participant
-        parts = server_client.from_("conversation_participants").select("conversation_id").eq("user_id", user_id).execute()
-        conv_ids = [p.get("conversation_id") for p in (getattr(parts, "data", None) or []) if p.get("conversation_id")]
-        if not conv_ids:
-            return JsonResponse({"results": []})
-
-        # load conversations
-        convs_resp = server_client.from_("conversations").select("*").in_("id", conv_ids).execute()
-        convs = getattr(convs_resp, "data", []) or []
-
-        results = []
-
-        # prepare candidate user tables to try for fetching user profile
-        candidate_user_tables = ["user", "users", "profiles", "auth.users"]
-
-        for c in convs:
-            try:
-                # latest message
-                last_resp = server_client.from_("messages").select("*").eq("conversation_id", c["id"]).order("created_at", desc=True).limit(1).execute()
-                last = (getattr(last_resp, "data", None) or [None])[0]
-
-                # unread count (messages not from me and not read)
-                unread_resp = server_client.from_("messages").select("id").eq("conversation_id", c["id"]).eq("is_read", False).neq("sender_id", user_id).execute()
-                unread_count = len(getattr(unread_resp, "data", None) or [])
-
-                # participants -> find the other user
-                parts_resp = server_client.from_("conversation_participants").select("user_id").eq("conversation_id", c["id"]).execute()
-                participants = [p.get("user_id") for p in (getattr(parts_resp, "data", None) or []) if p.get("user_id")]
-                other = next((p for p in participants if p != user_id), None)
-
-                other_name = None
-                other_avatar = None
-
-                if other:
-                    # try candidate tables until one returns a profile
-                    profile = None
-                    for tbl in candidate_user_tables:
-                        try:
-                            # request common fields; some tables may not have these fields but it's okay
-                            q = server_client.from_(tbl).select("id, first_name, last_name, avatar_url, email").eq("id", other).maybe_single().execute()
-                            profile = getattr(q, "data", None)
-                            if profile:
-                                break
-                        except Exception:
-                            # ignore and try next table
-                            continue
-
-                    # fallback: if no profile found, try simple select for any available columns
-                    if not profile:
-                        try:
-                            q2 = server_client.from_(candidate_user_tables[0]).select("*").eq("id", other).maybe_single().execute()
-                            profile = getattr(q2, "data", None)
-                        except Exception:
-                            profile = None
-
-                    if profile:
-                        display = ((profile.get("first_name") or "") + " " + (profile.get("last_name") or "")).strip()
-                        if not display:
-                            display = profile.get("email") or profile.get("id") or str(other)
-                        other_name = display
-                        # avatar_url field name may differ; try a few common keys
-                        other_avatar = profile.get("avatar_url") or profile.get("avatar") or profile.get("profile_image") or None
-
-                results.append({
-                    "conversation_id": c.get("id"),
-                    "item_id": c.get("item_id"),
-                    "item_title": c.get("item_title"),
-                    "other_id": other,
-                    "other_name": other_name,
-                    "other_avatar": other_avatar,
-                    "last_message": last.get("content") if last else None,
-                    "last_at": last.get("created_at") if last else None,
-                    "unread_count": unread_count,
-                })
-
-            except Exception as inner_e:
-                logger.exception("chat_heads: error processing conversation id %s: %s", c.get("id"), inner_e)
-                # continue to next conversation instead of failing whole endpoint
-                continue
-
-        return JsonResponse({"results": results})
+        return JsonResponse({"results": fetch_chat_heads(server_client, user_id)})
     except Exception as e:
         # log full exception so you can see stacktrace in server console
         logger.exception("chat_heads: unexpected error: %s", e)
         return JsonResponse({"error": "Internal server error while fetching chat heads."}, status=500)
 
 
+_unread_counters_feature = OptionalFeature("chat_unread counters")
+
+
+def _unread_from_counters(client, user_id):
+    """Sum of the user's rows in chat_unread (chat/sql/chat_unread.sql)."""
+    resp = client.from_("chat_unread").select("unread").eq("user_id", user_id).gt("unread", 0).execute()
+    return sum(int(r.get("unread") or 0) for r in (getattr(resp, "data", None) or []))
+
+
+def _unread_by_count(client, user_id):
+    """Count unread messages in the user's own conversations without fetching rows."""
+    parts = client.from_("conversation_participants").select("conversation_id").eq("user_id", user_id).execute()
+    conv_ids = [p.get("conversation_id") for p in (getattr(parts, "data", None) or []) if p.get("conversation_id")]
+    if not conv_ids:
+        return 0
+    resp = (
+        client.from_("messages")
+        .select("id", count="exact", head=True)
+        .in_("conversation_id", conv_ids)
+        .eq("is_read", False)
+        .neq("sender_id", user_id)
+        .execute()
+    )
+    return getattr(resp, "count", None) or 0
+
+
+def fetch_unread_total(client, user_id):
+    """
+    Total unread messages for user_id across their conversations.
+    Reads the trigger-maintained chat_unread counters when deployed,
+    otherwise falls back to an exact head-only count.
+    """
+    if _unread_counters_feature.available and getattr(settings, "CHAT_UNREAD_USE_COUNTERS", True):
+        try:
+            return _unread_from_counters(client, user_id)
+        except Exception as e:
+            _unread_counters_feature.failed(e)
+    return _unread_by_count(client, user_id)
+
+
 @supabase_login_required
 def unread_count(request):
     user_id = request.session.get("supabase_user_id")
     try:
-        q = server_client.from_("messages").select("id").eq("is_read", False).neq("sender_id", user_id).execute()
-        cnt = len(getattr(q, "data", None) or [])
-        return JsonResponse({"unread": cnt})
+        return JsonResponse({"unread": fetch_unread_total(server_client, user_id)})
     except Exception as e:
         logger.exception("unread_count error: %s", e)
         return JsonResponse({"unread": 0})
 
 
+MESSAGE_COLUMNS = "id,conversation_id,sender_id,content,is_read,created_at"
+
+
+def message_cursor(message):
+    """Opaque keyset cursor for a message row: "<created_at>|<id>"."""
+    return f"{message.get('created_at')}|{message.get('id')}"
+
+
+def _parse_cursor(value):
+    """
+    (created_at, id) from a "<created_at>|<id>" cursor. Both parts come from
+    the client and end up inside a PostgREST or() filter, so they are parsed
+    and re-serialized here; anything else raises ValueError.
+    """
+    created_at, sep, msg_id = (value or "").rpartition("|")
+    if not sep or not created_at or not msg_id:
+        raise ValueError("Invalid cursor")
+    return datetime.fromisoformat(created_at).isoformat(), str(uuid.UUID(msg_id))
+
+
+def _page_size(raw):
+    default = getattr(settings, "CHAT_MESSAGES_PAGE_SIZE", 50)
+    maximum = getattr(settings, "CHAT_MESSAGES_MAX_PAGE_SIZE", 200)
+    try:
+        size = int(raw) if raw else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def fetch_messages_page(client, conversation_id, limit, before=None, after=None):
+    """
+    One page of messages in ascending (created_at, id) order, plus whether
+    more exist in the direction being paged.
+
+    - no cursor: the latest `limit` messages
+    - before:    the `limit` messages just older than the cursor
+    - after:     the `limit` messages just newer than the cursor ("since")
+    """
+    rows = getattr(messages_page_query(client, conversation_id, limit, before, after).execute(), "data", None) or []
+    return messages_page(rows, limit, after)
+
+
+def messages_page_query(client, conversation_id, limit, before=None, after=None):
+    q = client.from_("messages").select(MESSAGE_COLUMNS).eq("conversation_id", conversation_id)
+    if after:
+        ts, msg_id = _parse_cursor(after)
+        q = q.or_(f'created_at.gt."{ts}",and(created_at.eq."{ts}",id.gt."{msg_id}")')
+        q = q.order("created_at", desc=False).order("id", desc=False)
+    else:
+        if before:
+            ts, msg_id = _parse_cursor(before)
+            q = q.or_(f'created_at.lt."{ts}",and(created_at.eq."{ts}",id.lt."{msg_id}")')
+        q = q.order("created_at", desc=True).order("id", desc=True)
+    # fetch one extra row to know whether there is another page
+    return q.limit(limit + 1)
+
+
+def messages_page(rows, limit, after=None):
+    """(rows in ascending order, has_more) from the result of messages_page_query()."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not after:
+        rows.reverse()
+    return rows, has_more
+
+
+def unread_ids(user_id, messages):
+    return [m["id"] for m in messages if m.get("id") and not m.get("is_read") and m.get("sender_id") != user_id]
+
+
+def mark_read(client, user_id, messages):
+    """Mark the given (delivered) messages read, skipping the user's own."""
+    ids = unread_ids(user_id, messages)
+    if ids:
+        client.from_("messages").update({"is_read": True}).in_("id", ids).execute()
+    return ids
+
 
 @supabase_login_required
 def get_messages(request, conversation_id):
     """
-    GET /api/chat/<conversation_id>/messages/ -> returns ordered messages and marks unread messages as read
+    GET /api/chat/<conversation_id>/messages/[?limit=&before=|after=]
+
+    Returns one page of messages (oldest first) and marks that page read.
+    `prev_cursor` pages back with ?before=, `next_cursor` fetches anything
+    newer with ?after=.
     """
     user_id = request.session.get("supabase_user_id")
-    check = server_client.from_("conversation_participants").select("*").eq("conversation_id", conversation_id).eq("user_id", user_id).maybe_single().execute()
-    if getattr(check, "error", None) or not check.data:
+    check = server_client.from_("conversation_participants").select("user_id").eq("conversation_id", conversation_id).eq("user_id", user_id).maybe_single().execute()
+    if getattr(check, "error", None) or not getattr(check, "data", None):
         return HttpResponseForbidden("No access")
 
-    msgs_resp = server_client.from_("messages").select("*").eq("conversation_id", conversation_id).order("created_at", desc=False).execute()
-    msgs = msgs_resp.data or []
+    before = request.GET.get("before")
+    after = request.GET.get("after")
+    if before and after:
+        return JsonResponse({"error": "Use either before or after, not both"}, status=400)
 
-    # best-effort mark as read (only messages not sent by current user)
     try:
-        server_client.from_("messages").update({"is_read": True}).eq("conversation_id", conversation_id).eq("is_read", False).neq("sender_id", user_id).execute()
-    except Exception:
-        pass
+        msgs, has_more = fetch_messages_page(
+            server_client, conversation_id, _page_size(request.GET.get("limit")), before=before, after=after
+        )
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
 
-    return JsonResponse({"results": msgs})
+    # best-effort mark as read, only for what this page delivered
+    try:
+        mark_read(server_client, user_id, msgs)
+    except Exception as e:
+        logger.warning("get_messages: mark read failed for %s: %s", conversation_id, e)
+
+    return JsonResponse({
+        "results": msgs,
+        "has_more": has_more,
+        "prev_cursor": message_cursor(msgs[0]) if msgs else before,
+        "next_cursor": message_cursor(msgs[-1]) if msgs else after,
+    })
 
 
 @require_POST
@@ -222,19 +442,18 @@ def post_message(request, conversation_id):
     if not content:
         return JsonResponse({"error": "Empty message"}, status=400)
 
-    check = server_client.from_("conversation_participants").select("*").eq("conversation_id", conversation_id).eq("user_id", user_id).maybe_single().execute()
-    if getattr(check, "error", None) or not check.data:
+    participants = conversation_participant_ids(server_client, conversation_id)
+    if user_id not in participants:
         return HttpResponseForbidden("No access")
 
-    ins = server_client.from_("messages").insert({
-        "conversation_id": conversation_id,
-        "sender_id": user_id,
-        "content": content
-    }).execute()
-    if getattr(ins, "error", None):
+    try:
+        message = save_message(server_client, conversation_id, user_id, content)
+    except Exception as e:
+        logger.exception("post_message: %s", e)
         return JsonResponse({"error": "Insert failed"}, status=500)
 
-    return JsonResponse({"success": True, "message": ins.data[0]})
+    broadcast_message(message, participants)
+    return JsonResponse({"success": True, "message": message})
 
 @require_POST
 @supabase_login_required
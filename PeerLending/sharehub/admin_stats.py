@@ -0,0 +1,112 @@
+"""
+Aggregate numbers for the admin dashboard.
+
+get_admin_stats() returns counts by status, overdue loans, lent totals and
+return performance without downloading the user/item/request tables:
+
+- the admin_stats() SQL function (sharehub/sql/admin_stats.sql) computes all
+  of them in one call when it is deployed;
+- otherwise each number is a count="exact", head=True request, run
+  concurrently through a QueryPlan.
+
+The result is cached as a snapshot for ADMIN_STATS_REFRESH_SECONDS, so the
+dashboard costs one cache read on most page views.
+"""
+import logging
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .query_plan import QueryPlan
+from .supabase_client import OptionalFeature, get_anon_client, get_service_client
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "sharehub:admin_stats"
+
+STAT_FIELDS = (
+    "total_users", "total_items", "available_items",
+    "active_requests", "pending_requests", "overdue",
+    "total_lent", "currently_borrowed", "on_time", "late",
+)
+
+TRUTHY_RETURN = [True, "True", "true"]
+
+_admin_stats_rpc_feature = OptionalFeature("admin_stats RPC")
+
+
+def _client():
+    return get_service_client() or get_anon_client()
+
+
+def _stats_rpc(client):
+    resp = client.rpc("admin_stats", {}).execute()
+    data = getattr(resp, "data", None)
+    if not isinstance(data, dict):
+        raise ValueError(f"unexpected admin_stats() result: {data!r}")
+    return data
+
+
+def _stats_by_count(client):
+    now_iso = datetime.now(timezone.utc).isoformat()
+
+    def count(table, *filters):
+        def run():
+            q = client.table(table).select("*", count="exact", head=True)
+            for f in filters:
+                q = f(q)
+            return getattr(q.execute(), "count", None) or 0
+        return run
+
+    approved = lambda q: q.ilike("status", "approved")
+    not_returned = lambda q: q.neq("return", True)
+    lent = lambda q: q.or_("status.ilike.approved,status.ilike.returned")
+    overdue = count("request", approved, not_returned, lambda q: q.lt("return_date", now_iso))
+
+    plan = QueryPlan("admin_stats")
+    plan.add("total_users", count("user"), default=0)
+    plan.add("total_items", count("item"), default=0)
+    plan.add("available_items", count("item", lambda q: q.eq("available", True)), default=0)
+    plan.add("active_requests", count("request", lambda q: q.or_("status.ilike.pending,status.ilike.approved")), default=0)
+    plan.add("pending_requests", count("request", lambda q: q.ilike("status", "pending")), default=0)
+    plan.add("overdue", overdue, default=0)
+    plan.add("total_lent", count("request", lent), default=0)
+    plan.add("currently_borrowed", count("request", approved, not_returned), default=0)
+    plan.add("on_time", count("request", lent, lambda q: q.in_("return", TRUTHY_RETURN)), default=0)
+    stats = plan.run()
+    # open loans past their due date are the "late" slice of the return chart
+    stats["late"] = stats["overdue"]
+    stats["generated_at"] = now_iso
+    return stats
+
+
+def compute_admin_stats(client=None):
+    """Compute the stats now, bypassing the snapshot cache."""
+    client = client or _client()
+    if _admin_stats_rpc_feature.available and getattr(settings, "ADMIN_STATS_USE_RPC", True):
+        try:
+            stats = _stats_rpc(client)
+        except Exception as e:
+            _admin_stats_rpc_feature.failed(e)
+        else:
+            return {**{f: 0 for f in STAT_FIELDS}, **stats}
+    return _stats_by_count(client)
+
+
+def get_admin_stats(refresh=False):
+    """The cached stats snapshot, recomputed once it is older than the refresh interval."""
+    if not refresh:
+        try:
+            stats = cache.get(CACHE_KEY)
+            if stats is not None:
+                return stats
+        except Exception as e:
+            logger.warning("admin_stats cache read failed: %s", e)
+
+    stats = compute_admin_stats()
+    try:
+        cache.set(CACHE_KEY, stats, getattr(settings, "ADMIN_STATS_REFRESH_SECONDS", 60))
+    except Exception as e:
+        logger.warning("admin_stats cache write failed: %s", e)
+    return stats
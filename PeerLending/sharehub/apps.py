@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class SharehubConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sharehub'
+
+    def ready(self):
+        from django.conf import settings
+        from django.core.signals import request_started
+
+        if settings.DB_WARM_ON_STARTUP:
+            from .health import warm_on_first_request
+            request_started.connect(warm_on_first_request, dispatch_uid="sharehub.warm_database")
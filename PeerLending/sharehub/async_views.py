@@ -0,0 +1,138 @@
+"""
+Async versions of the busiest pages, for ASGI deployments (daphne).
+
+Under ASGI, Django runs sync views in a single thread per process, so a page
+that waits on Supabase holds up every other request in that worker. These
+views render the same templates from the same data as their counterparts in
+sharehub/views.py, but wait on the event loop instead: their plans run with
+QueryPlan.arun(), plain queries go through the async PostgREST client, and
+the cached sync helpers (profiles, display names, due states) run in worker
+threads alongside them.
+
+ASYNC_VIEWS chooses which set serves /home/ and /borrow_items/ (see
+sharehub/urls.py); the async ones are also always reachable under /async/ so
+both can be compared on one server (`manage.py load_test`).
+"""
+import asyncio
+
+from django.shortcuts import render
+
+from . import overdue
+from .catalog import catalog_page, catalog_page_query, page_size as catalog_page_size
+from .instrumentation import query_budget
+from .query_plan import QueryPlan
+from .request_context import get_user_context
+from .supabase_client import get_async_anon_client
+from .utils import supabase_login_required
+from .views import (
+    borrow_items_context,
+    borrowed_item_rows,
+    decorate_available_items,
+    decorate_incoming_requests,
+    decorate_notifications,
+    home_available_items_query,
+    home_borrowed_items_query,
+    home_borrowed_requests_query,
+    home_context,
+    home_incoming_requests_query,
+    home_lent_out_query,
+    home_my_items_query,
+    item_ids_of,
+    notifications_query,
+    sort_items_newest_first,
+)
+
+
+async def afetch_notifications(client, user_ctx):
+    """The header's notifications, fetched on the loop and handed to the request's user context."""
+    if not user_ctx.user_id:
+        return [], 0
+    resp = await notifications_query(client, user_ctx.user_id).execute()
+    notifications, unread_count = decorate_notifications(resp.data or [])
+    user_ctx.set_notifications(notifications, unread_count)
+    return notifications, unread_count
+
+
+@query_budget(20)
+@supabase_login_required
+async def home(request):
+    user_id = await request.session.aget("supabase_user_id")
+    user_ctx = get_user_context(request)
+    client = get_async_anon_client()
+
+    async def fetch_my_items():
+        return (await home_my_items_query(client, user_id).execute()).data or []
+
+    async def fetch_incoming_requests(my_items):
+        my_item_ids = item_ids_of(my_items)
+        if not my_item_ids:
+            return []
+        incoming_requests = (await home_incoming_requests_query(client, my_item_ids).execute()).data or []
+        return await asyncio.to_thread(decorate_incoming_requests, incoming_requests, my_items)
+
+    async def fetch_lent_out_count(my_items):
+        my_item_ids = item_ids_of(my_items)
+        if not my_item_ids:
+            return 0
+        return (await home_lent_out_query(client, my_item_ids).execute()).count or 0
+
+    async def fetch_available_items():
+        try:
+            items_resp = await home_available_items_query(client, user_id).execute()
+            if getattr(items_resp, "error", None):
+                raise Exception("Ordered query error")
+            fetched_items = items_resp.data or []
+        except Exception:
+            items_resp = await home_available_items_query(client, user_id, ordered=False).execute()
+            fetched_items = sort_items_newest_first(items_resp.data or [])
+        return await asyncio.to_thread(decorate_available_items, fetched_items)
+
+    async def fetch_borrowed_items():
+        br_reqs = (await home_borrowed_requests_query(client, user_id).execute()).data or []
+        if not br_reqs:
+            return []
+        item_ids = item_ids_of(br_reqs)
+        items_rows = ((await home_borrowed_items_query(client, item_ids).execute()).data or []) if item_ids else []
+        return await asyncio.to_thread(borrowed_item_rows, br_reqs, items_rows)
+
+    async def fetch_notifications():
+        return await afetch_notifications(client, user_ctx)
+
+    plan = QueryPlan("home")
+    plan.add("user_info", lambda: user_ctx.user_info)
+    plan.add("notifications", fetch_notifications, default=([], 0))
+    plan.add("my_items", fetch_my_items, default=[])
+    plan.add("incoming_requests", fetch_incoming_requests, after=["my_items"], default=[])
+    plan.add("lent_out_count", fetch_lent_out_count, after=["my_items"], default=0)
+    plan.add("available_items", fetch_available_items, default=([], False))
+    plan.add("borrowed_items", fetch_borrowed_items, default=[])
+    plan.add("due_states", lambda: overdue.fetch_states(user_id=user_id), default=None)
+    results = await plan.arun()
+
+    # everything the templates read is cached on user_ctx by now, so rendering doesn't block
+    return render(request, "home.html", home_context(results))
+
+
+@supabase_login_required
+async def borrow_items(request):
+    user_id = await request.session.aget("supabase_user_id")
+    user_ctx = get_user_context(request)
+    client = get_async_anon_client()
+    limit = catalog_page_size(None)
+
+    async def fetch_catalog():
+        resp = await catalog_page_query(client, user_id, limit, with_total=True).execute()
+        # decorating resolves owner names through the profiles cache
+        return await asyncio.to_thread(catalog_page, resp, limit, True)
+
+    async def fetch_notifications():
+        return await afetch_notifications(client, user_ctx)
+
+    plan = QueryPlan("borrow_items")
+    plan.add("catalog", fetch_catalog, default=([], None, None))
+    plan.add("notifications", fetch_notifications, default=([], 0))
+    # the header shows the user's name; warm it alongside the queries
+    plan.add("user_info", lambda: user_ctx.user_info)
+    results = await plan.arun()
+
+    return render(request, "borrow_items.html", borrow_items_context(results))
@@ -0,0 +1,119 @@
+"""
+Stateless Supabase Auth (GoTrue) calls.
+
+supabase-py's auth client keeps the signed-in session on the client object,
+and the Client that owns it swaps its PostgREST/Storage bearer token whenever
+that session changes. Signing in through the shared client from
+get_anon_client() therefore made every later table call in the process run
+as whoever logged in last, and every login/logout went through one piece of
+shared mutable state.
+
+The helpers here send one GoTrue request each and hand back what it returned;
+nothing is stored between calls. Tokens travel as arguments, so one instance
+(get_auth_service() in sharehub/supabase_client.py) is safe to share between
+threads, and its HTTP goes through the same pool and instrumentation as the
+other clients.
+
+    resp = auth_service.sign_in(email, password)      # AuthResponse
+    auth_service.sign_out(resp.session.access_token)  # revoke that session only
+    auth_service.update_user(access_token, {"password": new_password})
+
+Admin calls (user lookup, update and delete by id) use the service role key
+when it is configured, like get_service_client().
+"""
+from supabase_auth._sync.gotrue_base_api import SyncGoTrueBaseAPI
+from supabase_auth.helpers import parse_auth_response, parse_user_response
+
+from .supabase_client import get_auth_admin, get_auth_service
+
+
+class StatelessAuthClient(SyncGoTrueBaseAPI):
+    """GoTrue endpoints the app uses, with the caller's token passed in instead of a stored session."""
+
+    def sign_in_with_password(self, email, password):
+        return self._request(
+            "POST",
+            "token",
+            body={"email": email, "password": password},
+            query={"grant_type": "password"},
+            xform=parse_auth_response,
+        )
+
+    def refresh_session(self, refresh_token):
+        return self._request(
+            "POST",
+            "token",
+            body={"refresh_token": refresh_token},
+            query={"grant_type": "refresh_token"},
+            xform=parse_auth_response,
+        )
+
+    def get_jwks(self):
+        return self._request("GET", ".well-known/jwks.json", xform=lambda data: data)
+
+    def sign_up(self, email, password, data=None, redirect_to=None):
+        return self._request(
+            "POST",
+            "signup",
+            body={"email": email, "password": password, "data": data or {}},
+            redirect_to=redirect_to,
+            xform=parse_auth_response,
+        )
+
+    def sign_out(self, access_token, scope="local"):
+        self._request("POST", "logout", query={"scope": scope}, jwt=access_token, no_resolve_json=True)
+
+    def get_user(self, access_token):
+        return self._request("GET", "user", jwt=access_token, xform=parse_user_response)
+
+    def update_user(self, access_token, attributes, redirect_to=None):
+        return self._request(
+            "PUT",
+            "user",
+            body=attributes,
+            redirect_to=redirect_to,
+            jwt=access_token,
+            xform=parse_user_response,
+        )
+
+    def reset_password_for_email(self, email, redirect_to=None):
+        self._request("POST", "recover", body={"email": email}, redirect_to=redirect_to)
+
+
+# ---------- module-level helpers ----------
+
+def sign_in(email, password):
+    """AuthResponse for the credentials; raises AuthApiError when they are wrong."""
+    return get_auth_service().sign_in_with_password(email, password)
+
+
+def refresh_session(refresh_token):
+    """AuthResponse with a new access/refresh token pair; raises AuthApiError if refresh_token is spent or revoked."""
+    return get_auth_service().refresh_session(refresh_token)
+
+
+def sign_up(email, password, data=None, redirect_to=None):
+    return get_auth_service().sign_up(email, password, data=data, redirect_to=redirect_to)
+
+
+def sign_out(access_token, scope="local"):
+    """Revoke the session behind access_token (scope "global" ends all of the user's sessions)."""
+    if access_token:
+        get_auth_service().sign_out(access_token, scope)
+
+
+def get_user(access_token):
+    return get_auth_service().get_user(access_token)
+
+
+def update_user(access_token, attributes, redirect_to=None):
+    return get_auth_service().update_user(access_token, attributes, redirect_to=redirect_to)
+
+
+def reset_password_for_email(email, redirect_to=None):
+    get_auth_service().reset_password_for_email(email, redirect_to=redirect_to)
+
+
+def admin():
+    """The GoTrue admin API (get_user_by_id, update_user_by_id, delete_user, ...)."""
+    return get_auth_admin()
@@ -0,0 +1,176 @@
+"""
+Supabase access tokens kept in the Django session and verified locally.
+
+Login stores the access token, refresh token and expiry in the session
+(store_session). After that session_claims(request) answers "who is this and
+what is their email" from the token itself instead of asking Supabase Auth:
+
+  * HS256 tokens are checked with SUPABASE_JWT_SECRET (Project Settings > API >
+    JWT secret). Projects on asymmetric signing keys are checked against the
+    project's JWKS, fetched once and cached for SUPABASE_JWKS_CACHE_SECONDS
+    (refetched early, at most once a minute, when a token names a key we
+    haven't seen -- that is what a key rotation looks like).
+  * A token within SUPABASE_TOKEN_REFRESH_MARGIN seconds of expiring is swapped
+    for a new pair with the refresh token and the session is updated, so an
+    active user costs one Auth call an hour rather than one per page.
+
+A refresh token that Auth rejects (revoked, user deleted, already used) drops
+the stored tokens; session_claims() then returns None and callers fall back to
+what the session already knows.
+"""
+import logging
+import threading
+import time
+
+import jwt
+from django.conf import settings
+from supabase_auth.errors import AuthApiError
+
+from . import auth_service
+
+logger = logging.getLogger(__name__)
+
+SESSION_ACCESS_TOKEN = "supabase_access_token"
+SESSION_REFRESH_TOKEN = "supabase_refresh_token"
+SESSION_EXPIRES_AT = "supabase_token_expires_at"
+
+AUDIENCE = "authenticated"
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+_jwks_lock = threading.Lock()
+# ({kid: PyJWK}, fetched_at)
+_jwks = ({}, 0.0)
+_UNSET = object()
+
+
+# ---------- verification ----------
+
+def _jwks_keys(force=False):
+    """Signing keys from the project's JWKS, cached; force refetches unless that happened in the last minute."""
+    global _jwks
+    keys, fetched_at = _jwks
+    age = time.monotonic() - fetched_at
+    if fetched_at and age < getattr(settings, "SUPABASE_JWKS_CACHE_SECONDS", 600) and not (force and age >= 60):
+        return keys
+    with _jwks_lock:
+        if _jwks[1] != fetched_at:
+            # another thread refreshed while we waited
+            return _jwks[0]
+        try:
+            data = auth_service.get_auth_service().get_jwks() or {}
+            keys = {}
+            for jwk in data.get("keys") or []:
+                try:
+                    keys[jwk.get("kid")] = jwt.PyJWK(jwk)
+                except jwt.PyJWTError as e:
+                    logger.warning("Skipping unusable JWKS key %s: %s", jwk.get("kid"), e)
+        except Exception as e:
+            # keep what we had; try again after the next interval
+            logger.warning("Could not fetch Supabase JWKS: %s", e)
+        _jwks = (keys, time.monotonic())
+        return keys
+
+
+def _verification_key(header):
+    alg = header.get("alg")
+    if alg == "HS256":
+        secret = getattr(settings, "SUPABASE_JWT_SECRET", "")
+        if not secret:
+            raise jwt.InvalidTokenError("SUPABASE_JWT_SECRET is not set")
+        return secret
+    if alg not in ASYMMETRIC_ALGORITHMS:
+        raise jwt.InvalidAlgorithmError(f"unsupported token algorithm {alg!r}")
+    kid = header.get("kid")
+    key = _jwks_keys().get(kid) or _jwks_keys(force=True).get(kid)
+    if key is None:
+        raise jwt.InvalidTokenError(f"unknown signing key {kid!r}")
+    return key.key
+
+
+def verify(access_token):
+    """The claims of a Supabase access token; raises a jwt.PyJWTError if it is invalid or expired."""
+    header = jwt.get_unverified_header(access_token)
+    return jwt.decode(
+        access_token,
+        _verification_key(header),
+        algorithms=[header.get("alg")],
+        audience=AUDIENCE,
+        options={"require": ["exp", "sub"]},
+    )
+
+
+# ---------- session storage ----------
+
+def store_tokens(session, access_token, refresh_token, expires_at=None):
+    if expires_at is None:
+        # only used to schedule the refresh; the token is verified on use
+        expires_at = jwt.decode(access_token, options={"verify_signature": False}).get("exp") or 0
+    session[SESSION_ACCESS_TOKEN] = access_token
+    session[SESSION_REFRESH_TOKEN] = refresh_token
+    session[SESSION_EXPIRES_AT] = int(expires_at)
+
+
+def store_session(session, auth_session):
+    """Keep a supabase_auth Session (from sign-in or refresh) in the Django session."""
+    expires_at = auth_session.expires_at
+    if not expires_at and auth_session.expires_in:
+        expires_at = time.time() + auth_session.expires_in
+    store_tokens(session, auth_session.access_token, auth_session.refresh_token, expires_at)
+
+
+def clear_tokens(session):
+    for key in (SESSION_ACCESS_TOKEN, SESSION_REFRESH_TOKEN, SESSION_EXPIRES_AT):
+        session.pop(key, None)
+
+
+def refresh(request):
+    """Swap the session's tokens for a new pair. Returns the new access token, or None."""
+    session = request.session
+    refresh_token = session.get(SESSION_REFRESH_TOKEN)
+    if not refresh_token:
+        return None
+    try:
+        resp = auth_service.refresh_session(refresh_token)
+    except AuthApiError as e:
+        logger.info("Supabase refresh token rejected, dropping stored tokens: %s", e)
+        clear_tokens(session)
+        return None
+    except Exception as e:
+        # Auth unreachable: keep the tokens and retry on the next request
+        logger.warning("Could not refresh Supabase session: %s", e)
+        return session.get(SESSION_ACCESS_TOKEN)
+    if not resp.session:
+        clear_tokens(session)
+        return None
+    store_session(session, resp.session)
+    request._supabase_claims = _UNSET
+    return resp.session.access_token
+
+
+def session_claims(request):
+    """
+    Verified claims for the request's Supabase session (sub, email, role, ...),
+    refreshing the tokens first when they are about to expire. None when the
+    session has no usable token. Worked out once per request.
+    """
+    cached = getattr(request, "_supabase_claims", _UNSET)
+    if cached is not _UNSET:
+        return cached
+
+    session = request.session
+    token = session.get(SESSION_ACCESS_TOKEN)
+    claims = None
+    if token:
+        margin = getattr(settings, "SUPABASE_TOKEN_REFRESH_MARGIN", 60)
+        if (session.get(SESSION_EXPIRES_AT) or 0) - time.time() < margin:
+            token = refresh(request)
+        if token:
+            try:
+                claims = verify(token)
+            except jwt.PyJWTError as e:
+                logger.info("Stored Supabase access token rejected: %s", e)
+        user_id = session.get("supabase_user_id")
+        if claims and user_id and claims.get("sub") != str(user_id):
+            claims = None
+    request._supabase_claims = claims
+    return claims
@@ -0,0 +1,153 @@
+"""
+Keyset-paginated listing of available items for borrow_items and /api/catalog/.
+
+Pages are ordered by (created_at, item_id), newest first by default, and the
+cursor is the last row of the previous page ("<created_at>|<item_id>"), so a
+page costs the same no matter how deep the user has scrolled. Category,
+condition and owner filters are applied by PostgREST rather than in the
+browser.
+"""
+import logging
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+
+from .images import variant_url
+from .profiles import resolve_display_names
+
+logger = logging.getLogger(__name__)
+
+CATALOG_COLUMNS = "item_id,title,description,category,condition,image_url,user_id,created_at,available"
+
+SORTS = ("recent", "oldest")
+
+LOAD_BATCH = 1000
+
+
+def item_cursor(item):
+    return f"{item.get('created_at')}|{item.get('item_id')}"
+
+
+def parse_cursor(value):
+    """
+    (created_at, item_id) from a cursor. Both parts are client input that ends
+    up inside a PostgREST or() filter, so they are parsed and re-serialized;
+    anything that isn't a timestamp and a UUID raises ValueError.
+    """
+    created_at, sep, item_id = (value or "").rpartition("|")
+    if not sep or not created_at or not item_id:
+        raise ValueError("Invalid cursor")
+    return datetime.fromisoformat(created_at).isoformat(), str(uuid.UUID(item_id))
+
+
+def page_size(raw):
+    default = getattr(settings, "CATALOG_PAGE_SIZE", 24)
+    maximum = getattr(settings, "CATALOG_MAX_PAGE_SIZE", 100)
+    try:
+        size = int(raw) if raw else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def decorate_items(items):
+    """Add owner_display/owner_id, created_at_iso and the card-size thumb_url, as the templates expect."""
+    owner_map = resolve_display_names(itm.get("user_id") for itm in items)
+    for itm in items:
+        owner_id = itm.get("user_id")
+        itm["owner_id"] = owner_id
+        itm["owner_display"] = owner_map.get(owner_id, "Unknown")
+        itm["created_at_iso"] = str(itm.get("created_at") or "")
+        itm["thumb_url"] = variant_url(itm.get("image_url"), "card")
+    return items
+
+
+def fetch_catalog_page(client, viewer_id, limit, cursor=None, categories=(), conditions=(),
+                       owner_id=None, sort="recent", with_total=False):
+    """
+    One page of available items not owned by viewer_id.
+
+    Returns (items, next_cursor, total). next_cursor is None on the last page;
+    total is only counted when with_total=True (first page), otherwise None.
+    """
+    resp = catalog_page_query(client, viewer_id, limit, cursor, categories, conditions, owner_id, sort,
+                              with_total).execute()
+    return catalog_page(resp, limit, with_total)
+
+
+def catalog_page_query(client, viewer_id, limit, cursor=None, categories=(), conditions=(),
+                       owner_id=None, sort="recent", with_total=False):
+    """The PostgREST query behind fetch_catalog_page(), for a sync or async client."""
+    desc = sort != "oldest"
+    q = client.table("item").select(CATALOG_COLUMNS, count="exact" if with_total else None)
+    q = q.eq("available", True)
+    if viewer_id:
+        q = q.neq("user_id", viewer_id)
+    if categories:
+        q = q.in_("category", list(categories))
+    if conditions:
+        q = q.in_("condition", list(conditions))
+    if owner_id:
+        q = q.eq("user_id", owner_id)
+    if cursor:
+        ts, item_id = parse_cursor(cursor)
+        op = "lt" if desc else "gt"
+        q = q.or_(f'created_at.{op}."{ts}",and(created_at.eq."{ts}",item_id.{op}."{item_id}")')
+
+    return q.order("created_at", desc=desc).order("item_id", desc=desc).limit(limit + 1)
+
+
+def catalog_page(resp, limit, with_total=False):
+    """(items, next_cursor, total) from the response to catalog_page_query()."""
+    rows = getattr(resp, "data", None) or []
+    has_more = len(rows) > limit
+    items = decorate_items(rows[:limit])
+    next_cursor = item_cursor(items[-1]) if has_more and items else None
+    total = getattr(resp, "count", None) if with_total else None
+    return items, next_cursor, total
+
+
+def iter_available_items(client, columns=CATALOG_COLUMNS, batch=LOAD_BATCH):
+    """Every available item, read in item_id order a batch at a time (for in-process indexes)."""
+    start = 0
+    while True:
+        resp = (
+            client.table("item").select(columns)
+            .eq("available", True)
+            .order("item_id")
+            .range(start, start + batch - 1)
+            .execute()
+        )
+        rows = getattr(resp, "data", None) or []
+        yield from rows
+        if len(rows) < batch:
+            break
+        start += batch
+
+
+def sync_item_indexes(client, item_id, item=None, removed=False):
+    """
+    Bring the in-process search and typeahead indexes up to date after an
+    item was added, edited, lent out, returned or deleted.
+
+    Pass the row when the caller already has it; otherwise it is re-read, but
+    only if one of the indexes has been built in this process.
+    """
+    from . import search, typeahead
+
+    if not (search.index_built() or typeahead.index_built()):
+        return
+    if item is None and not removed:
+        try:
+            resp = client.table("item").select(CATALOG_COLUMNS).eq("item_id", item_id).maybe_single().execute()
+            item = getattr(resp, "data", None) if resp is not None else None
+        except Exception as e:
+            logger.warning("catalog: could not re-read item %s for indexing: %s", item_id, e)
+            return
+    if item and not removed:
+        search.index_item(item)
+        typeahead.index_item(item)
+    else:
+        search.unindex_item(item_id)
+        typeahead.unindex_item(item_id)
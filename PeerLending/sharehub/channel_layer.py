@@ -0,0 +1,65 @@
+"""
+Channel layer helpers shared by the notification pushes (sharehub/realtime.py)
+and the chat broadcasts (chat/realtime.py).
+
+group_name(prefix, id) builds every group name, so ids from the URL or the
+session can only ever produce characters and lengths channels accepts.
+
+Pushes run after the row they announce has been saved, so one that can't be
+delivered is logged and dropped, never raised. When the layer (Redis) is
+down each attempt waits out a connect timeout; after a failure every push is
+skipped for RETRY_SECONDS, so requests that post a message or write a
+notification don't each pay that wait again.
+
+    send(apush_read, user_id)                  # from sync code
+    await asend(abroadcast, message, ids)      # from async code
+"""
+import logging
+import re
+import time
+
+from asgiref.sync import async_to_sync
+
+logger = logging.getLogger(__name__)
+
+RETRY_SECONDS = 30
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]")
+
+# after a failed push, skip pushing until then instead of waiting on a dead layer
+_retry_at = 0.0
+
+
+def group_name(prefix, value):
+    """f"{prefix}.{value}" with anything channels rejects in value replaced by "-"."""
+    return f"{prefix}.{_UNSAFE.sub('-', str(value))[:80]}"
+
+
+def _available():
+    return time.monotonic() >= _retry_at
+
+
+def _failed(what, e):
+    global _retry_at
+    _retry_at = time.monotonic() + RETRY_SECONDS
+    logger.warning("%s failed, skipping channel layer pushes for %ss: %s", what, RETRY_SECONDS, e)
+
+
+def send(coro_fn, *args, what="channel layer push"):
+    """Run coro_fn(*args) from sync code; failures are logged, never raised."""
+    if not _available():
+        return
+    try:
+        async_to_sync(coro_fn)(*args)
+    except Exception as e:
+        _failed(what, e)
+
+
+async def asend(coro_fn, *args, what="channel layer push"):
+    """await coro_fn(*args); failures are logged, never raised."""
+    if not _available():
+        return
+    try:
+        await coro_fn(*args)
+    except Exception as e:
+        _failed(what, e)
@@ -0,0 +1,45 @@
+"""
+WebSocket endpoint for live notifications:
+
+    ws/notifications/   one per page; joins the user's notification group
+
+Server -> client:  {"type": "notification", "notification": {...}}
+                   {"type": "read"}   (marked read in another tab)
+"""
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .realtime import notification_group
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        self.group = None
+        user_id = await self._session_user_id()
+        if not user_id:
+            await self.close(code=4401)
+            return
+        self.group = notification_group(user_id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if getattr(self, "group", None):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # push only; nothing to receive
+        pass
+
+    # --- channel layer events ---
+
+    async def notification_new(self, event):
+        await self.send_json({"type": "notification", "notification": event["notification"]})
+
+    async def notification_read(self, event):
+        await self.send_json({"type": "read"})
+
+    @database_sync_to_async
+    def _session_user_id(self):
+        session = self.scope.get("session")
+        return session.get("supabase_user_id") if session is not None else None
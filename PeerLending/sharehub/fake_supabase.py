@@ -0,0 +1,724 @@
+"""
+An in-process stand-in for the Supabase APIs the app uses, backed by SQLite,
+for load testing and profiling without a live project.
+
+It is an httpx transport (sync and async): with SUPABASE_FAKE_DB set,
+sharehub/supabase_client.py hands it to every client instead of the network
+pool, so the real supabase-py query builders, the app's call pattern and
+sharehub/instrumentation.py all behave exactly as they do against Supabase --
+only the server is local. Async clients wait out the latency with
+asyncio.sleep, so concurrent calls overlap the way network round-trips do.
+
+    SUPABASE_FAKE_DB=/tmp/sharehub-fake.sqlite3     (or ":memory:")
+    SUPABASE_FAKE_LATENCY_MS=40                     round-trip added per call
+    SUPABASE_FAKE_JITTER_MS=10                      +- random part of it
+
+Covered:
+
+    PostgREST  select (columns, one level of embedding, order, limit/offset,
+               count=exact, head), the eq/neq/gt/gte/lt/lte/like/ilike/in/is
+               filters plus not. and or=(...), single/maybe_single,
+               insert/upsert/update/delete with return=representation
+    Auth       sign up, password sign-in, refresh, get_user, update_user,
+               sign out, password recovery, admin get/update/delete user
+    Storage    upload/update, public and signed download, sign, list, remove
+
+Everything else answers like a project that doesn't have it: RPC functions
+return PGRST202 and tables outside CORE_TABLES return PGRST205 until
+something is written to them, so the app takes the same fallbacks it takes
+before the SQL in sharehub/sql and chat/sql is deployed.
+
+Rows are stored as JSON and filtered in Python: this is about reproducing
+the app's calls and their latency, not about PostgreSQL performance.
+"""
+import asyncio
+import base64
+import email.parser
+import email.policy
+import fnmatch
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import unquote
+
+import httpx
+import jwt
+
+# tables the app expects to exist on a fresh project, with their primary keys
+CORE_TABLES = {
+    "user": "id",
+    "item": "item_id",
+    "request": "request_id",
+    "notification": "notification_id",
+    "reports": "report_id",
+    "conversations": "id",
+    "conversation_participants": "id",
+    "messages": "id",
+}
+
+ACCESS_TOKEN_SECONDS = 3600
+FAKE_JWT_SECRET = "sharehub-fake-supabase"
+
+_SCHEMA = """
+create table if not exists pgrst_rows (
+    rid integer primary key autoincrement,
+    tbl text not null,
+    data text not null
+);
+create index if not exists pgrst_rows_tbl on pgrst_rows (tbl);
+create table if not exists pgrst_tables (tbl text primary key, pk text not null);
+create table if not exists auth_users (
+    id text primary key,
+    email text unique,
+    password text,
+    data text not null
+);
+create table if not exists auth_refresh_tokens (token text primary key, user_id text not null);
+create table if not exists storage_objects (
+    bucket text not null,
+    path text not null,
+    content_type text,
+    body blob,
+    created_at text,
+    primary key (bucket, path)
+);
+"""
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class _Conflict(Exception):
+    pass
+
+
+def _json_response(status, data, headers=None):
+    return httpx.Response(status, headers={"content-type": "application/json", **(headers or {})},
+                          content=json.dumps(data, default=str).encode())
+
+
+def _pgrst_error(status, code, message, details=None):
+    return _json_response(status, {"code": code, "message": message, "details": details, "hint": None})
+
+
+def _hash_password(password):
+    return hashlib.sha256(f"sharehub-fake:{password}".encode()).hexdigest()
+
+
+# ---------- PostgREST filter evaluation ----------
+
+def _as_datetime(value):
+    if not isinstance(value, str) or len(value) < 10 or value[4:5] != "-":
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed
+
+
+def _coerce_pair(value, criteria):
+    """Bring a stored value and a filter's text criteria to comparable types."""
+    if isinstance(value, bool):
+        return value, criteria.lower() in ("true", "t", "1")
+    if isinstance(value, (int, float)):
+        try:
+            return value, float(criteria)
+        except ValueError:
+            return str(value), criteria
+    value_dt, criteria_dt = _as_datetime(value), _as_datetime(criteria)
+    if value_dt and criteria_dt:
+        return value_dt, criteria_dt
+    return ("" if value is None else str(value)), criteria
+
+
+def _unquote_value(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+
+def _split_top_level(text):
+    """Split "a,b(c,d),e" on the commas that are not inside parentheses or quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    if current:
+        parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _like(pattern, value, case_insensitive):
+    pattern = pattern.replace("*", "%")
+    regex = "^" + "".join(".*" if c == "%" else "." if c == "_" else re.escape(c) for c in pattern) + "$"
+    return re.match(regex, "" if value is None else str(value), re.I if case_insensitive else 0) is not None
+
+
+def _compile_test(column, op, criteria):
+    """A row predicate for one PostgREST operator; `op` may carry a "not." prefix."""
+    negate = op.startswith("not.")
+    if negate:
+        op = op[4:]
+
+    if op == "is":
+        lowered = criteria.lower()
+        test = (lambda v: v is None) if lowered == "null" else (lambda v: v is (lowered == "true"))
+    elif op == "in":
+        options = [_unquote_value(v) for v in _split_top_level(criteria.strip("()"))]
+        as_text = set(options)
+
+        def test(v):
+            if v is None:
+                return False
+            if isinstance(v, str) and _as_datetime(v) is None:
+                return v in as_text
+            return any(_eq(v, o) for o in options)
+    elif op in ("like", "ilike"):
+        test = lambda v: v is not None and _like(criteria, v, op == "ilike")
+    elif op in ("fts", "plfts", "phfts", "wfts"):
+        words = re.findall(r"\w+", criteria.lower())
+        test = lambda v: all(w in str(v or "").lower() for w in words)
+    elif op in ("eq", "neq", "gt", "gte", "lt", "lte"):
+        compare = {
+            "eq": lambda a, b: a == b, "neq": lambda a, b: a != b,
+            "gt": lambda a, b: a > b, "gte": lambda a, b: a >= b,
+            "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b,
+        }[op]
+        criteria = _unquote_value(criteria)
+
+        def test(v):
+            if v is None:
+                return False  # NULL compares as unknown, as in PostgreSQL
+            try:
+                return compare(*_coerce_pair(v, criteria))
+            except TypeError:
+                return False
+    else:
+        raise ValueError(f"unsupported operator {op!r}")
+
+    if negate:
+        return lambda row: not test(row.get(column))
+    return lambda row: test(row.get(column))
+
+
+def _eq(value, criteria):
+    left, right = _coerce_pair(value, criteria)
+    return left == right
+
+
+def _parse_condition(expr):
+    """A condition inside or=(...): "col.op.value", "and(...)" or "or(...)" -> predicate."""
+    for group in ("and", "or", "not.and", "not.or"):
+        if expr.startswith(group + "("):
+            inner = [_parse_condition(e) for e in _split_top_level(expr[len(group) + 1:-1])]
+            combine = all if group.endswith("and") else any
+            if group.startswith("not."):
+                return lambda row: not combine(p(row) for p in inner)
+            return lambda row: combine(p(row) for p in inner)
+    column, op_value = expr.split(".", 1)
+    op, _, criteria = op_value.partition(".")
+    if op == "not":
+        negated, _, criteria = criteria.partition(".")
+        op = "not." + negated
+    return _compile_test(column, op, criteria)
+
+
+def _predicates(params):
+    """The row filters in a PostgREST query string (everything but the reserved keys)."""
+    predicates = []
+    for key, raw in params.multi_items():
+        if key in ("or", "and", "not.or", "not.and"):
+            predicates.append(_parse_condition(f"{key}{raw}"))
+            continue
+        if key in ("select", "order", "limit", "offset", "on_conflict", "columns") or "." in key:
+            continue  # "messages.order" etc. belong to an embedded resource
+        op, _, criteria = raw.partition(".")
+        if op == "not":
+            negated, _, criteria = criteria.partition(".")
+            op = "not." + negated
+        predicates.append(_compile_test(key, op, criteria))
+    return predicates
+
+
+def _sort(rows, order):
+    for part in reversed([p for p in order.split(",") if p]):
+        bits = part.split(".")
+        column, desc = bits[0], "desc" in bits[1:]
+        nulls_first = "nullsfirst" in bits[1:] or (desc and "nullslast" not in bits[1:])
+
+        def key(row, column=column):
+            value = row.get(column)
+            if value is None:
+                return (0, 0)
+            dt = _as_datetime(value)
+            return (1, dt if dt else value)
+
+        present = [r for r in rows if r.get(column) is not None]
+        missing = [r for r in rows if r.get(column) is None]
+        present.sort(key=key, reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def _singular(table):
+    return table[:-1] if table.endswith("s") else table
+
+
+class FakeSupabaseTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    def __init__(self, path=":memory:", latency_ms=0.0, jitter_ms=0.0, jwt_secret=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.jwt_secret = jwt_secret or FAKE_JWT_SECRET
+        self._lock = threading.RLock()
+        # decoded rows per table ({rid: row}), loaded on first use and written through
+        self._cache = {}
+        self._groups = {}
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.executescript(_SCHEMA)
+        with self._lock:
+            for table, pk in CORE_TABLES.items():
+                self._db.execute("insert or ignore into pgrst_tables (tbl, pk) values (?, ?)", (table, pk))
+
+    # ---------- transport ----------
+
+    def _delay(self):
+        if not (self.latency_ms or self.jitter_ms):
+            return 0.0
+        return max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def handle_request(self, request):
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        request.read()
+        return self._handle(request)
+
+    async def handle_async_request(self, request):
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        await request.aread()
+        return self._handle(request)
+
+    def _handle(self, request):
+        parts = [unquote(p) for p in request.url.path.split("/") if p]
+        try:
+            with self._lock:
+                if parts[:2] == ["rest", "v1"]:
+                    return self._rest(request, parts[2:])
+                if parts[:2] == ["auth", "v1"]:
+                    return self._auth(request, parts[2:])
+                if parts[:2] == ["storage", "v1"]:
+                    return self._storage(request, parts[2:])
+        except _Conflict as e:
+            return _pgrst_error(409, "23505", str(e))
+        except ValueError as e:
+            return _pgrst_error(400, "PGRST100", str(e))
+        return _json_response(404, {"message": f"no fake for {request.url.path}"})
+
+    def close(self):
+        self._db.close()
+
+    async def aclose(self):
+        # the database is shared with the sync clients; close() releases it
+        pass
+
+    # ---------- PostgREST ----------
+
+    def _table_pk(self, table):
+        row = self._db.execute("select pk from pgrst_tables where tbl = ?", (table,)).fetchone()
+        return row[0] if row else None
+
+    def _rows(self, table):
+        if table not in self._cache:
+            self._cache[table] = {
+                rid: json.loads(data)
+                for rid, data in self._db.execute("select rid, data from pgrst_rows where tbl = ? order by rid", (table,))
+            }
+        return list(self._cache[table].items())
+
+    def _write(self, table, rid, row):
+        if rid is None:
+            rid = self._db.execute("insert into pgrst_rows (tbl, data) values (?, ?)",
+                                   (table, json.dumps(row, default=str))).lastrowid
+        else:
+            self._db.execute("update pgrst_rows set data = ? where rid = ?", (json.dumps(row, default=str), rid))
+        self._rows(table)
+        self._cache[table][rid] = row
+        return rid
+
+    def _delete(self, table, rids):
+        self._db.executemany("delete from pgrst_rows where rid = ?", [(rid,) for rid in rids])
+        for rid in rids:
+            self._cache.get(table, {}).pop(rid, None)
+
+    def _grouped(self, table, column):
+        """{value: [rows]} of a table by one column, built once per request (for embedding)."""
+        key = (table, column)
+        if key not in self._groups:
+            groups = {}
+            for _, r in self._rows(table):
+                groups.setdefault(r.get(column), []).append(r)
+            self._groups[key] = groups
+        return self._groups[key]
+
+    def _embed(self, table, row, spec, params):
+        """Resolve "child(cols)" for one row: one-to-many via <parent>_id, else many-to-one."""
+        name, columns = spec[:-1].split("(", 1)
+        name = name.split(":")[-1].strip()
+        fk = f"{_singular(table)}_id"
+        children = self._grouped(name, fk)
+        if set(children) - {None}:
+            key = row.get("id", row.get(fk))
+            matched = list(children.get(key, [])) if key is not None else []
+            if params.get(f"{name}.order"):
+                matched = _sort(matched, params[f"{name}.order"])
+            if params.get(f"{name}.limit"):
+                matched = matched[:int(params[f"{name}.limit"])]
+            return name, [self._project(name, c, columns, params) for c in matched]
+        ref = row.get(f"{_singular(name)}_id")
+        parents = self._grouped(name, self._table_pk(name) or "id").get(ref) if ref is not None else None
+        parent = parents[0] if parents else None
+        return name, self._project(name, parent, columns, params) if parent else None
+
+    def _project(self, table, row, select, params):
+        columns = _split_top_level(select or "*")
+        out = {}
+        for col in columns:
+            if col.endswith(")") and "(" in col:
+                name, value = self._embed(table, row, col, params)
+                out[name] = value
+            elif col == "*":
+                out.update(row)
+            else:
+                alias, _, source = col.rpartition(":")
+                source = source.split("::")[0]
+                out[alias or source] = row.get(source)
+        return out
+
+    def _rest(self, request, parts):
+        if not parts:
+            return _json_response(200, {})
+        if parts[0] == "rpc":
+            fn = parts[1] if len(parts) > 1 else ""
+            return _pgrst_error(404, "PGRST202", f"Could not find the function public.{fn} in the schema cache")
+
+        table = parts[0]
+        params = request.url.params
+        self._groups = {}
+        pk = self._table_pk(table)
+        method = request.method
+        if pk is None and method != "POST":
+            return _pgrst_error(404, "PGRST205", f"Could not find the table 'public.{table}' in the schema cache")
+
+        prefer = request.headers.get("prefer", "")
+        body = json.loads(request.content) if request.content else None
+        predicates = _predicates(params)
+        matches = [(rid, r) for rid, r in self._rows(table) if all(p(r) for p in predicates)] if pk else []
+
+        if method in ("GET", "HEAD"):
+            rows = [r for _, r in matches]
+            if params.get("order"):
+                rows = _sort(rows, params["order"])
+            total = len(rows)
+            offset = int(params.get("offset") or 0)
+            limit = params.get("limit")
+            rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+            rows = [self._project(table, r, params.get("select"), params) for r in rows]
+        elif method == "POST":
+            rows = self._insert(table, pk, body, params, prefer)
+            total = len(rows)
+        elif method == "PATCH":
+            rows = []
+            for rid, r in matches:
+                r.update(body or {})
+                self._write(table, rid, r)
+                rows.append(r)
+            total = len(rows)
+        elif method == "DELETE":
+            rows = [r for _, r in matches]
+            self._delete(table, [rid for rid, _ in matches])
+            total = len(rows)
+        else:
+            return _pgrst_error(405, "PGRST117", f"Unsupported HTTP method: {method}")
+
+        headers = {}
+        if "count=" in prefer:
+            headers["content-range"] = f"0-{max(0, len(rows) - 1)}/{total}" if rows else f"*/{total}"
+        status = 201 if method == "POST" else 200
+
+        if "application/vnd.pgrst.object+json" in request.headers.get("accept", ""):
+            if len(rows) != 1:
+                return _pgrst_error(406, "PGRST116", "JSON object requested, multiple (or no) rows returned",
+                                    f"The result contains {len(rows)} rows")
+            return _json_response(status, rows[0], headers)
+        if method == "HEAD" or (method != "GET" and "return=representation" not in prefer):
+            return httpx.Response(204 if method != "POST" else 201, headers=headers)
+        return _json_response(status, rows, headers)
+
+    def _insert(self, table, pk, body, params, prefer):
+        if pk is None:
+            # first write creates the table, as if its migration had run
+            pk = CORE_TABLES.get(table, "id")
+            self._db.execute("insert or ignore into pgrst_tables (tbl, pk) values (?, ?)", (table, pk))
+        on_conflict = [c for c in (params.get("on_conflict") or pk).split(",") if c]
+        existing = self._rows(table)
+        keys = {r.get(pk) for _, r in existing}
+        out = []
+        for row in body if isinstance(body, list) else [body or {}]:
+            row = dict(row)
+            match = None
+            if "resolution=" in prefer and all(row.get(c) is not None for c in on_conflict):
+                match = next(
+                    ((rid, r) for rid, r in existing if all(_eq(r.get(c), str(row[c])) for c in on_conflict)),
+                    None,
+                )
+            if match is None:
+                # column defaults apply to new rows only
+                row.setdefault(pk, str(uuid.uuid4()))
+                row.setdefault("created_at", _now().isoformat())
+                if row[pk] in keys:
+                    raise _Conflict(f'duplicate key value violates unique constraint "{table}_pkey"')
+                existing.append((self._write(table, None, row), row))
+                keys.add(row[pk])
+            elif "resolution=merge-duplicates" in prefer:
+                rid, current = match
+                current.update(row)
+                self._write(table, rid, current)
+                row = current
+            else:
+                continue  # ignore-duplicates
+            out.append(row)
+        return out
+
+    # ---------- Auth ----------
+
+    def _user_json(self, row):
+        data = json.loads(row[3])
+        return {**data, "id": row[0], "email": row[1]}
+
+    def _find_user(self, column, value):
+        return self._db.execute(f"select id, email, password, data from auth_users where {column} = ?", (value,)).fetchone()
+
+    def _session_for(self, user):
+        now = int(time.time())
+        claims = {
+            "sub": user["id"], "email": user.get("email"), "role": "authenticated", "aud": "authenticated",
+            "iat": now, "exp": now + ACCESS_TOKEN_SECONDS, "session_id": str(uuid.uuid4()),
+            "app_metadata": user.get("app_metadata", {}), "user_metadata": user.get("user_metadata", {}),
+        }
+        refresh = uuid.uuid4().hex
+        self._db.execute("insert into auth_refresh_tokens (token, user_id) values (?, ?)", (refresh, user["id"]))
+        return {
+            "access_token": jwt.encode(claims, self.jwt_secret, algorithm="HS256"),
+            "token_type": "bearer",
+            "expires_in": ACCESS_TOKEN_SECONDS,
+            "expires_at": now + ACCESS_TOKEN_SECONDS,
+            "refresh_token": refresh,
+            "user": user,
+        }
+
+    def _bearer_user(self, request):
+        token = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        try:
+            claims = jwt.decode(token, self.jwt_secret, algorithms=["HS256"], audience="authenticated")
+        except jwt.PyJWTError:
+            return None
+        row = self._find_user("id", claims.get("sub"))
+        return row and self._user_json(row)
+
+    def _create_user(self, email, password, user_metadata=None, confirmed=True, user_id=None):
+        now = _now().isoformat()
+        user = {
+            "id": user_id or str(uuid.uuid4()), "aud": "authenticated", "role": "authenticated", "email": email,
+            "app_metadata": {"provider": "email", "providers": ["email"]},
+            "user_metadata": user_metadata or {}, "created_at": now, "updated_at": now,
+            "email_confirmed_at": now if confirmed else None, "confirmed_at": now if confirmed else None,
+        }
+        self._db.execute("insert into auth_users (id, email, password, data) values (?, ?, ?, ?)",
+                         (user["id"], email, _hash_password(password) if password else None, json.dumps(user)))
+        return user
+
+    def create_user(self, email, password, user_metadata=None, user_id=None):
+        """Add a confirmed auth user directly (seeding); returns its id."""
+        with self._lock:
+            return self._create_user(email, password, user_metadata, user_id=user_id)["id"]
+
+    def insert_rows(self, table, rows):
+        """Write rows straight into a table (seeding), bypassing HTTP and latency."""
+        with self._lock:
+            return self._insert(table, self._table_pk(table), rows, httpx.QueryParams(), "")
+
+    def _save_user(self, user, password=None):
+        self._db.execute("update auth_users set email = ?, data = ? where id = ?",
+                         (user.get("email"), json.dumps(user), user["id"]))
+        if password:
+            self._db.execute("update auth_users set password = ? where id = ?", (_hash_password(password), user["id"]))
+
+    def _auth_error(self, status, code, message):
+        return _json_response(status, {"code": status, "error_code": code, "msg": message})
+
+    def _auth(self, request, parts):
+        method = request.method
+        body = json.loads(request.content) if request.content else {}
+        path = "/".join(parts)
+
+        if path == "signup" and method == "POST":
+            if self._find_user("email", body.get("email")):
+                return self._auth_error(422, "user_already_exists", "User already registered")
+            user = self._create_user(body.get("email"), body.get("password"),
+                                     (body.get("data") or {}), confirmed=True)
+            return _json_response(200, self._session_for(user))
+
+        if path == "token" and method == "POST":
+            grant = request.url.params.get("grant_type")
+            if grant == "password":
+                row = self._find_user("email", body.get("email"))
+                if not row or row[2] != _hash_password(body.get("password") or ""):
+                    return self._auth_error(400, "invalid_credentials", "Invalid login credentials")
+                return _json_response(200, self._session_for(self._user_json(row)))
+            if grant == "refresh_token":
+                found = self._db.execute("select user_id from auth_refresh_tokens where token = ?",
+                                         (body.get("refresh_token"),)).fetchone()
+                row = found and self._find_user("id", found[0])
+                if not row:
+                    return self._auth_error(400, "refresh_token_not_found", "Invalid Refresh Token")
+                return _json_response(200, self._session_for(self._user_json(row)))
+            return self._auth_error(400, "unsupported_grant_type", f"grant_type={grant}")
+
+        if path == "user":
+            user = self._bearer_user(request)
+            if user is None:
+                return self._auth_error(401, "bad_jwt", "invalid JWT")
+            if method == "PUT":
+                if body.get("email"):
+                    user["email"] = body["email"]
+                if body.get("data"):
+                    user["user_metadata"] = {**user.get("user_metadata", {}), **body["data"]}
+                user["updated_at"] = _now().isoformat()
+                self._save_user(user, body.get("password"))
+            return _json_response(200, user)
+
+        if path == "logout":
+            return httpx.Response(204)
+
+        if path == "recover":
+            return _json_response(200, {})
+
+        if parts[:2] == ["admin", "users"] and len(parts) == 3:
+            row = self._find_user("id", parts[2])
+            if not row:
+                return self._auth_error(404, "user_not_found", "User not found")
+            user = self._user_json(row)
+            if method == "PUT":
+                for field in ("email", "app_metadata", "user_metadata"):
+                    if field in body:
+                        user[field] = body[field]
+                self._save_user(user, body.get("password"))
+            elif method == "DELETE":
+                self._db.execute("delete from auth_users where id = ?", (user["id"],))
+            return _json_response(200, user)
+
+        if path == "settings":
+            return _json_response(200, {"external": {"email": True}, "disable_signup": False})
+        return self._auth_error(404, "not_found", f"no fake for auth/{path}")
+
+    # ---------- Storage ----------
+
+    def _storage_error(self, status, error, message):
+        return _json_response(status, {"statusCode": str(status), "error": error, "message": message})
+
+    def _read_upload(self, request):
+        content_type = request.headers.get("content-type", "")
+        if not content_type.startswith("multipart/"):
+            return request.content, content_type or "application/octet-stream"
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + request.content
+        )
+        for part in message.iter_parts():
+            if part.get_param("name", header="content-disposition") == "file":
+                return part.get_payload(decode=True), part.get_content_type()
+        return b"", "application/octet-stream"
+
+    def _storage(self, request, parts):
+        method = request.method
+        if parts[:1] != ["object"]:
+            return self._storage_error(404, "not_found", f"no fake for storage/{'/'.join(parts)}")
+        parts = parts[1:]
+
+        if parts[:1] in (["public"], ["authenticated"]) or (parts[:1] == ["sign"] and method == "GET"):
+            bucket, path = parts[1], "/".join(parts[2:])
+            row = self._db.execute("select content_type, body from storage_objects where bucket = ? and path = ?",
+                                   (bucket, path)).fetchone()
+            if not row:
+                return self._storage_error(404, "not_found", "Object not found")
+            return httpx.Response(200, headers={"content-type": row[0] or "application/octet-stream"}, content=row[1])
+
+        if parts[:1] == ["sign"] and method == "POST":
+            bucket, path = parts[1], "/".join(parts[2:])
+            token = base64.urlsafe_b64encode(uuid.uuid4().bytes).decode().rstrip("=")
+            return _json_response(200, {"signedURL": f"/object/sign/{bucket}/{path}?token={token}"})
+
+        if parts[:1] == ["list"] and method == "POST":
+            body = json.loads(request.content) if request.content else {}
+            prefix = (body.get("prefix") or "").strip("/")
+            rows = self._db.execute("select path, created_at from storage_objects where bucket = ? order by path",
+                                    (parts[1],)).fetchall()
+            names = [
+                {"name": p[len(prefix):].lstrip("/"), "id": p, "created_at": c, "metadata": {}}
+                for p, c in rows if not prefix or p.startswith(prefix + "/")
+            ]
+            limit, offset = int(body.get("limit") or 100), int(body.get("offset") or 0)
+            return _json_response(200, names[offset:offset + limit])
+
+        if method == "DELETE" and len(parts) == 1:
+            body = json.loads(request.content) if request.content else {}
+            removed = []
+            for path in body.get("prefixes") or []:
+                cur = self._db.execute("delete from storage_objects where bucket = ? and path = ?", (parts[0], path))
+                if cur.rowcount:
+                    removed.append({"name": path, "bucket_id": parts[0]})
+            return _json_response(200, removed)
+
+        if method in ("POST", "PUT") and len(parts) >= 2:
+            bucket, path = parts[0], "/".join(parts[1:])
+            exists = self._db.execute("select 1 from storage_objects where bucket = ? and path = ?",
+                                      (bucket, path)).fetchone()
+            upsert = request.headers.get("x-upsert", "").lower() == "true"
+            if method == "POST" and exists and not upsert:
+                return self._storage_error(409, "Duplicate", "The resource already exists")
+            if method == "PUT" and not exists:
+                return self._storage_error(404, "not_found", "Object not found")
+            content, content_type = self._read_upload(request)
+            self._db.execute(
+                "insert or replace into storage_objects (bucket, path, content_type, body, created_at) values (?, ?, ?, ?, ?)",
+                (bucket, path, content_type, content, _now().isoformat()),
+            )
+            return _json_response(200, {"Key": f"{bucket}/{path}", "Id": str(uuid.uuid4())})
+
+        if method == "GET" and len(parts) >= 2:
+            return self._storage(request, ["object", "authenticated"] + parts)
+        return self._storage_error(400, "invalid", f"unsupported storage call {method} {'/'.join(parts)}")
+
+    def object_names(self, bucket, pattern="*"):
+        """Stored object paths in a bucket (for checks in scripts and tests)."""
+        with self._lock:
+            rows = self._db.execute("select path from storage_objects where bucket = ?", (bucket,)).fetchall()
+        return [p for (p,) in rows if fnmatch.fnmatch(p, pattern)]
@@ -0,0 +1,75 @@
+"""
+Database warm-up and the readiness check.
+
+warm_database() opens psycopg's connection pool (DB_POOL) and waits until it
+holds DB_POOL_MIN_SIZE connections, so a worker's first burst of requests
+doesn't open them one handshake at a time. It runs once per worker process,
+at the start of the first request it serves -- after any fork, so gunicorn
+--preload children never share a socket -- when DB_WARM_ON_STARTUP is on
+(hooked up in SharehubConfig.ready()). Without a pool there is nothing to
+warm ahead of time: a plain connection belongs to the thread that opened it.
+
+GET /healthz/ready/ answers 200 when the database takes a query and 503 when
+it doesn't; load balancers can hold traffic back from a worker until then,
+and as it is usually a worker's first request it is also what warms it.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+
+logger = logging.getLogger(__name__)
+
+_warmed_pid = None
+
+
+def _ping(alias):
+    """Run a trivial query on a database; returns the milliseconds it took, connect included."""
+    started = time.perf_counter()
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return (time.perf_counter() - started) * 1000
+
+
+def warm_database():
+    """Fill every configured connection pool. Failures are logged, never raised: the request still runs."""
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)  # set on the postgresql backend when OPTIONS["pool"] is
+        if pool is None:
+            continue
+        started = time.perf_counter()
+        try:
+            pool.open()
+            pool.wait(timeout=getattr(settings, "DB_POOL_TIMEOUT", 10))
+            logger.info("Database pool %r warmed in %.0f ms", alias, (time.perf_counter() - started) * 1000)
+        except Exception as e:
+            logger.warning("Could not warm database pool %r: %s", alias, e)
+
+
+def warm_on_first_request(sender, **kwargs):
+    """request_started receiver: warm_database() once in each worker process."""
+    global _warmed_pid
+    if _warmed_pid == os.getpid():
+        return
+    _warmed_pid = os.getpid()
+    warm_database()
+
+
+@never_cache
+@require_GET
+def ready(request):
+    checks, ok = {}, True
+    for alias in connections:
+        try:
+            checks[alias] = {"status": "ok", "ms": round(_ping(alias), 1)}
+        except Exception as e:
+            logger.warning("Readiness check: database %r unavailable: %s", alias, e)
+            checks[alias] = {"status": "unavailable"}
+            ok = False
+    return JsonResponse({"ready": ok, "databases": checks}, status=200 if ok else 503)
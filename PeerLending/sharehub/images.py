@@ -0,0 +1,157 @@
+"""
+Resized variants of item photos.
+
+An uploaded photo is stored as three objects next to each other in the
+item-images bucket:
+
+    <user_id>/<image_id>/thumb.webp   160 px   (admin lists, small previews)
+    <user_id>/<image_id>/card.webp    480 px   (item cards on home / borrow / my items)
+    <user_id>/<image_id>/full.webp   1600 px   (item modal, edit page)
+
+item.image_url keeps pointing at the full variant, so every existing reader
+still gets a usable image, and variant_url() swaps the last path segment to
+reach a smaller one without a storage round-trip. URLs that don't follow this
+layout (photos uploaded before the pipeline, or stored raw because Pillow
+could not decode them) are returned unchanged; `manage.py
+backfill_image_variants` converts those.
+
+Pillow is optional: without it uploads are stored as-is, as before.
+"""
+import io
+import logging
+import os
+import re
+import time
+import uuid
+
+from django.conf import settings
+
+from .uploads import storage_body
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError, features
+except ImportError:  # Pillow not installed: uploads are stored unmodified
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# largest first: each variant is resized from the previous one
+VARIANTS = (("full", 1600), ("card", 480), ("thumb", 160))
+VARIANT_NAMES = tuple(name for name, _ in VARIANTS)
+
+_VARIANT_PATH = re.compile(r"/(thumb|card|full)\.(webp|jpg)(?=$|\?)")
+
+
+def bucket():
+    return getattr(settings, "SUPABASE_STORAGE_BUCKET", "item-images")
+
+
+def has_variants(path_or_url):
+    return bool(path_or_url) and _VARIANT_PATH.search(path_or_url) is not None
+
+
+def variant_url(path_or_url, variant):
+    """The URL (or bucket path) of `variant` for a stored image; unchanged when it has no variants."""
+    if not path_or_url or not variant or variant not in VARIANT_NAMES:
+        return path_or_url
+    return _VARIANT_PATH.sub(lambda m: f"/{variant}.{m.group(2)}", path_or_url, count=1)
+
+
+def object_path(url):
+    """The bucket-relative object path of a public storage URL, or None."""
+    marker = f"/object/public/{bucket()}/"
+    head, sep, tail = (url or "").partition(marker)
+    if not sep:
+        return None
+    return tail.split("?", 1)[0] or None
+
+
+def _output_format():
+    fmt = getattr(settings, "ITEM_IMAGE_FORMAT", "webp").lower()
+    if fmt == "webp" and features.check("webp"):
+        return "WEBP", "webp", "image/webp"
+    return "JPEG", "jpg", "image/jpeg"
+
+
+def make_variants(source):
+    """
+    {variant: (bytes, ext, content_type)} for a photo (bytes or a file object,
+    read lazily by Pillow), or None when Pillow is missing or can't read it.
+    """
+    if Image is None:
+        return None
+    fmt, ext, content_type = _output_format()
+    quality = getattr(settings, "ITEM_IMAGE_QUALITY", 80)
+    out = {}
+    try:
+        with Image.open(source if hasattr(source, "read") else io.BytesIO(source)) as src:
+            # JPEG can decode straight at a reduced scale, much cheaper for phone photos
+            src.draft("RGB", (VARIANTS[0][1], VARIANTS[0][1]))
+            img = ImageOps.exif_transpose(src)
+            keep_alpha = fmt == "WEBP" and img.mode in ("RGBA", "LA", "P")
+            img = img.convert("RGBA" if keep_alpha else "RGB")
+            for name, size in VARIANTS:
+                img.thumbnail((size, size), Image.LANCZOS, reducing_gap=3.0)
+                buf = io.BytesIO()
+                if fmt == "WEBP":
+                    img.save(buf, fmt, quality=quality, method=4)
+                else:
+                    img.save(buf, fmt, quality=quality, optimize=True, progressive=True)
+                out[name] = (buf.getvalue(), ext, content_type)
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.info("images: not resizing upload (%s)", e)
+        return None
+    return out
+
+
+def _public_url(client, path):
+    public = client.storage.from_(bucket()).get_public_url(path)
+    if isinstance(public, dict):
+        return public.get("publicUrl") or public.get("publicURL") or (public.get("data") or {}).get("publicUrl")
+    return getattr(public, "public_url", None) or getattr(public, "publicUrl", None) or public
+
+
+def _upload(client, path, data, content_type):
+    client.storage.from_(bucket()).upload(path, data, {
+        "content-type": content_type,
+        "cache-control": str(getattr(settings, "ITEM_IMAGE_CACHE_SECONDS", 31536000)),
+        "upsert": "true",
+    })
+
+
+def store_variants(client, user_id, image_id, variants):
+    """Upload prepared variants under <user_id>/<image_id>/ and return the full variant's URL."""
+    for name in VARIANT_NAMES:
+        data, ext, content_type = variants[name]
+        _upload(client, f"{user_id}/{image_id}/{name}.{ext}", data, content_type)
+    return _public_url(client, f"{user_id}/{image_id}/full.{variants['full'][1]}")
+
+
+def upload_item_image(client, user_id, uploaded):
+    """
+    Store an uploaded item photo (a Django UploadedFile, see sharehub.uploads)
+    and return the URL to save as item.image_url: the full variant when it
+    could be resized, else the original file, streamed from disk if it was
+    spooled there.
+    """
+    image_id = uuid.uuid4()
+    started = time.perf_counter()
+    variants = make_variants(uploaded)
+    if variants:
+        url = store_variants(client, user_id, image_id, variants)
+        stored = sum(len(v[0]) for v in variants.values())
+    else:
+        ext = os.path.splitext(uploaded.name or "")[1] or ".bin"
+        path = f"{user_id}/{image_id}{ext}"
+        client.storage.from_(bucket()).upload(path, storage_body(uploaded), {
+            "content-type": uploaded.content_type or "application/octet-stream",
+        })
+        url = _public_url(client, path)
+        stored = uploaded.size
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "images: stored %d-byte upload as %d bytes (%s) in %.0f ms (%.1f MB/s in)",
+        uploaded.size, stored, "variants" if variants else "original", elapsed * 1000,
+        uploaded.size / (1024 * 1024) / elapsed if elapsed > 0 else 0.0,
+    )
+    return url
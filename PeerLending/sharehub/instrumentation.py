@@ -0,0 +1,293 @@
+"""
+Per-request accounting of Supabase calls.
+
+Every Supabase client in sharehub/supabase_client.py sends its HTTP through
+one shared transport, which is wrapped in InstrumentedTransport. While a
+CallLog is active (SupabaseCallsMiddleware opens one per request) each call
+is recorded with its service (rest / auth / storage), target (table, rpc
+function, auth endpoint or bucket), status, latency and bytes in and out.
+QueryPlan copies the context into its worker threads, so calls made from a
+plan are counted against the request that ran it.
+
+At the end of the request the middleware logs one line,
+
+    supabase_calls {"view": "home", "calls": 11, "ms": 183.2, ...}
+
+and, with SUPABASE_SERVER_TIMING on, adds a Server-Timing header that shows
+up in the browser's network panel.
+
+Budgets -- a view that quietly starts making more calls fails instead of
+just getting slower:
+
+    @query_budget(20)                 # on a view: checked by the middleware
+    def home(request): ...
+
+    with assert_max_calls(3):         # in a test, around any code
+        fetch_catalog_page(...)
+
+Going over a view's budget logs a warning, and raises QueryBudgetExceeded
+when SUPABASE_QUERY_BUDGET_STRICT is set (the default under manage.py test).
+assert_max_calls() always raises.
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# the CallLogs open in this context, innermost last
+_active = contextvars.ContextVar("supabase_call_logs", default=())
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class CallLog:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add(self, call):
+        with self._lock:
+            self.calls.append(call)
+
+    @property
+    def count(self):
+        return len(self.calls)
+
+    @property
+    def total_ms(self):
+        return sum(c["ms"] for c in self.calls)
+
+    def by_service(self):
+        """{service: (calls, ms)}"""
+        totals = {}
+        for c in self.calls:
+            n, ms = totals.get(c["service"], (0, 0.0))
+            totals[c["service"]] = (n + 1, ms + c["ms"])
+        return totals
+
+    def summary(self):
+        targets = {}
+        for c in self.calls:
+            key = f"{c['service']}:{c['target']}"
+            targets[key] = targets.get(key, 0) + 1
+        return {
+            "calls": self.count,
+            "ms": round(self.total_ms, 1),
+            "bytes_in": sum(c["bytes_in"] for c in self.calls),
+            "bytes_out": sum(c["bytes_out"] for c in self.calls),
+            "targets": targets,
+        }
+
+    def describe(self):
+        return "\n".join(
+            f"  {c['method']} {c['service']}:{c['target']} -> {c['status']} ({c['ms']:.0f} ms)" for c in self.calls
+        )
+
+
+@contextmanager
+def record_calls():
+    """Record the Supabase calls made inside the block (nesting is fine) into the yielded CallLog."""
+    log = CallLog()
+    token = _active.set(_active.get() + (log,))
+    try:
+        yield log
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def assert_max_calls(max_calls, label="block"):
+    """Raise QueryBudgetExceeded if the block makes more than max_calls Supabase calls."""
+    with record_calls() as log:
+        yield log
+    if log.count > max_calls:
+        raise QueryBudgetExceeded(f"{label} made {log.count} Supabase calls (budget {max_calls}):\n{log.describe()}")
+
+
+def query_budget(max_calls):
+    """Declare how many Supabase calls a view may make per request (see SupabaseCallsMiddleware)."""
+    def decorator(view_func):
+        # functools.wraps copies __dict__, so this survives the other view decorators
+        view_func.supabase_query_budget = max_calls
+        return view_func
+    return decorator
+
+
+def classify(url):
+    """(service, target) for a Supabase URL, e.g. ("rest", "item") or ("storage", "item-images")."""
+    parts = [p for p in url.path.split("/") if p]
+    if len(parts) >= 2 and parts[1] == "v1":
+        service = parts[0]
+        rest = parts[2:]
+        if service == "rest" and rest[:1] == ["rpc"]:
+            return "rpc", rest[1] if len(rest) > 1 else ""
+        if service == "storage" and rest[:1] == ["object"]:
+            rest = rest[1:]
+            if rest[:1] in (["public"], ["sign"], ["list"], ["authenticated"]):
+                rest = rest[1:]
+        return service, rest[0] if rest else ""
+    return "other", url.host
+
+
+class _CountingStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Response body wrapper that finishes the call record once the body has been read."""
+
+    def __init__(self, stream, call, started):
+        self._stream = stream
+        self._call = call
+        self._started = started
+        self._read = 0
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._read += len(chunk)
+            yield chunk
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._read += len(chunk)
+            yield chunk
+
+    def _finish(self):
+        self._call["ms"] = (time.perf_counter() - self._started) * 1000
+        if self._read:
+            self._call["bytes_in"] = self._read
+
+    def close(self):
+        self._finish()
+        self._stream.close()
+
+    async def aclose(self):
+        self._finish()
+        await self._stream.aclose()
+
+
+def _start_call(request, logs):
+    service, target = classify(request.url)
+    call = {
+        "service": service,
+        "target": target,
+        "method": request.method,
+        "status": None,
+        "ms": 0.0,
+        "bytes_out": int(request.headers.get("content-length") or 0),
+        "bytes_in": 0,
+    }
+    for log in logs:
+        log.add(call)
+    return call
+
+
+def _finish_call(call, started, response=None):
+    call["ms"] = (time.perf_counter() - started) * 1000
+    if response is None:
+        call["status"] = "error"
+        return None
+    call["status"] = response.status_code
+    call["bytes_in"] = int(response.headers.get("content-length") or 0)
+    response.stream = _CountingStream(response.stream, call, started)
+    return response
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    def __init__(self, transport):
+        self._transport = transport
+
+    def handle_request(self, request):
+        logs = _active.get()
+        if not logs:
+            return self._transport.handle_request(request)
+
+        started = time.perf_counter()
+        call = _start_call(request, logs)
+        try:
+            response = self._transport.handle_request(request)
+        except Exception:
+            _finish_call(call, started)
+            raise
+        return _finish_call(call, started, response)
+
+    def close(self):
+        self._transport.close()
+
+
+class InstrumentedAsyncTransport(httpx.AsyncBaseTransport):
+    """InstrumentedTransport for the async clients; the CallLog context follows the task."""
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    async def handle_async_request(self, request):
+        logs = _active.get()
+        if not logs:
+            return await self._transport.handle_async_request(request)
+
+        started = time.perf_counter()
+        call = _start_call(request, logs)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            _finish_call(call, started)
+            raise
+        return _finish_call(call, started, response)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def server_timing(log):
+    """Server-Timing header value: the total plus one entry per service."""
+    entries = [f'supabase;dur={log.total_ms:.1f};desc="{log.count} calls"']
+    for service, (n, ms) in sorted(log.by_service().items()):
+        entries.append(f'sb-{service};dur={ms:.1f};desc="{n} calls"')
+    return ", ".join(entries)
+
+
+class SupabaseCallsMiddleware:
+    # async-capable, so it doesn't push async views back onto a thread under ASGI
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with record_calls() as log:
+            response = self.get_response(request)
+        return self._report(request, response, log)
+
+    async def __acall__(self, request):
+        with record_calls() as log:
+            response = await self.get_response(request)
+        return self._report(request, response, log)
+
+    def _report(self, request, response, log):
+        view = getattr(request, "resolver_match", None)
+        view_name = (view.view_name if view else None) or request.path
+        if log.count:
+            logger.info("supabase_calls %s", json.dumps({"view": view_name, "path": request.path, **log.summary()}))
+            if getattr(settings, "SUPABASE_SERVER_TIMING", False):
+                response["Server-Timing"] = server_timing(log)
+
+        budget = getattr(view.func, "supabase_query_budget", None) if view else None
+        if budget is not None and log.count > budget:
+            message = f"{view_name} made {log.count} Supabase calls (budget {budget}):\n{log.describe()}"
+            if getattr(settings, "SUPABASE_QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,242 @@
+"""
+A small background job queue for side effects that don't have to finish
+before the response: notifications, storage and request cleanup.
+
+    jobs.enqueue("notify", {...}, key=f"request-created:{req_id}")
+
+Jobs go to Redis (REDIS_URL) -- a ready list plus a sorted set of delayed
+jobs -- and fall back to the sharehub_job table when Redis can't be reached.
+`manage.py run_jobs` works both. A failing job is retried with exponential
+backoff up to its max_attempts, then parked in the dead list / marked failed.
+
+`key` makes enqueueing idempotent: a second job with the same key within
+JOBS_KEY_TTL seconds is dropped. Handlers must tolerate running more than
+once anyway (a worker can die after the side effect but before the ack).
+
+With JOBS_EAGER (the default when DEBUG is on) jobs run inline, as the code
+did before, so a dev setup needs no worker.
+
+Handlers are registered with @job(name) in sharehub/tasks.py.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+READY = "sharehub:jobs:ready"
+DELAYED = "sharehub:jobs:delayed"
+DEAD = "sharehub:jobs:dead"
+PROCESSING = "sharehub:jobs:processing:"
+HEARTBEAT = "sharehub:jobs:worker:"
+KEY_PREFIX = "sharehub:jobs:key:"
+
+_handlers = {}
+_redis = None
+# after a failed Redis call, enqueue goes straight to the database until then
+_redis_retry_at = 0.0
+
+
+def job(name):
+    """Register fn as the handler for jobs called `name`; it receives the payload dict."""
+    def register(fn):
+        _handlers[name] = fn
+        return fn
+    return register
+
+
+def _load_handlers():
+    from . import tasks  # noqa: F401  (registers handlers)
+
+
+def _redis_client():
+    global _redis
+    if _redis is None:
+        import redis
+
+        _redis = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=5, socket_connect_timeout=2)
+    return _redis
+
+
+def backoff_seconds(attempt):
+    base = getattr(settings, "JOBS_RETRY_BASE_SECONDS", 5)
+    cap = getattr(settings, "JOBS_RETRY_MAX_SECONDS", 3600)
+    return min(cap, base * 2 ** max(0, attempt - 1)) * random.uniform(0.8, 1.2)
+
+
+def run_job(entry):
+    """Run one job's handler. Returns None on success, else the error text."""
+    handler = _handlers.get(entry["name"])
+    if handler is None:
+        return f"no handler for job {entry['name']!r}"
+    started = time.perf_counter()
+    try:
+        handler(entry.get("payload") or {})
+    except Exception as e:
+        logger.warning("job %s %s failed (attempt %s): %s", entry["name"], entry["id"], entry.get("attempts"), e)
+        return f"{type(e).__name__}: {e}"
+    logger.info("job %s %s done in %.0f ms", entry["name"], entry["id"], (time.perf_counter() - started) * 1000)
+    return None
+
+
+# ---------- enqueue ----------
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=None):
+    """
+    Queue job `name` with a JSON-serialisable payload. Returns the job id, or
+    None when a job with the same key was already queued.
+    """
+    _load_handlers()
+    if name not in _handlers:
+        raise ValueError(f"Unknown job {name!r}")
+    entry = {
+        "id": str(uuid.uuid4()),
+        "name": name,
+        "payload": payload or {},
+        "key": key,
+        "attempts": 0,
+        "max_attempts": max_attempts or getattr(settings, "JOBS_MAX_ATTEMPTS", 5),
+    }
+
+    if getattr(settings, "JOBS_EAGER", False):
+        entry["attempts"] = 1
+        run_job(entry)
+        return entry["id"]
+
+    global _redis_retry_at
+    if getattr(settings, "JOBS_BACKEND", "redis") == "redis" and time.monotonic() >= _redis_retry_at:
+        try:
+            return _redis_enqueue(entry, delay)
+        except Exception as e:
+            logger.warning("jobs: Redis unavailable, queueing %s in the database: %s", name, e)
+            _redis_retry_at = time.monotonic() + 30
+    return _db_enqueue(entry, delay)
+
+
+def _redis_enqueue(entry, delay):
+    r = _redis_client()
+    if entry["key"] and not r.set(KEY_PREFIX + entry["key"], entry["id"], nx=True,
+                                   ex=getattr(settings, "JOBS_KEY_TTL", 86400)):
+        return None
+    raw = json.dumps(entry)
+    if delay > 0:
+        r.zadd(DELAYED, {raw: time.time() + delay})
+    else:
+        r.lpush(READY, raw)
+    return entry["id"]
+
+
+def _db_enqueue(entry, delay):
+    from .models import Job
+
+    try:
+        with transaction.atomic():
+            Job.objects.create(
+                id=uuid.UUID(entry["id"]), name=entry["name"], payload=entry["payload"], key=entry["key"],
+                max_attempts=entry["max_attempts"], run_at=timezone.now() + timedelta(seconds=delay),
+            )
+    except IntegrityError:
+        return None  # duplicate key
+    return entry["id"]
+
+
+# ---------- worker side ----------
+
+class RedisWorkerQueue:
+    def __init__(self):
+        self.r = _redis_client()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.processing = PROCESSING + self.worker_id
+
+    def heartbeat(self):
+        self.r.set(HEARTBEAT + self.worker_id, 1, ex=60)
+
+    def recover(self):
+        """Requeue jobs held by workers that stopped sending heartbeats."""
+        for key in self.r.scan_iter(PROCESSING + "*"):
+            key = key.decode() if isinstance(key, bytes) else key
+            worker_id = key[len(PROCESSING):]
+            if worker_id != self.worker_id and not self.r.exists(HEARTBEAT + worker_id):
+                while self.r.rpoplpush(key, READY):
+                    pass
+
+    def promote_due(self):
+        for raw in self.r.zrangebyscore(DELAYED, 0, time.time(), start=0, num=100):
+            # only the worker whose ZREM succeeds moves the job
+            if self.r.zrem(DELAYED, raw):
+                self.r.lpush(READY, raw)
+
+    def take(self, timeout):
+        if timeout > 0:
+            raw = self.r.blmove(READY, self.processing, timeout, "RIGHT", "LEFT")
+        else:
+            raw = self.r.lmove(READY, self.processing, "RIGHT", "LEFT")
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        entry["_raw"] = raw
+        entry["attempts"] = entry.get("attempts", 0) + 1
+        return entry
+
+    def finish(self, entry, error):
+        raw = entry.pop("_raw")
+        if error is not None:
+            entry["last_error"] = error
+            if entry["attempts"] < entry.get("max_attempts", 1):
+                self.r.zadd(DELAYED, {json.dumps(entry): time.time() + backoff_seconds(entry["attempts"])})
+            else:
+                logger.error("job %s %s gave up after %s attempts: %s", entry["name"], entry["id"], entry["attempts"], error)
+                self.r.lpush(DEAD, json.dumps(entry))
+                self.r.ltrim(DEAD, 0, 999)
+        self.r.lrem(self.processing, 1, raw)
+
+
+class DatabaseWorkerQueue:
+    def recover(self):
+        """Requeue jobs left running by a worker that died."""
+        from .models import Job
+
+        stale = timezone.now() - timedelta(seconds=getattr(settings, "JOBS_STALE_SECONDS", 600))
+        Job.objects.filter(status=Job.RUNNING, updated_at__lt=stale).update(status=Job.QUEUED)
+
+    def take(self):
+        from .models import Job
+
+        with transaction.atomic():
+            row = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(status=Job.QUEUED, run_at__lte=timezone.now())
+                .order_by("run_at")
+                .first()
+            )
+            if row is None:
+                return None
+            row.status = Job.RUNNING
+            row.attempts += 1
+            row.save(update_fields=["status", "attempts", "updated_at"])
+        return {"id": str(row.id), "name": row.name, "payload": row.payload,
+                "attempts": row.attempts, "max_attempts": row.max_attempts, "_row": row}
+
+    def finish(self, entry, error):
+        from .models import Job
+
+        row = entry.pop("_row")
+        if error is None:
+            row.status = Job.DONE
+        elif row.attempts < row.max_attempts:
+            row.status = Job.QUEUED
+            row.run_at = timezone.now() + timedelta(seconds=backoff_seconds(row.attempts))
+        else:
+            logger.error("job %s %s gave up after %s attempts: %s", row.name, row.id, row.attempts, error)
+            row.status = Job.FAILED
+        row.last_error = error or ""
+        row.save(update_fields=["status", "run_at", "last_error", "updated_at"])
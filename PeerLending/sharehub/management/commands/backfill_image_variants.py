@@ -0,0 +1,83 @@
+"""
+python manage.py backfill_image_variants [--limit N] [--dry-run]
+
+Creates thumb/card/full variants (sharehub.images) for item photos uploaded
+before the resize pipeline existed, and points item.image_url at the full
+variant. Items already on the variant layout are skipped, so the command can
+be re-run safely; the original objects are left in the bucket.
+"""
+import time
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+from sharehub import images
+from sharehub.supabase_client import get_service_client
+
+BATCH = 200
+
+
+class Command(BaseCommand):
+    help = "Generate resized variants for existing item images."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=0, help="stop after converting this many items")
+        parser.add_argument("--dry-run", action="store_true", help="only report what would be converted")
+
+    def _download(self, client, url):
+        path = images.object_path(url)
+        if path:
+            return client.storage.from_(images.bucket()).download(path)
+        resp = httpx.get(url, timeout=30, follow_redirects=True)
+        resp.raise_for_status()
+        return resp.content
+
+    def handle(self, *args, **options):
+        if images.Image is None:
+            raise CommandError("Pillow is not installed; run pip install -r requirements.txt")
+        client = get_service_client()
+        if client is None:
+            raise CommandError("SUPABASE_SERVICE_ROLE_KEY is required to write to storage")
+
+        limit, dry_run = options["limit"], options["dry_run"]
+        converted = skipped = failed = 0
+        start = 0
+        started = time.perf_counter()
+        while True:
+            rows = (
+                client.table("item").select("item_id,user_id,image_url")
+                .not_.is_("image_url", "null")
+                .order("item_id")
+                .range(start, start + BATCH - 1)
+                .execute()
+            ).data or []
+
+            for row in rows:
+                url = row.get("image_url") or ""
+                if not url or images.has_variants(url):
+                    skipped += 1
+                    continue
+                if dry_run:
+                    self.stdout.write(f"would convert {row['item_id']}: {url}")
+                    converted += 1
+                else:
+                    try:
+                        variants = images.make_variants(self._download(client, url))
+                        if not variants:
+                            raise ValueError("not a readable image")
+                        new_url = images.store_variants(client, row["user_id"], row["item_id"], variants)
+                        client.table("item").update({"image_url": new_url}).eq("item_id", row["item_id"]).execute()
+                        converted += 1
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f"{row['item_id']}: {e}")
+                if limit and converted >= limit:
+                    break
+            if (limit and converted >= limit) or len(rows) < BATCH:
+                break
+            start += BATCH
+
+        verb = "would convert" if dry_run else "converted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {converted}, skipped {skipped}, failed {failed} in {time.perf_counter() - started:.1f} s"
+        ))
@@ -0,0 +1,92 @@
+"""
+python manage.py bench_db [--requests 200]
+
+Measures what a request pays for its database connection. Each simulated
+request goes through the same connection handling Django applies around a real
+one (close_if_unusable_or_obsolete() when it starts and finishes) and runs
+one small query, against DATABASE_URL:
+
+  * per request  -- CONN_MAX_AGE=0, the old setting: connect (TLS to Postgres) every time
+  * persistent   -- DB_CONN_MAX_AGE / DB_CONN_HEALTH_CHECKS as configured
+  * pool         -- psycopg's pool, when DB_POOL is on
+
+and prints how many connections each mode opened and the p50/p95 per request.
+"""
+import copy
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.utils import load_backend
+
+from .bench_views import _percentile
+
+
+def _wrapper(settings_dict, alias):
+    return load_backend(settings_dict["ENGINE"]).DatabaseWrapper(settings_dict, alias)
+
+
+def _connects(conn, opened):
+    """Connections the server actually saw; checkouts from psycopg's pool also fire connection_created."""
+    pool = getattr(conn, "pool", None)
+    if pool is not None:
+        return pool.get_stats().get("connections_num", 0)
+    return sum(1 for c in opened if c is conn)
+
+
+def _request(conn):
+    conn.close_if_unusable_or_obsolete()  # request_started
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    conn.close_if_unusable_or_obsolete()  # request_finished
+
+
+class Command(BaseCommand):
+    help = "Compare per-request database connection overhead with and without persistent connections."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        configured = connections[alias].settings_dict
+        unpooled = copy.deepcopy(configured)
+        unpooled["OPTIONS"].pop("pool", None)
+
+        modes = [
+            ("per request", _wrapper(dict(unpooled, CONN_MAX_AGE=0), alias)),
+            ("persistent", _wrapper(dict(unpooled, CONN_MAX_AGE=settings.DB_CONN_MAX_AGE or 60), alias)),
+        ]
+        if configured["OPTIONS"].get("pool"):
+            modes.append(("pool", connections[alias]))
+
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection)
+
+        connection_created.connect(count)
+        try:
+            self.stdout.write(f"{configured['ENGINE'].rsplit('.', 1)[-1]}, {options['requests']} requests per mode")
+            self.stdout.write(f"{'mode':>12} {'connects':>8} {'p50 ms':>8} {'p95 ms':>8}")
+            for name, conn in modes:
+                _request(conn)  # the pool opens lazily; don't bill that to the first request
+                del opened[:]
+                before = _connects(conn, opened)
+                samples = []
+                for _ in range(options["requests"]):
+                    start = time.perf_counter()
+                    _request(conn)
+                    samples.append((time.perf_counter() - start) * 1000)
+                connects = _connects(conn, opened) - before
+                self.stdout.write(
+                    f"{name:>12} {connects:>8} {statistics.median(samples):>8.2f} {_percentile(samples, 95):>8.2f}"
+                )
+                conn.close()
+        finally:
+            connection_created.disconnect(count)
@@ -0,0 +1,73 @@
+"""
+python manage.py bench_query_plan [--latency 40] [--jitter 15] [--runs 50]
+
+Times the query plan `home` uses -- the same steps and dependencies, each
+sleeping for one simulated PostgREST round-trip (latency +- jitter ms, with
+two round-trips where the real step needs a lookup of display names) --
+run serially and on the QueryPlan pool, and prints p50/p95 for both.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from sharehub.query_plan import QueryPlan
+
+# step -> (round-trips, dependencies); mirrors sharehub.views.home
+HOME_STEPS = [
+    ("user_info", 2, []),            # profile row + auth email
+    ("notifications", 1, []),
+    ("my_items", 1, []),
+    ("incoming_requests", 2, ["my_items"]),   # requests + requester names
+    ("lent_out_count", 1, ["my_items"]),
+    ("available_items", 2, []),      # items + owner names
+    ("borrowed_items", 3, []),       # requests + items + owner names
+]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[k]
+
+
+class Command(BaseCommand):
+    help = "Compare serial vs. concurrent execution of the home view's query plan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--latency", type=float, default=40.0, help="ms per round-trip")
+        parser.add_argument("--jitter", type=float, default=15.0, help="+- ms per round-trip")
+        parser.add_argument("--runs", type=int, default=50)
+
+    def _plan(self, latency, jitter, serial):
+        def step(trips):
+            def run(*_deps):
+                for _ in range(trips):
+                    time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)) / 1000)
+                return trips
+            return run
+
+        plan = QueryPlan("bench_home", serial=serial)
+        for name, trips, after in HOME_STEPS:
+            plan.add(name, step(trips), after=after)
+        return plan
+
+    def handle(self, *args, **options):
+        latency, jitter, runs = options["latency"], options["jitter"], options["runs"]
+        timings = {}
+        for label, serial in (("serial", True), ("query plan", False)):
+            samples = []
+            for _ in range(runs):
+                plan = self._plan(latency, jitter, serial)
+                start = time.perf_counter()
+                plan.run()
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[label] = samples
+
+        self.stdout.write(f"{'mode':>12} {'p50 ms':>8} {'p95 ms':>8}")
+        for label, samples in timings.items():
+            self.stdout.write(f"{label:>12} {statistics.median(samples):>8.1f} {_percentile(samples, 95):>8.1f}")
+
+        speedup = statistics.median(timings["serial"]) / statistics.median(timings["query plan"])
+        self.stdout.write(self.style.SUCCESS(f"p50 speedup: {speedup:.1f}x"))
@@ -0,0 +1,74 @@
+"""
+python manage.py bench_search [--items 100000] [--runs 200]
+
+Builds the in-process search index (sharehub.search.InvertedIndex) over a
+synthetic catalog and prints p50/p95 query latency for typical searches,
+including prefix matches on a half-typed last word.
+"""
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+
+from sharehub.search import InvertedIndex
+
+CATEGORIES = ["textbooks", "calculators", "lab-equipment", "electronics", "other"]
+WORDS = (
+    "calculus physics chemistry biology algebra statistics engineering graphing scientific "
+    "casio texas instruments arduino raspberry breadboard multimeter oscilloscope beaker "
+    "microscope goggles lab coat notebook laptop charger cable hdmi adapter headphones "
+    "drawing tablet ruler compass protractor guitar tripod camera lens projector keyboard "
+    "mouse monitor speaker backpack umbrella stapler marker whiteboard anatomy economics "
+    "accounting programming python java networking circuits thermodynamics mechanics"
+).split()
+QUERIES = ["calculator", "graphing calc", "physics textbook", "lab goggles", "arduino", "micro",
+           "python programming", "hdmi cable", "scientific casio", "oscillo"]
+
+
+def _items(n):
+    now = datetime.now(timezone.utc)
+    rng = random.Random(42)
+    for i in range(n):
+        yield {
+            "item_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "title": " ".join(rng.sample(WORDS, 3)) + f" {i}",
+            "category": rng.choice(CATEGORIES),
+            "description": " ".join(rng.choices(WORDS, k=12)),
+            "condition": "good",
+            "user_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "created_at": (now - timedelta(minutes=i)).isoformat(),
+            "available": True,
+        }
+
+
+class Command(BaseCommand):
+    help = "Measure in-process item search latency on a synthetic catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=100000)
+        parser.add_argument("--runs", type=int, default=200)
+
+    def handle(self, *args, **options):
+        index = InvertedIndex()
+        start = time.perf_counter()
+        for item in _items(options["items"]):
+            index.add(item)
+        self.stdout.write(f"indexed {len(index)} items in {(time.perf_counter() - start):.1f} s")
+
+        samples = []
+        for i in range(options["runs"]):
+            query = QUERIES[i % len(QUERIES)]
+            start = time.perf_counter()
+            rows, total = index.search(query, limit=24)
+            samples.append((time.perf_counter() - start) * 1000)
+
+        samples.sort()
+        p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+        self.stdout.write(f"p50 {statistics.median(samples):.1f} ms   p95 {p95:.1f} ms")
+        if p95 < 50:
+            self.stdout.write(self.style.SUCCESS("p95 under 50 ms"))
+        else:
+            self.stdout.write(self.style.WARNING("p95 over 50 ms"))
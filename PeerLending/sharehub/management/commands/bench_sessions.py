@@ -0,0 +1,76 @@
+"""
+python manage.py bench_sessions [--loads 500] [--locmem]
+
+Measures what reading the session costs every signed-in page under each
+SESSION_BACKEND. A session shaped like the one login_view writes (user id,
+admin flag, email, Supabase tokens) is saved once, then loaded --loads times
+the way SessionMiddleware does on each request. Prints database queries per
+load and p50/p95 load time against the configured DATABASE_URL and REDIS_URL.
+
+--locmem puts the "cache" backend on a local in-memory cache instead of Redis,
+to see the cost of the code path without a Redis server.
+"""
+import statistics
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from .bench_views import _percentile
+
+ENGINES = [
+    ("db", "django.contrib.sessions.backends.db"),
+    ("cache", "sharehub.sessions"),
+    ("signed_cookies", "django.contrib.sessions.backends.signed_cookies"),
+]
+
+
+def _login_session(store):
+    # what login_view and auth_tokens.store_session put in the session
+    store["supabase_user_id"] = "8f14e45f-ceea-467f-a0e6-1b5f3f5d8b2c"
+    store["is_admin"] = False
+    store["user_email"] = "student@example.edu"
+    store["supabase_access_token"] = "x" * 900
+    store["supabase_refresh_token"] = "y" * 12
+    store["supabase_token_expires_at"] = int(time.time()) + 3600
+
+
+class Command(BaseCommand):
+    help = "Compare per-request session load cost of the db, cache and signed-cookie session backends."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loads", type=int, default=500)
+        parser.add_argument("--locmem", action="store_true", help="use a local memory cache instead of Redis")
+
+    def handle(self, *args, **options):
+        caches = dict(settings.CACHES)
+        if options["locmem"]:
+            caches["sessions"] = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench-sessions"}
+
+        self.stdout.write(f"{options['loads']} loads per backend")
+        self.stdout.write(f"{'backend':>15} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, engine in ENGINES:
+            with override_settings(SESSION_ENGINE=engine, CACHES=caches):
+                store_class = import_module(engine).SessionStore
+                store = store_class()
+                _login_session(store)
+                store.save()
+                key = store.session_key
+                store_class(key).load()  # warm connections and the cache
+
+                samples = []
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(options["loads"]):
+                        start = time.perf_counter()
+                        user_id = store_class(key).get("supabase_user_id")
+                        samples.append((time.perf_counter() - start) * 1000)
+                if not user_id:
+                    self.stderr.write(f"{name}: the saved session did not load back")
+                self.stdout.write(
+                    f"{name:>15} {len(queries) / options['loads']:>7.1f} "
+                    f"{statistics.median(samples):>8.3f} {_percentile(samples, 95):>8.3f}"
+                )
+                store.delete()
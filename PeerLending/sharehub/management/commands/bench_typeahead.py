@@ -0,0 +1,45 @@
+"""
+python manage.py bench_typeahead [--items 100000] [--runs 500]
+
+Builds the completion index (sharehub.typeahead.CompletionIndex) over a
+synthetic catalog and prints p50/p95 latency for prefixes as they are typed.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from sharehub.typeahead import CompletionIndex
+
+from .bench_search import _items
+
+PREFIXES = ["c", "ca", "cal", "calc", "g", "gra", "graphing c", "lab", "ar", "micro",
+            "py", "hdmi", "text", "osc", "el"]
+
+
+class Command(BaseCommand):
+    help = "Measure typeahead completion latency on a synthetic catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=100000)
+        parser.add_argument("--runs", type=int, default=500)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        index = CompletionIndex.build(_items(options["items"]))
+        self.stdout.write(f"indexed {len(index)} labels in {(time.perf_counter() - start):.1f} s")
+
+        samples = []
+        for i in range(options["runs"]):
+            prefix = PREFIXES[i % len(PREFIXES)]
+            start = time.perf_counter()
+            index.complete(prefix)
+            samples.append((time.perf_counter() - start) * 1000)
+
+        samples.sort()
+        p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+        self.stdout.write(f"p50 {statistics.median(samples):.2f} ms   p95 {p95:.2f} ms")
+        if p95 < 5:
+            self.stdout.write(self.style.SUCCESS("p95 under 5 ms"))
+        else:
+            self.stdout.write(self.style.WARNING("p95 over 5 ms"))
@@ -0,0 +1,80 @@
+"""
+SUPABASE_FAKE_DB=:memory: SUPABASE_FAKE_LATENCY_MS=40 python manage.py bench_views [--runs 20]
+
+Signs in a seeded user against the local Supabase stand-in
+(sharehub/fake_supabase.py) and requests the main pages and APIs through the
+Django test client, printing per view how many Supabase calls one request
+makes and its p50/p95 wall time at the configured round-trip latency.
+Seeds the stand-in first when it is empty.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from sharehub.instrumentation import record_calls
+from sharehub.supabase_client import get_fake_backend, get_service_client
+
+from .seed_fake_supabase import PASSWORD, seed
+
+VIEWS = [
+    ("home", "/home/"),
+    ("profile", "/profile/"),
+    ("borrow_items", "/borrow_items/"),
+    ("my_items", "/my-items/"),
+    ("return_items", "/return-items/"),
+    ("catalog_api", "/api/catalog/?sort=recent"),
+    ("search_api", "/api/search/?q=graphing+calculator"),
+    ("typeahead_api", "/api/typeahead/?q=cal"),
+    ("chat_heads", "/api/chat/heads/"),
+    ("chat_unread_count", "/api/chat/unread-count/"),
+]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[k]
+
+
+class Command(BaseCommand):
+    help = "Measure Supabase calls and latency per view against the local Supabase stand-in."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument("--user", type=int, default=1, help="index of the seeded user to sign in as")
+
+    def handle(self, *args, **options):
+        backend = get_fake_backend()
+        if backend is None:
+            raise CommandError("Set SUPABASE_FAKE_DB (e.g. :memory:) to run against the local stand-in.")
+        if not (get_service_client().table("user").select("id").limit(1).execute().data or []):
+            self.stdout.write("seeding the stand-in...")
+            seed(backend)
+
+        # sessions and jobs stay in memory so the benchmark needs no database
+        with override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies",
+                               JOBS_EAGER=True, SUPABASE_QUERY_BUDGET_STRICT=False):
+            client = Client(HTTP_HOST="localhost")
+            resp = client.post("/login/", {"email": f"user{options['user']}@example.edu", "password": PASSWORD})
+            if resp.status_code not in (200, 302) or not client.session.get("supabase_user_id"):
+                raise CommandError(f"sign-in against the stand-in failed (HTTP {resp.status_code})")
+
+            self.stdout.write(f"{'view':>18} {'status':>6} {'calls':>6} {'p50 ms':>8} {'p95 ms':>8}")
+            for name, url in VIEWS:
+                samples, calls, status = [], [], None
+                for i in range(options["runs"] + 1):
+                    with record_calls() as log:
+                        start = time.perf_counter()
+                        resp = client.get(url)
+                        elapsed = (time.perf_counter() - start) * 1000
+                    status = resp.status_code
+                    if i:  # the first request warms caches and in-process indexes
+                        samples.append(elapsed)
+                        calls.append(log.count)
+                self.stdout.write(
+                    f"{name:>18} {status:>6} {statistics.median(calls):>6.0f} "
+                    f"{statistics.median(samples):>8.1f} {_percentile(samples, 95):>8.1f}"
+                )
@@ -0,0 +1,105 @@
+"""
+SUPABASE_FAKE_DB=:memory: SUPABASE_FAKE_LATENCY_MS=40 python manage.py load_test [--clients 20] [--seconds 10]
+
+Drives the project's ASGI application in-process (the same handler daphne
+runs, minus the socket) with --clients concurrent signed-in users and reports,
+per view, requests/second for this one worker and p50/p95 latency -- once for
+the sync view and once for its async version under /async/, so the two can be
+compared at the configured round-trip latency to the local Supabase stand-in.
+Seeds the stand-in first when it is empty.
+"""
+import asyncio
+import statistics
+import time
+
+import httpx
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from sharehub.supabase_client import get_fake_backend, get_service_client
+
+from .bench_views import _percentile
+from .seed_fake_supabase import PASSWORD, seed
+
+# (name, sync url, async url)
+VIEWS = [
+    ("home", "/home/", "/async/home/"),
+    ("borrow_items", "/borrow_items/", "/async/borrow_items/"),
+    ("chat_heads", "/api/chat/heads/", "/async/api/chat/heads/"),
+    ("chat_unread_count", "/api/chat/unread-count/", "/async/api/chat/unread-count/"),
+]
+
+
+async def _sign_in(app, user):
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://localhost")
+    await client.get("/login/")  # sets the CSRF cookie
+    resp = await client.post("/login/", data={
+        "email": f"user{user}@example.edu",
+        "password": PASSWORD,
+        "csrfmiddlewaretoken": client.cookies.get("csrftoken", ""),
+    })
+    if resp.status_code not in (200, 302) or "sessionid" not in client.cookies:
+        await client.aclose()
+        raise CommandError(f"sign-in as user{user} against the stand-in failed (HTTP {resp.status_code})")
+    return client
+
+
+async def _hammer(client, url, deadline, samples, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        resp = await client.get(url)
+        samples.append((time.perf_counter() - start) * 1000)
+        if resp.status_code != 200:
+            errors.append(resp.status_code)
+
+
+async def _run(clients, url, seconds):
+    await asyncio.gather(*(client.get(url) for client in clients))  # warm caches and indexes
+    samples, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(_hammer(c, url, start + seconds, samples, errors) for c in clients))
+    return samples, errors, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = "Compare requests/second of the sync and async views under ASGI against the local Supabase stand-in."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=20, help="concurrent signed-in users")
+        parser.add_argument("--seconds", type=float, default=10, help="how long to load each view")
+        parser.add_argument("--users", type=int, default=5, help="seeded users to spread the clients over")
+        parser.add_argument("--view", action="append", help="only these views (repeatable)")
+
+    def handle(self, *args, **options):
+        backend = get_fake_backend()
+        if backend is None:
+            raise CommandError("Set SUPABASE_FAKE_DB (e.g. :memory:) to run against the local stand-in.")
+        if not (get_service_client().table("user").select("id").limit(1).execute().data or []):
+            self.stdout.write("seeding the stand-in...")
+            seed(backend)
+
+        views = [v for v in VIEWS if not options["view"] or v[0] in options["view"]]
+        # sessions and jobs stay in memory so the load test needs no database
+        with override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies",
+                               JOBS_EAGER=True, SUPABASE_QUERY_BUDGET_STRICT=False):
+            asyncio.run(self._load(views, options))
+
+    async def _load(self, views, options):
+        app = ASGIHandler()
+        clients = [await _sign_in(app, i % options["users"] + 1) for i in range(options["clients"])]
+        try:
+            self.stdout.write(f"{options['clients']} clients, {options['seconds']:g}s per view")
+            self.stdout.write(f"{'view':>18} {'mode':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+            for name, sync_url, async_url in views:
+                for mode, url in (("sync", sync_url), ("async", async_url)):
+                    samples, errors, elapsed = await _run(clients, url, options["seconds"])
+                    if not samples:
+                        continue
+                    self.stdout.write(
+                        f"{name:>18} {mode:>5} {len(samples) / elapsed:>8.1f} "
+                        f"{statistics.median(samples):>8.1f} {_percentile(samples, 95):>8.1f} {len(errors):>6}"
+                    )
+        finally:
+            for client in clients:
+                await client.aclose()
@@ -0,0 +1,80 @@
+"""
+python manage.py run_jobs [--once] [--poll 1.0]
+
+Runs background jobs (sharehub.jobs) from Redis and from the sharehub_job
+table fallback until stopped. --once drains what is due and exits, which is
+handy from cron or a one-off dyno.
+"""
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sharehub import jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued background jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="exit when no job is due")
+        parser.add_argument("--poll", type=float, default=1.0, help="seconds to wait when idle")
+
+    def handle(self, *args, **options):
+        jobs._load_handlers()
+        self.stopping = False
+        signal.signal(signal.SIGTERM, lambda *a: setattr(self, "stopping", True))
+
+        redis_queue = self._redis_queue()
+        db_queue = jobs.DatabaseWorkerQueue()
+        db_queue.recover()
+        if redis_queue:
+            redis_queue.recover()
+
+        processed = 0
+        last_housekeeping = time.monotonic()
+        try:
+            while not self.stopping:
+                entry = queue = None
+                if redis_queue:
+                    try:
+                        redis_queue.promote_due()
+                        entry = redis_queue.take(timeout=0 if options["once"] else options["poll"])
+                        queue = redis_queue
+                    except Exception as e:
+                        self.stderr.write(f"redis unavailable, polling the database only: {e}")
+                        redis_queue = None
+                if entry is None:
+                    entry, queue = db_queue.take(), db_queue
+
+                if entry is None:
+                    if options["once"]:
+                        break
+                    if not redis_queue:
+                        time.sleep(options["poll"])
+                else:
+                    queue.finish(entry, jobs.run_job(entry))
+                    processed += 1
+
+                if time.monotonic() - last_housekeeping > 30:
+                    last_housekeeping = time.monotonic()
+                    db_queue.recover()
+                    redis_queue = redis_queue or self._redis_queue()
+                    if redis_queue:
+                        redis_queue.heartbeat()
+                        redis_queue.recover()
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"processed {processed} job(s)"))
+
+    def _redis_queue(self):
+        if getattr(settings, "JOBS_BACKEND", "redis") != "redis":
+            return None
+        try:
+            queue = jobs.RedisWorkerQueue()
+            queue.heartbeat()
+            return queue
+        except Exception as e:
+            self.stderr.write(f"redis unavailable, polling the database only: {e}")
+            return None
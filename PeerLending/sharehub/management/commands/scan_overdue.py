@@ -0,0 +1,47 @@
+"""
+python manage.py scan_overdue [--loop] [--interval 300]
+
+Recomputes the due-soon / overdue state of active loans (sharehub.overdue)
+and queues the notifications for loans that just changed state. Run it from
+cron, or keep it running with --loop.
+"""
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sharehub import overdue
+
+
+class Command(BaseCommand):
+    help = "Refresh loan due/overdue states and notify borrowers and owners."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="keep scanning every --interval seconds")
+        parser.add_argument("--interval", type=float, default=getattr(settings, "OVERDUE_SCAN_INTERVAL", 300),
+                            help="seconds between scans with --loop")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, lambda *a: setattr(self, "stopping", True))
+
+        try:
+            while not self.stopping:
+                started = time.monotonic()
+                try:
+                    reported = overdue.refresh_due_states()
+                    self.stdout.write(f"scan done in {(time.monotonic() - started) * 1000:.0f} ms, "
+                                      f"{len(reported)} loan(s) changed state")
+                except Exception as e:
+                    if not options["loop"]:
+                        raise
+                    self.stderr.write(f"scan failed: {e}")
+                if not options["loop"]:
+                    break
+                # sleep in short steps so SIGTERM is honoured promptly
+                wake_at = started + options["interval"]
+                while not self.stopping and time.monotonic() < wake_at:
+                    time.sleep(min(1.0, wake_at - time.monotonic()))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,117 @@
+"""
+python manage.py seed_fake_supabase [--users 50] [--items 2000] [--requests 3000]
+
+Fills the local Supabase stand-in (SUPABASE_FAKE_DB, see
+sharehub/fake_supabase.py) with a synthetic campus: users who can sign in
+with password "password123", their items, borrow requests in every state,
+notifications and a few chat conversations. Deterministic for a given size.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sharehub.supabase_client import get_fake_backend
+
+from .bench_search import CATEGORIES, WORDS
+
+PASSWORD = "password123"
+
+
+def _id(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128)))
+
+
+def seed(backend, users=50, items=2000, requests=3000, conversations=100, seed=42):
+    """Write the synthetic data set; returns the seeded user ids (the first one is an admin)."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+
+    user_ids = []
+    profiles = []
+    for i in range(users):
+        email = f"user{i}@example.edu"
+        user_id = backend.create_user(email, PASSWORD, user_id=_id(rng))
+        user_ids.append(user_id)
+        profiles.append({
+            "id": user_id, "email": email, "first_name": f"User{i}", "last_name": rng.choice(WORDS).title(),
+            "college_dept": "CCS", "course": "BSIT", "year_level": str(rng.randint(1, 4)),
+            "profile_picture": None, "is_admin": i == 0, "is_block": False,
+            "created_at": (now - timedelta(days=rng.randint(30, 400))).isoformat(),
+        })
+    backend.insert_rows("user", profiles)
+
+    item_rows = []
+    for i in range(items):
+        item_rows.append({
+            "item_id": _id(rng), "user_id": rng.choice(user_ids),
+            "title": " ".join(rng.sample(WORDS, 3)).title() + f" {i}",
+            "description": " ".join(rng.choices(WORDS, k=12)),
+            "category": rng.choice(CATEGORIES), "condition": rng.choice(["new", "good", "fair"]),
+            "available": rng.random() < 0.8, "image_url": None,
+            "created_at": (now - timedelta(minutes=7 * i)).isoformat(),
+        })
+    backend.insert_rows("item", item_rows)
+
+    request_rows, notification_rows = [], []
+    for _ in range(requests):
+        item = rng.choice(item_rows)
+        # the first few users borrow a lot, so their pages are the heavy ones
+        borrower = rng.choice(user_ids[:5] if rng.random() < 0.5 else user_ids)
+        if borrower == item["user_id"]:
+            continue
+        requested = now - timedelta(days=rng.randint(0, 180), hours=rng.randint(0, 23))
+        status = rng.choice(["pending", "approved", "approved", "denied"])
+        returned = status == "approved" and rng.random() < 0.6
+        request_rows.append({
+            "request_id": _id(rng), "item_id": item["item_id"], "user_id": borrower, "status": status,
+            "request_date": requested.isoformat(),
+            "return_date": (requested + timedelta(days=rng.randint(1, 21))).isoformat(),
+            "return": returned,
+        })
+        notification_rows.append({
+            "notification_id": _id(rng), "user_id": item["user_id"], "notif_type": "request",
+            "message": f'New borrow request for "{item["title"]}".', "is_read": rng.random() < 0.7,
+            "created_at": requested.isoformat(),
+        })
+    backend.insert_rows("request", request_rows)
+    backend.insert_rows("notification", notification_rows)
+
+    conv_rows, part_rows, message_rows = [], [], []
+    for _ in range(conversations):
+        a, b = rng.sample(user_ids[:10], 2) if rng.random() < 0.5 else rng.sample(user_ids, 2)
+        started = now - timedelta(days=rng.randint(0, 60))
+        conv = {"id": _id(rng), "item_id": rng.choice(item_rows)["item_id"], "created_at": started.isoformat()}
+        conv_rows.append(conv)
+        part_rows += [{"id": _id(rng), "conversation_id": conv["id"], "user_id": u} for u in (a, b)]
+        for m in range(rng.randint(1, 30)):
+            message_rows.append({
+                "id": _id(rng), "conversation_id": conv["id"], "sender_id": rng.choice((a, b)),
+                "content": " ".join(rng.choices(WORDS, k=6)), "is_read": rng.random() < 0.8,
+                "created_at": (started + timedelta(minutes=5 * m)).isoformat(),
+            })
+    backend.insert_rows("conversations", conv_rows)
+    backend.insert_rows("conversation_participants", part_rows)
+    backend.insert_rows("messages", message_rows)
+    return user_ids
+
+
+class Command(BaseCommand):
+    help = "Fill the local Supabase stand-in with synthetic data."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--items", type=int, default=2000)
+        parser.add_argument("--requests", type=int, default=3000)
+        parser.add_argument("--conversations", type=int, default=100)
+
+    def handle(self, *args, **options):
+        backend = get_fake_backend()
+        if backend is None:
+            raise CommandError("SUPABASE_FAKE_DB is not set; refusing to seed a real Supabase project.")
+        seed(backend, options["users"], options["items"], options["requests"], options["conversations"])
+        self.stdout.write(self.style.SUCCESS(
+            f"seeded {options['users']} users (password {PASSWORD!r}), {options['items']} items, "
+            f"{options['requests']} requests, {options['conversations']} conversations"
+        ))
@@ -0,0 +1,38 @@
+"""
+Async-capable replacements for third-party middleware.
+
+Under ASGI, one sync-only entry near the top of MIDDLEWARE makes Django run
+the whole chain in sync mode: every request hops to a worker thread, and an
+async view below it is driven through async_to_sync -- a fresh event loop per
+request, so the async Supabase clients (pooled per loop) never reuse a
+connection. WhiteNoise's middleware is sync-only, so settings.py uses the
+subclass here: it serves static files the same way and otherwise hands the
+request straight to the async chain.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from django.db import migrations
+
+SQL_FILE = Path(__file__).resolve().parent.parent / "sql" / "admin_stats.sql"
+
+
+def create_admin_stats(apps, schema_editor):
+    # The Supabase tables only exist on PostgreSQL; elsewhere
+    # sharehub.admin_stats falls back to head-only count queries.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(SQL_FILE.read_text())
+
+
+def drop_admin_stats(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("drop function if exists public.admin_stats();")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sharehub', '0009_alter_customuser_table'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_admin_stats, drop_admin_stats),
+    ]
@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from django.db import migrations
+
+SQL_FILE = Path(__file__).resolve().parent.parent / "sql" / "catalog.sql"
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(SQL_FILE.read_text())
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "drop index if exists public.item_available_created_idx;"
+        "drop index if exists public.item_available_category_created_idx;"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sharehub', '0010_admin_stats_rpc'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from django.db import migrations
+
+SQL_FILE = Path(__file__).resolve().parent.parent / "sql" / "item_search.sql"
+
+
+def create_item_search(apps, schema_editor):
+    # elsewhere sharehub.search uses its in-process index
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(SQL_FILE.read_text())
+
+
+def drop_item_search(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "drop function if exists public.search_items(text, uuid, integer, integer, text[], text[]);"
+        "drop index if exists public.item_search_document_idx;"
+        "drop function if exists public.item_search_document(text, text, text);"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sharehub', '0011_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_item_search, drop_item_search),
+    ]
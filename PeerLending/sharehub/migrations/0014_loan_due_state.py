@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from django.db import migrations
+
+SQL_FILE = Path(__file__).resolve().parent.parent / "sql" / "loan_due_state.sql"
+
+
+def create_loan_due_state(apps, schema_editor):
+    # elsewhere sharehub.overdue works from the request rows directly
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(SQL_FILE.read_text())
+
+
+def drop_loan_due_state(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "drop function if exists public.refresh_loan_due_states(integer);"
+        "drop table if exists public.loan_due_state;"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sharehub', '0013_job_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_loan_due_state, drop_loan_due_state),
+    ]
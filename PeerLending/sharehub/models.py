@@ -2,6 +2,7 @@ from django.contrib.auth.models import AbstractUser, PermissionsMixin
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 import uuid
 
 class CustomUserManager(BaseUserManager):
@@ -82,4 +83,31 @@ class UserSettings(models.Model):
 
     def __str__(self):
         return f"{self.user.email}'s Settings"  
-  
\ No newline at end of file
+  
+
+# Database fallback for the background job queue (see sharehub/jobs.py)
+class Job(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "sharehub_job"
+        indexes = [models.Index(fields=["status", "run_at"], name="sharehub_job_due_idx")]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
@@ -0,0 +1,224 @@
+"""
+Due-soon / overdue state of active loans.
+
+`manage.py scan_overdue` (run with --loop, or from cron) calls
+refresh_due_states() every OVERDUE_SCAN_INTERVAL seconds. It recomputes the
+loan_due_state table (sharehub/sql/loan_due_state.sql) -- in one
+refresh_loan_due_states() call when that function is deployed, otherwise with
+a few PostgREST queries -- and queues one batch of notifications for loans
+that just became due soon or overdue.
+
+Views read the stored state through fetch_states(). Loans the last scan
+hasn't seen yet (approved since) are computed on the spot with due_state(),
+and when no recent scan exists at all (table missing, scanner not running)
+fetch_states() returns None and every loan is computed that way.
+"""
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+
+from .supabase_client import OptionalFeature, get_anon_client, get_service_client
+
+logger = logging.getLogger(__name__)
+
+STATE_OK = "ok"
+STATE_DUE_SOON = "due_soon"
+STATE_OVERDUE = "overdue"
+_RANK = {None: 0, STATE_OK: 0, STATE_DUE_SOON: 1, STATE_OVERDUE: 2}
+
+TRUTHY_RETURN = (True, "True", "true", 1, "1")
+
+_refresh_rpc_feature = OptionalFeature("refresh_loan_due_states RPC")
+# (checked_at, fresh) for the "has a recent scan run" check
+_freshness = (0.0, False)
+
+
+def _client():
+    return get_service_client() or get_anon_client()
+
+
+def _due_soon_hours():
+    return getattr(settings, "OVERDUE_DUE_SOON_HOURS", 24)
+
+
+def parse_due(value):
+    """A return_date as an aware UTC datetime, or None."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value) if isinstance(value, str) else value
+    except ValueError:
+        return None
+    if not isinstance(parsed, datetime):
+        return None
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed.astimezone(timezone.utc)
+
+
+def due_state(return_date, now=None):
+    """"ok", "due_soon" or "overdue" for a loan due at return_date; None without a date."""
+    due = parse_due(return_date)
+    if due is None:
+        return None
+    now = now or datetime.now(timezone.utc)
+    if due < now:
+        return STATE_OVERDUE
+    if due < now + timedelta(hours=_due_soon_hours()):
+        return STATE_DUE_SOON
+    return STATE_OK
+
+
+def state_for(loan, states, now=None):
+    """The stored state of a loan (a request row) if known, else computed from its return_date."""
+    if states is not None:
+        stored = states.get(str(loan.get("request_id")))
+        if stored:
+            return stored
+    return due_state(loan.get("return_date"), now)
+
+
+# ---------- reading ----------
+
+def _scan_is_fresh(client):
+    """True when a scan has refreshed loan_due_state recently enough to trust it."""
+    global _freshness
+    checked_at, fresh = _freshness
+    if time.monotonic() - checked_at < 60:
+        return fresh
+    max_age = 3 * getattr(settings, "OVERDUE_SCAN_INTERVAL", 300)
+    try:
+        resp = client.table("loan_due_state").select("updated_at").order("updated_at", desc=True).limit(1).execute()
+        rows = getattr(resp, "data", None) or []
+        last = parse_due(rows[0]["updated_at"]) if rows else None
+        fresh = last is not None and datetime.now(timezone.utc) - last < timedelta(seconds=max_age)
+    except Exception as e:
+        logger.info("overdue: stored states unavailable, computing per request: %s", e)
+        fresh = False
+    _freshness = (time.monotonic(), fresh)
+    return fresh
+
+
+def fetch_states(user_id=None, owner_id=None, client=None):
+    """
+    {request_id: state} from the last scan for a borrower (user_id) or lender
+    (owner_id), or None when there is no recent scan to read from.
+    """
+    client = client or _client()
+    if not getattr(settings, "OVERDUE_USE_PRECOMPUTED", True) or not _scan_is_fresh(client):
+        return None
+    q = client.table("loan_due_state").select("request_id,state")
+    if user_id:
+        q = q.eq("user_id", user_id)
+    if owner_id:
+        q = q.eq("owner_id", owner_id)
+    try:
+        rows = getattr(q.execute(), "data", None) or []
+    except Exception as e:
+        logger.warning("overdue: could not read loan_due_state: %s", e)
+        return None
+    return {r["request_id"]: r["state"] for r in rows}
+
+
+# ---------- scanning ----------
+
+def _refresh_rpc(client):
+    resp = client.rpc("refresh_loan_due_states", {"p_due_soon_hours": _due_soon_hours()}).execute()
+    data = getattr(resp, "data", None)
+    if not isinstance(data, list):
+        raise ValueError(f"unexpected refresh_loan_due_states() result: {data!r}")
+    return data
+
+
+def _refresh_by_queries(client):
+    """The same as refresh_loan_due_states(), from PostgREST queries."""
+    now = datetime.now(timezone.utc)
+    loans = (
+        client.table("request").select("request_id,user_id,item_id,return_date,return")
+        .ilike("status", "approved")
+        .not_.is_("return_date", "null")
+        .execute()
+    ).data or []
+    loans = [r for r in loans if r.get("return") not in TRUTHY_RETURN]
+
+    item_ids = list({r["item_id"] for r in loans if r.get("item_id")})
+    items = {}
+    if item_ids:
+        for it in client.table("item").select("item_id,title,user_id").in_("item_id", item_ids).execute().data or []:
+            items[it["item_id"]] = it
+
+    stored = {
+        r["request_id"]: r
+        for r in client.table("loan_due_state").select("request_id,return_date,notified_state").execute().data or []
+    }
+    active_ids = {str(r["request_id"]) for r in loans}
+    gone = [rid for rid in stored if rid not in active_ids]
+    if gone:
+        client.table("loan_due_state").delete().in_("request_id", gone).execute()
+
+    rows, reported = [], []
+    for r in loans:
+        rid = str(r["request_id"])
+        due = parse_due(r["return_date"])
+        if due is None:
+            continue
+        state = due_state(due, now)
+        item = items.get(r.get("item_id")) or {}
+        prev = stored.get(rid) or {}
+        notified = prev.get("notified_state") if parse_due(prev.get("return_date")) == due else None
+        if state != STATE_OK and _RANK[state] > _RANK.get(notified, 0):
+            notified = state
+            reported.append({
+                "request_id": rid, "user_id": str(r["user_id"]), "owner_id": item.get("user_id"),
+                "item_id": r.get("item_id"), "title": item.get("title"), "return_date": due.isoformat(),
+                "state": state,
+            })
+        rows.append({
+            "request_id": rid, "user_id": str(r["user_id"]), "owner_id": item.get("user_id"),
+            "item_id": r.get("item_id"), "return_date": due.isoformat(), "state": state,
+            "notified_state": notified, "updated_at": now.isoformat(),
+        })
+    for start in range(0, len(rows), 500):
+        client.table("loan_due_state").upsert(rows[start:start + 500], on_conflict="request_id").execute()
+    return reported
+
+
+def _notifications_for(reported):
+    rows = []
+    for loan in reported:
+        title = (loan.get("title") or "an item").replace('"', "'")
+        due = parse_due(loan.get("return_date"))
+        due_text = due.strftime("%b %d, %Y") if due else "its due date"
+        key = f"{loan['request_id']}:{loan['state']}:{loan.get('return_date')}"
+        if loan["state"] == STATE_DUE_SOON:
+            rows.append((loan["user_id"], f'"{title}" is due back on {due_text}.', "due_soon", key))
+        elif loan["state"] == STATE_OVERDUE:
+            rows.append((loan["user_id"], f'"{title}" is overdue; it was due on {due_text}.', "overdue", key))
+            if loan.get("owner_id"):
+                rows.append((loan["owner_id"], f'"{title}", which you lent out, is overdue (due {due_text}).',
+                             "overdue_owner", key + ":owner"))
+    return rows
+
+
+def refresh_due_states(client=None):
+    """Recompute loan_due_state and queue notifications. Returns the loans that changed state."""
+    global _freshness
+    from . import tasks
+
+    client = client or get_service_client()
+    if client is None:
+        raise RuntimeError("SUPABASE_SERVICE_ROLE_KEY is required to scan loans")
+    reported = None
+    if _refresh_rpc_feature.available and getattr(settings, "OVERDUE_USE_RPC", True):
+        try:
+            reported = _refresh_rpc(client)
+        except Exception as e:
+            _refresh_rpc_feature.failed(e)
+    if reported is None:
+        reported = _refresh_by_queries(client)
+    _freshness = (0.0, False)
+
+    notifications = _notifications_for(reported)
+    if notifications:
+        tasks.notify_many(notifications)
+    return reported
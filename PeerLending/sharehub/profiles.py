@@ -0,0 +1,133 @@
+"""
+Cached access to rows of the Supabase `user` table.
+
+Profiles change a few times per semester but were fetched with select("*")
+on almost every page. get_profile() serves them from the "profiles" cache
+(local LRU by default, Redis when PROFILE_CACHE_BACKEND=redis) for
+PROFILE_CACHE_TTL seconds. Anything that writes the row must call
+invalidate_profile() afterwards.
+
+resolve_display_names() turns a set of user ids into owner/requester/borrower
+labels with at most one query per page, sharing the same cache.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+from .supabase_client import get_anon_client
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CACHE_ALIAS = "profiles"
+
+
+def _cache():
+    try:
+        return caches[PROFILE_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return caches["default"]
+
+
+def _key(user_id):
+    return f"sharehub:profile:{user_id}"
+
+
+def get_profile(user_id, refresh=False):
+    """
+    Return the `user` row for user_id as a dict, or None if there is none.
+    Pass refresh=True to skip the cache (the fresh row is cached again).
+    """
+    if not user_id:
+        return None
+
+    cache = _cache()
+    key = _key(user_id)
+    if not refresh:
+        try:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            logger.warning("Profile cache read failed for %s: %s", user_id, e)
+
+    try:
+        resp = get_anon_client().table("user").select("*").eq("id", user_id).maybe_single().execute()
+        profile = getattr(resp, "data", None) or None
+    except Exception as e:
+        logger.warning("Error fetching profile for %s: %s", user_id, e)
+        return None
+
+    if profile:
+        try:
+            cache.set(key, profile, getattr(settings, "PROFILE_CACHE_TTL", 300))
+        except Exception as e:
+            logger.warning("Profile cache write failed for %s: %s", user_id, e)
+    return profile
+
+
+def invalidate_profile(user_id):
+    """Drop the cached row for user_id; call after every write to `user`."""
+    if not user_id:
+        return
+    try:
+        _cache().delete_many([_key(user_id), _name_key(user_id)])
+    except Exception as e:
+        logger.warning("Profile cache invalidation failed for %s: %s", user_id, e)
+
+
+def display_name(user):
+    """'First Last', falling back to email, then id."""
+    if not user:
+        return ""
+    return (
+        ((user.get("first_name") or "") + " " + (user.get("last_name") or "")).strip()
+        or user.get("email")
+        or user.get("id")
+    )
+
+
+def _name_key(user_id):
+    return f"sharehub:display_name:{user_id}"
+
+
+def resolve_display_names(user_ids):
+    """
+    Map each id in user_ids to its display name.
+
+    Names come from the profiles cache first; the misses are fetched in one
+    in_() query and cached. Ids that can't be resolved are left out, so
+    callers keep their own default via .get(user_id, default).
+    """
+    ids = {str(uid) for uid in user_ids if uid}
+    if not ids:
+        return {}
+
+    cache = _cache()
+    keys = {_name_key(uid): uid for uid in ids}
+    names = {}
+    try:
+        for key, name in cache.get_many(list(keys)).items():
+            names[keys[key]] = name
+    except Exception as e:
+        logger.warning("Display name cache read failed: %s", e)
+
+    missing = ids - set(names)
+    if missing:
+        try:
+            resp = get_anon_client().table("user").select("id,first_name,last_name,email").in_("id", sorted(missing)).execute()
+            fetched = {u.get("id"): display_name(u) for u in (getattr(resp, "data", None) or []) if u.get("id")}
+        except Exception as e:
+            logger.warning("Error resolving display names: %s", e)
+            fetched = {}
+        names.update(fetched)
+        if fetched:
+            try:
+                cache.set_many(
+                    {_name_key(uid): name for uid, name in fetched.items()},
+                    getattr(settings, "PROFILE_CACHE_TTL", 300),
+                )
+            except Exception as e:
+                logger.warning("Display name cache write failed: %s", e)
+    return names
@@ -0,0 +1,142 @@
+"""
+Run a view's independent Supabase queries concurrently.
+
+Each PostgREST call is a blocking HTTP round-trip, so a page that needs ten
+of them waits for ten in a row even when most don't depend on each other.
+A QueryPlan lists the steps and what each one needs; run() executes every
+step as soon as its dependencies are done, on a shared thread pool:
+
+    plan = QueryPlan()
+    plan.add("my_items", lambda: fetch_my_items(user_id), default=[])
+    plan.add("incoming", lambda items: fetch_incoming(items), after=["my_items"], default=[])
+    plan.add("available", lambda: fetch_available(user_id), default=[])
+    results = plan.run()          # {"my_items": [...], "incoming": [...], ...}
+
+A step that raises is logged and replaced by its `default`, which is what
+its dependents then receive -- the same "except: use []" fallback the views
+already had around each query.
+
+QUERY_PLAN_MAX_WORKERS sets the pool size; 0 runs plans serially in the
+calling thread (useful for debugging and for comparing timings).
+
+Async views use `await plan.arun()` instead: steps may then be coroutine
+functions (awaited on the event loop, e.g. queries on the clients from
+get_async_anon_client()), and plain functions are run in a worker thread so
+the cached sync helpers can be mixed in without blocking the loop.
+"""
+import asyncio
+import contextvars
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    workers = getattr(settings, "QUERY_PLAN_MAX_WORKERS", 8)
+    if workers <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query-plan")
+        return _executor
+
+
+class QueryPlan:
+    def __init__(self, name="plan", executor=None, serial=False):
+        self.name = name
+        self.steps = {}
+        self.timings = {}
+        self._executor = executor
+        self._serial = serial
+
+    def add(self, name, fn, after=(), default=None):
+        """
+        Register step `name`. fn is called with the results of the steps in
+        `after`, in that order, and its return value becomes this step's result.
+        """
+        if name in self.steps:
+            raise ValueError(f"Duplicate step {name!r} in {self.name}")
+        for dep in after:
+            if dep not in self.steps:
+                raise ValueError(f"Step {name!r} depends on unknown step {dep!r} in {self.name}")
+        self.steps[name] = (fn, tuple(after), default)
+        return self
+
+    def _call(self, name, args):
+        fn, _, default = self.steps[name]
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        except Exception as e:
+            logger.exception("%s: step %s failed: %s", self.name, name, e)
+            return default
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+
+    def run(self):
+        """Execute every step and return {step name: result}."""
+        results = {}
+        executor = None if self._serial else (self._executor or _get_executor())
+
+        if executor is None:
+            # steps are registered after their dependencies, so insertion order works
+            for name, (_, after, _) in self.steps.items():
+                results[name] = self._call(name, [results[d] for d in after])
+            return results
+
+        pending = dict(self.steps)
+        running = {}
+        while pending or running:
+            for name in [n for n, (_, after, _) in pending.items() if all(d in results for d in after)]:
+                after = pending.pop(name)[1]
+                # each step runs in a copy of the caller's context (request-scoped call accounting)
+                ctx = contextvars.copy_context()
+                running[executor.submit(ctx.run, self._call, name, [results[d] for d in after])] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+        return results
+
+    async def _acall(self, name, deps):
+        fn, _, default = self.steps[name]
+        args = [await d for d in deps]
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(fn):
+                return await fn(*args)
+            result = await asyncio.to_thread(fn, *args)
+            # e.g. a lambda returning a coroutine
+            return await result if inspect.isawaitable(result) else result
+        except Exception as e:
+            logger.exception("%s: step %s failed: %s", self.name, name, e)
+            return default
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+
+    async def arun(self):
+        """run() for async views: every step starts as soon as its dependencies are done."""
+        if self._serial or getattr(settings, "QUERY_PLAN_MAX_WORKERS", 8) <= 0:
+            results = {}
+            for name, (_, after, _) in self.steps.items():
+                results[name] = await self._acall(name, [_done(results[d]) for d in after])
+            return results
+
+        tasks = {}
+        for name, (_, after, _) in self.steps.items():
+            tasks[name] = asyncio.ensure_future(self._acall(name, [tasks[d] for d in after]))
+        values = await asyncio.gather(*tasks.values())
+        return dict(zip(tasks, values))
+
+
+async def _done(value):
+    return value
@@ -0,0 +1,65 @@
+"""
+Live notification delivery: every socket a user has open on
+ws/notifications/ (sharehub.consumers.NotificationConsumer) joins
+notification_group(user_id), and the notification jobs in sharehub/tasks.py
+push each row there right after writing it, so the bell updates without a
+page load.
+
+Delivery is best-effort (sharehub/channel_layer.py); the notification table
+stays the source of truth and is what a page load renders.
+"""
+from datetime import datetime
+
+from channels.layers import get_channel_layer
+
+from . import channel_layer
+
+
+def notification_group(user_id):
+    return channel_layer.group_name("sharehub.notifications", user_id)
+
+
+def created_at_human(created):
+    try:
+        dt = datetime.fromisoformat(created) if isinstance(created, str) else created
+        return dt.strftime("%b %d, %Y • %I:%M %p")
+    except Exception:
+        return created or ""
+
+
+def _event(row):
+    return {
+        "type": "notification.new",
+        "notification": {
+            "notification_id": row.get("notification_id"),
+            "message": row.get("message"),
+            "notif_type": row.get("notif_type"),
+            "created_at": row.get("created_at"),
+            "created_at_human": created_at_human(row.get("created_at")),
+        },
+    }
+
+
+async def apush_notifications(rows):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    for row in rows:
+        if row.get("user_id"):
+            await layer.group_send(notification_group(row["user_id"]), _event(row))
+
+
+async def apush_read(user_id):
+    layer = get_channel_layer()
+    if layer is not None and user_id:
+        await layer.group_send(notification_group(user_id), {"type": "notification.read"})
+
+
+def push_notifications(rows):
+    """Send freshly written notification rows to their users' open sockets."""
+    channel_layer.send(apush_notifications, rows, what="notification push")
+
+
+def push_read(user_id):
+    """Tell the user's other tabs that their notifications were marked read."""
+    channel_layer.send(apush_read, user_id, what="notification push")
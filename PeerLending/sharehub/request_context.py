@@ -0,0 +1,79 @@
+"""
+Request-scoped user data shared by the views and the user_context processor.
+
+home, profile, borrow_items, ... and sharehub.views.user_context all need the
+same profile row, auth email and notifications. get_user_context(request)
+returns one object per request whose pieces are fetched at most once, and
+only when a view or template actually reads them.
+"""
+import logging
+
+from django.utils.functional import cached_property
+
+from .profiles import get_profile
+from . import auth_service, auth_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class RequestUserContext:
+    def __init__(self, request):
+        self.request = request
+        self.user_id = request.session.get("supabase_user_id")
+
+    @cached_property
+    def user_info(self):
+        """The user's profile row, with email taken from Supabase Auth."""
+        if not self.user_id:
+            return None
+
+        user_info = get_profile(self.user_id) or {}
+
+        # email comes from Supabase Auth (source of truth): the claims of the
+        # session's verified access token, or an admin lookup for sessions
+        # that predate stored tokens
+        if user_info:
+            session = self.request.session
+            claims = auth_tokens.session_claims(self.request)
+            if claims and claims.get("email"):
+                user_info["email"] = claims["email"]
+                if session.get("user_email") != claims["email"]:
+                    session["user_email"] = claims["email"]
+                return user_info
+            try:
+                auth_user_resp = auth_service.admin().get_user_by_id(self.user_id)
+                if auth_user_resp.user:
+                    user_info["email"] = auth_user_resp.user.email
+                    session["user_email"] = auth_user_resp.user.email
+            except Exception as e:
+                logger.warning("Error fetching auth email for %s: %s", self.user_id, e)
+                if session.get("user_email"):
+                    user_info["email"] = session.get("user_email")
+
+        return user_info
+
+    @cached_property
+    def _notifications(self):
+        from .views import fetch_notifications_for
+        return fetch_notifications_for(self.user_id)
+
+    def set_notifications(self, notifications, unread_count):
+        """Use a (notifications, unread_count) pair fetched elsewhere, e.g. by an async view."""
+        self.__dict__["_notifications"] = (notifications, unread_count)
+
+    @property
+    def notifications(self):
+        return self._notifications[0]
+
+    @property
+    def unread_count(self):
+        return self._notifications[1]
+
+
+def get_user_context(request):
+    """Return the RequestUserContext for this request, creating it on first use."""
+    ctx = getattr(request, "_sharehub_user_context", None)
+    if ctx is None:
+        ctx = RequestUserContext(request)
+        request._sharehub_user_context = ctx
+    return ctx
@@ -0,0 +1,248 @@
+"""
+Ranked full-text search over item title, category and description.
+
+On PostgreSQL the search_items() SQL function (sharehub/sql/item_search.sql)
+matches a GIN-indexed tsvector and ranks with ts_rank_cd. Where it isn't
+deployed -- the SQLite dev setup never runs that migration -- search falls
+back to an in-process inverted index over the available items, loaded from
+Supabase on first use, rebuilt every SEARCH_INDEX_TTL seconds and patched
+by add_item / edit_item / delete_item in between.
+
+Both return (rows, total) with rows in catalog shape (see sharehub.catalog).
+"""
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+
+from .catalog import CATALOG_COLUMNS, iter_available_items
+from .supabase_client import OptionalFeature
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# title matches outrank category matches, which outrank description matches
+FIELD_WEIGHTS = (("title", 3.0), ("category", 2.0), ("description", 1.0))
+
+
+def tokenize(text):
+    return _TOKEN.findall((text or "").lower())
+
+
+def _recency_bonus(created_at):
+    """A tie-breaker far below any real score difference: newer is larger."""
+    try:
+        ts = datetime.fromisoformat(str(created_at)).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+    return ts * 1e-15
+
+
+class InvertedIndex:
+    """
+    term -> {item_id: weighted term frequency}, scored tf-idf style.
+
+    Every query term must match (AND); the last one also matches as a
+    prefix so results follow the user while they type.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.docs = {}
+        self._doc_terms = {}
+        self._recency = {}
+        self._vocab = None
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, item):
+        item_id = item.get("item_id")
+        if not item_id:
+            return
+        self.remove(item_id)
+        if not item.get("available", True):
+            return
+
+        weights = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS:
+            for term in tokenize(item.get(field)):
+                weights[term] += weight
+        for term, w in weights.items():
+            if term not in self.postings:
+                self._vocab = None
+            self.postings[term][item_id] = w
+        self.docs[item_id] = {k: item.get(k) for k in CATALOG_COLUMNS.split(",")}
+        self._doc_terms[item_id] = tuple(weights)
+        self._recency[item_id] = _recency_bonus(item.get("created_at"))
+
+    def remove(self, item_id):
+        for term in self._doc_terms.pop(item_id, ()):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(item_id, None)
+            if not posting:
+                del self.postings[term]
+                self._vocab = None
+        self.docs.pop(item_id, None)
+        self._recency.pop(item_id, None)
+
+    def _prefix_terms(self, prefix):
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        vocab = self._vocab
+        i = bisect_left(vocab, prefix)
+        while i < len(vocab) and vocab[i].startswith(prefix):
+            yield vocab[i]
+            i += 1
+
+    def _postings_for(self, term, prefix=False):
+        """[(posting, idf)] for one query term, or every term it prefixes."""
+        n = len(self.docs) or 1
+        terms = self._prefix_terms(term) if prefix else ([term] if term in self.postings else [])
+        return [(self.postings[t], math.log(1 + n / len(self.postings[t]))) for t in terms]
+
+    def search(self, query, viewer_id=None, limit=20, offset=0, categories=None, conditions=None):
+        terms = tokenize(query)
+        if not terms:
+            return [], 0
+
+        per_term = [self._postings_for(t) for t in terms[:-1]]
+        per_term.append(self._postings_for(terms[-1], prefix=True))
+        if not all(per_term):
+            return [], 0
+
+        # one (posting, idf) per query term; a prefix counts once, with the
+        # best-scoring of its expansions
+        weighted = []
+        for postings in per_term:
+            if len(postings) == 1:
+                weighted.append(postings[0])
+                continue
+            merged = {}
+            for posting, idf in postings:
+                for item_id, w in posting.items():
+                    s = w * idf
+                    if s > merged.get(item_id, 0.0):
+                        merged[item_id] = s
+            weighted.append((merged, 1.0))
+
+        # candidates: items matching every term; set intersections run in C,
+        # starting from the rarest term, and only survivors get scored
+        weighted.sort(key=lambda pw: len(pw[0]))
+        candidates = weighted[0][0].keys()
+        for posting, _ in weighted[1:]:
+            candidates = candidates & posting.keys()
+            if not candidates:
+                return [], 0
+
+        if viewer_id or categories or conditions:
+            docs = self.docs
+            candidates = [
+                i for i in candidates
+                if (not viewer_id or docs[i].get("user_id") != viewer_id)
+                and (not categories or docs[i].get("category") in categories)
+                and (not conditions or docs[i].get("condition") in conditions)
+            ]
+
+        # the recency bonus makes equal ranks list newer items first
+        recency = self._recency
+        (p1, f1), rest = weighted[0], weighted[1:]
+        if not rest:
+            scores = {i: p1[i] * f1 + recency[i] for i in candidates}
+        elif len(rest) == 1:
+            (p2, f2), = rest
+            scores = {i: p1[i] * f1 + p2[i] * f2 + recency[i] for i in candidates}
+        else:
+            scores = {i: recency[i] + sum(p[i] * f for p, f in weighted) for i in candidates}
+
+        total = len(scores)
+        docs = self.docs
+        top = heapq.nlargest(offset + limit, scores, key=scores.get)
+        rows = []
+        for item_id in top[offset:]:
+            row = dict(docs[item_id])
+            row["rank"] = round(scores[item_id], 4)
+            rows.append(row)
+        return rows, total
+
+
+_index = None
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+_search_rpc_feature = OptionalFeature("search_items RPC")
+
+
+def _load_index(client):
+    index = InvertedIndex()
+    for row in iter_available_items(client):
+        index.add(row)
+    return index
+
+
+def index_built():
+    return _index is not None
+
+
+def get_local_index(client):
+    global _index, _index_built_at
+    ttl = getattr(settings, "SEARCH_INDEX_TTL", 300)
+    with _index_lock:
+        if _index is None or time.monotonic() - _index_built_at > ttl:
+            started = time.perf_counter()
+            _index = _load_index(client)
+            _index_built_at = time.monotonic()
+            logger.info("search: indexed %d items in %.0f ms", len(_index), (time.perf_counter() - started) * 1000)
+        return _index
+
+
+def index_item(item):
+    """Add or refresh one item in the local index, if it has been built."""
+    with _index_lock:
+        if _index is not None:
+            _index.add(item)
+
+
+def unindex_item(item_id):
+    with _index_lock:
+        if _index is not None:
+            _index.remove(item_id)
+
+
+def _search_rpc(client, query, viewer_id, limit, offset, categories, conditions):
+    resp = client.rpc("search_items", {
+        "p_query": query,
+        "p_viewer": viewer_id,
+        "p_limit": limit,
+        "p_offset": offset,
+        "p_categories": list(categories) or None,
+        "p_conditions": list(conditions) or None,
+    }).execute()
+    data = getattr(resp, "data", None) or {}
+    return data.get("results") or [], data.get("total") or 0
+
+
+def search_items(client, query, viewer_id=None, limit=20, offset=0, categories=(), conditions=()):
+    """Ranked available items matching query, excluding viewer_id's own."""
+    if not (query or "").strip():
+        return [], 0
+    if _search_rpc_feature.available and getattr(settings, "SEARCH_USE_RPC", True):
+        try:
+            return _search_rpc(client, query, viewer_id, limit, offset, categories, conditions)
+        except Exception as e:
+            _search_rpc_feature.failed(e)
+    index = get_local_index(client)
+    with _index_lock:
+        return index.search(
+            query, viewer_id=viewer_id, limit=limit, offset=offset,
+            categories=set(categories), conditions=set(conditions),
+        )
@@ -0,0 +1,133 @@
+"""
+Session engine for SESSION_BACKEND="cache": sessions in Redis, backed by the database.
+
+Every signed-in request reads its session (supabase_user_id, is_admin,
+user_email and the Supabase tokens). With the database engine that is a query
+per request; here it is a Redis GET. Sessions are still written through to
+the django_session table -- only at login, token refresh and logout -- so a
+flushed or restarted Redis doesn't sign anyone out: a cache miss reads the row
+and puts it back in the cache.
+
+When Redis can't be reached the store carries on from the database alone and
+leaves Redis alone for CACHE_RETRY_SECONDS, so an outage costs one connect
+timeout per worker every half minute instead of one per request. Sessions
+changed while Redis was away are dropped from it when it returns.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "sharehub.session."
+CACHE_RETRY_SECONDS = 30
+
+_cache_retry_at = 0.0
+# set while the cache is skipped; sessions saved meanwhile may be stale in it
+_stale_keys = set()
+
+
+class _FailSafeCache:
+    """The few cache calls the session store makes; a failure switches the cache off for a while."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def _available(self):
+        return time.monotonic() >= _cache_retry_at
+
+    def _failed(self, op, e):
+        global _cache_retry_at
+        _cache_retry_at = time.monotonic() + CACHE_RETRY_SECONDS
+        logger.warning("Session cache %s failed, using the database for %ss: %s", op, CACHE_RETRY_SECONDS, e)
+
+    def _recovered(self):
+        if _stale_keys:
+            keys = list(_stale_keys)
+            self.cache.delete_many(keys)
+            _stale_keys.difference_update(keys)
+
+    async def _arecovered(self):
+        if _stale_keys:
+            keys = list(_stale_keys)
+            await self.cache.adelete_many(keys)
+            _stale_keys.difference_update(keys)
+
+    def get(self, key):
+        if not self._available():
+            return None
+        try:
+            self._recovered()
+            return self.cache.get(key)
+        except Exception as e:
+            self._failed("get", e)
+            return None
+
+    def set(self, key, value, timeout):
+        if not self._available():
+            _stale_keys.add(key)
+            return
+        try:
+            self.cache.set(key, value, timeout)
+        except Exception as e:
+            _stale_keys.add(key)
+            self._failed("set", e)
+
+    def delete(self, key):
+        if not self._available():
+            _stale_keys.add(key)
+            return
+        try:
+            self.cache.delete(key)
+        except Exception as e:
+            _stale_keys.add(key)
+            self._failed("delete", e)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    # the async session API (request.session.aget() in async views) awaits these;
+    # Django's cache backends implement them by running the sync calls in a thread
+    async def aget(self, key):
+        if not self._available():
+            return None
+        try:
+            await self._arecovered()
+            return await self.cache.aget(key)
+        except Exception as e:
+            self._failed("get", e)
+            return None
+
+    async def aset(self, key, value, timeout):
+        if not self._available():
+            _stale_keys.add(key)
+            return
+        try:
+            await self.cache.aset(key, value, timeout)
+        except Exception as e:
+            _stale_keys.add(key)
+            self._failed("set", e)
+
+    async def adelete(self, key):
+        if not self._available():
+            _stale_keys.add(key)
+            return
+        try:
+            await self.cache.adelete(key)
+        except Exception as e:
+            _stale_keys.add(key)
+            self._failed("delete", e)
+
+    def __str__(self):
+        return str(self.cache)
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._cache = _FailSafeCache(caches[settings.SESSION_CACHE_ALIAS])
@@ -0,0 +1,45 @@
+-- admin_stats(): every number on the admin dashboard in one round-trip,
+-- computed in Postgres instead of downloading user/item/request.
+-- Called from sharehub.admin_stats via
+--   server_client.rpc("admin_stats", {})
+-- Applied by sharehub/migrations/0010_admin_stats_rpc.py (PostgreSQL only).
+--
+-- `return` has been stored both as boolean and as text ('True'/'true'),
+-- so it is compared through its text form.
+
+create index if not exists request_status_idx on public.request (lower(status));
+
+create or replace function public.admin_stats()
+returns json
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    with r as (
+        select
+            lower(coalesce(status, '')) as status,
+            lower(coalesce("return"::text, '')) in ('true', 't', '1') as returned,
+            return_date::timestamptz as due
+        from public.request
+    )
+    select json_build_object(
+        'total_users', (select count(*) from public."user"),
+        'total_items', (select count(*) from public.item),
+        'available_items', (select count(*) from public.item where available),
+        'active_requests', (select count(*) from r where status in ('pending', 'approved')),
+        'pending_requests', (select count(*) from r where status = 'pending'),
+        'overdue', (select count(*) from r where status = 'approved' and not returned and due < now()),
+        'total_lent', (select count(*) from r where status in ('approved', 'returned')),
+        'currently_borrowed', (select count(*) from r where status = 'approved' and not returned),
+        -- return performance: returned loans count as on time, open loans past due as late
+        'on_time', (select count(*) from r where status in ('approved', 'returned') and returned),
+        'late', (select count(*) from r where status = 'approved' and not returned and due < now()),
+        'generated_at', now()
+    );
+$$;
+
+-- aggregate numbers only, but still admin-only: the server calls it with the service role
+revoke all on function public.admin_stats() from public;
+revoke all on function public.admin_stats() from anon, authenticated;
+grant execute on function public.admin_stats() to service_role;
@@ -0,0 +1,11 @@
+-- Keyset pagination for the borrow_items catalog (sharehub/catalog.py):
+-- available items ordered by (created_at, item_id), optionally narrowed by
+-- category or condition.
+-- Applied by sharehub/migrations/0011_catalog_indexes.py (PostgreSQL only).
+
+create index if not exists item_available_created_idx
+    on public.item (created_at desc, item_id desc)
+    where available;
+create index if not exists item_available_category_created_idx
+    on public.item (category, created_at desc, item_id desc)
+    where available;
@@ -0,0 +1,64 @@
+-- Full-text search over item title, category and description.
+-- Called from sharehub.search via
+--   client.rpc("search_items", {"p_query": ..., "p_viewer": ..., "p_limit": ..., "p_offset": ...,
+--                               "p_categories": [...] | null, "p_conditions": [...] | null})
+-- Applied by sharehub/migrations/0012_item_search.py (PostgreSQL only).
+--
+-- The tsvector is an indexed expression rather than a stored column so that
+-- the many select("*") queries on item don't start shipping it to clients.
+
+create or replace function public.item_search_document(p_title text, p_category text, p_description text)
+returns tsvector
+language sql
+immutable
+parallel safe
+as $$
+    select setweight(to_tsvector('english'::regconfig, coalesce(p_title, '')), 'A')
+        || setweight(to_tsvector('english'::regconfig, coalesce(p_category, '')), 'B')
+        || setweight(to_tsvector('english'::regconfig, coalesce(p_description, '')), 'C');
+$$;
+
+create index if not exists item_search_document_idx
+    on public.item
+    using gin (public.item_search_document(title, category, description))
+    where available;
+
+create or replace function public.search_items(
+    p_query text,
+    p_viewer uuid default null,
+    p_limit integer default 20,
+    p_offset integer default 0,
+    p_categories text[] default null,
+    p_conditions text[] default null
+)
+returns json
+language sql
+stable
+as $$
+    with q as (
+        select websearch_to_tsquery('english', p_query) as tsq
+    ),
+    hits as (
+        select
+            i.item_id, i.title, i.description, i.category, i.condition,
+            i.image_url, i.user_id, i.created_at, i.available,
+            ts_rank_cd(public.item_search_document(i.title, i.category, i.description), q.tsq) as rank
+        from public.item i, q
+        where i.available
+          and public.item_search_document(i.title, i.category, i.description) @@ q.tsq
+          and (p_viewer is null or i.user_id <> p_viewer)
+          and (p_categories is null or i.category = any(p_categories))
+          and (p_conditions is null or i.condition = any(p_conditions))
+    )
+    select json_build_object(
+        'total', (select count(*) from hits),
+        'results', coalesce((
+            select json_agg(h order by h.rank desc, h.created_at desc)
+            from (
+                select * from hits
+                order by rank desc, created_at desc
+                limit greatest(p_limit, 0) offset greatest(p_offset, 0)
+            ) h
+        ), '[]'::json)
+    );
+$$;
@@ -0,0 +1,108 @@
+-- loan_due_state: the due/overdue state of every active loan (approved, not
+-- returned, with a return date), recomputed by refresh_loan_due_states() from
+-- `manage.py scan_overdue` so pages read a state instead of re-deriving it.
+-- Read and written through sharehub.overdue.
+-- Applied by sharehub/migrations/0014_loan_due_state.py (PostgreSQL only).
+--
+-- Ids are kept as text so the table doesn't depend on how request/item ids
+-- are typed; `return` is compared through its text form as in admin_stats.sql.
+
+create table if not exists public.loan_due_state (
+    request_id text primary key,
+    user_id text not null,          -- borrower
+    owner_id text,
+    item_id text,
+    return_date timestamptz not null,
+    state text not null check (state in ('ok', 'due_soon', 'overdue')),
+    -- last state a notification was sent for; cleared when the due date moves
+    notified_state text,
+    updated_at timestamptz not null default now()
+);
+
+create index if not exists loan_due_state_user_idx on public.loan_due_state (user_id, state);
+create index if not exists loan_due_state_updated_idx on public.loan_due_state (updated_at desc);
+
+-- only the service role reads this table
+alter table public.loan_due_state enable row level security;
+
+-- Recompute every active loan's state and return the loans that just became
+-- due soon or overdue (each reported once) as a json array of
+-- {request_id, user_id, owner_id, item_id, title, return_date, state}.
+create or replace function public.refresh_loan_due_states(p_due_soon_hours integer default 24)
+returns json
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    result json;
+begin
+    -- one scan at a time; a concurrent call has nothing to report
+    if not pg_try_advisory_xact_lock(hashtext('refresh_loan_due_states')) then
+        return '[]'::json;
+    end if;
+
+    create temporary table active_loans on commit drop as
+    select
+        r.request_id::text as request_id,
+        r.user_id::text as user_id,
+        i.user_id::text as owner_id,
+        r.item_id::text as item_id,
+        r.return_date::timestamptz as due
+    from public.request r
+    left join public.item i on i.item_id = r.item_id
+    where lower(coalesce(r.status, '')) = 'approved'
+      and lower(coalesce(r."return"::text, '')) not in ('true', 't', '1')
+      and r.return_date is not null;
+
+    -- returned, denied and deleted loans drop out
+    delete from public.loan_due_state s
+    where not exists (select 1 from active_loans a where a.request_id = s.request_id);
+
+    insert into public.loan_due_state as s (request_id, user_id, owner_id, item_id, return_date, state, updated_at)
+    select
+        a.request_id, a.user_id, a.owner_id, a.item_id, a.due,
+        case
+            when a.due < now() then 'overdue'
+            when a.due < now() + make_interval(hours => p_due_soon_hours) then 'due_soon'
+            else 'ok'
+        end,
+        now()
+    from active_loans a
+    on conflict (request_id) do update set
+        user_id = excluded.user_id,
+        owner_id = excluded.owner_id,
+        item_id = excluded.item_id,
+        return_date = excluded.return_date,
+        state = excluded.state,
+        updated_at = excluded.updated_at,
+        notified_state = case when s.return_date = excluded.return_date then s.notified_state end;
+
+    with reported as (
+        update public.loan_due_state s
+        set notified_state = s.state
+        where s.state in ('due_soon', 'overdue')
+          and s.notified_state is distinct from s.state
+          and not (s.state = 'due_soon' and s.notified_state = 'overdue')
+        returning s.*
+    )
+    select coalesce(json_agg(json_build_object(
+        'request_id', d.request_id,
+        'user_id', d.user_id,
+        'owner_id', d.owner_id,
+        'item_id', d.item_id,
+        'title', i.title,
+        'return_date', d.return_date,
+        'state', d.state
+    )), '[]'::json)
+    into result
+    from reported d
+    left join public.item i on i.item_id::text = d.item_id;
+
+    return result;
+end;
+$$;
+
+revoke all on function public.refresh_loan_due_states(integer) from public;
+revoke all on function public.refresh_loan_due_states(integer) from anon, authenticated;
+grant execute on function public.refresh_loan_due_states(integer) to service_role;
@@ -182,9 +182,8 @@ document.addEventListener('DOMContentLoaded', function () {
     }
   }
 
-  // wire opening interactions
-  // In borrow_items.js, update the click handler:
-  document.querySelectorAll('.item-box').forEach(function (card) {
+  // wire opening interactions (also called for cards loaded while scrolling)
+  function bindItemCard(card) {
     card.addEventListener('click', function (ev) {
       const t = ev.target;
 
@@ -200,15 +199,16 @@ document.addEventListener('DOMContentLoaded', function () {
 
       openBorrowModalFromElement(card, false);
     });
-  });
 
-  const requestButtons = Array.from(document.querySelectorAll('.request-btn'));
-  requestButtons.forEach(button => {
-    button.addEventListener('click', function (ev) {
-      ev.stopPropagation();
-      openBorrowModalFromElement(this, true);
+    card.querySelectorAll('.request-btn').forEach(button => {
+      button.addEventListener('click', function (ev) {
+        ev.stopPropagation();
+        openBorrowModalFromElement(this, true);
+      });
     });
-  });
+  }
+
+  document.querySelectorAll('.item-box').forEach(bindItemCard);
 
   if (showRequestFormBtn) {
     showRequestFormBtn.addEventListener('click', function (e) {
@@ -336,23 +336,189 @@ document.addEventListener('DOMContentLoaded', function () {
     });
   }
 
+  // ---------- Catalog paging (/api/catalog/, see sharehub/catalog.py) ----------
+  // borrow_items renders the first page; the grid carries the cursor for the next one.
+  const catalogGrid = document.querySelector('.available-items.borrow-grid');
+  const catalogSentinel = document.getElementById('catalogSentinel');
+  const availableTotalEl = document.getElementById('availableTotal');
+  const catalogPaged = !!(catalogGrid && catalogGrid.hasAttribute('data-next-cursor'));
+  const catalog = {
+    cursor: catalogPaged ? (catalogGrid.dataset.nextCursor || null) : null,
+    sort: 'recent',
+    query: '',
+    categories: [],
+    conditions: [],
+    loading: false,
+    generation: 0
+  };
+
+  function getItemCards() {
+    return Array.from(document.querySelectorAll('.item-box, .item-card'));
+  }
+
+  function escapeHtml(str) {
+    return String(str == null ? '' : str)
+      .replace(/&/g, '&amp;')
+      .replace(/</g, '&lt;')
+      .replace(/>/g, '&gt;')
+      .replace(/"/g, '&quot;')
+      .replace(/'/g, '&#39;');
+  }
+
+  // same markup as the {% for item in available_items %} loop in borrow_items.html
+  function renderItemCard(item) {
+    const card = document.createElement('div');
+    card.className = 'item-box';
+    card.dataset.itemId = item.item_id || '';
+    card.dataset.title = item.title || '';
+    card.dataset.image = item.image_url || '';
+    card.dataset.ownerName = item.owner_display || '';
+    card.dataset.ownerId = item.owner_id || item.user_id || '';
+    card.dataset.category = item.category || '';
+    card.dataset.condition = item.condition || '';
+    card.dataset.description = item.description || '';
+    card.dataset.createdAt = item.created_at_iso || item.created_at || '';
+
+    const thumb = item.image_url
+      ? `<img src="${escapeHtml(item.thumb_url || item.image_url)}" alt="${escapeHtml(item.title)}" loading="lazy">`
+      : `<div style="display:flex;align-items:center;justify-content:center;color:#999;">
+          <i class="fas fa-box-open" style="font-size:48px;"></i>
+        </div>`;
+
+    card.innerHTML = `
+      <div class="report-dots">
+        <i class="fas fa-ellipsis-v"></i>
+      </div>
+      <div class="report-dropdown">
+        <button type="button" class="report-issue-btn" data-item-id="${escapeHtml(item.item_id)}"
+          data-item-title="${escapeHtml(item.title)}"
+          data-owner-id="${escapeHtml(item.owner_id || item.user_id || '')}"
+          data-owner-name="${escapeHtml(item.owner_display)}">
+          <i class="fas fa-flag"></i>
+          Report Issue
+        </button>
+      </div>
+      <div class="item-meta">
+        <div class="item-title">${escapeHtml(item.title)}</div>
+        <div class="item-cat">${escapeHtml(item.category)}</div>
+      </div>
+      <div class="item-thumb">${thumb}</div>
+      <div class="item-actions">
+        <button class="request-btn" type="button" data-item="${escapeHtml(item.title)}"
+          data-owner="${escapeHtml(item.owner_display)}">
+          Request to Borrow
+        </button>
+        <button type="button" class="message-btn" aria-label="Message owner">
+          <i class="fas fa-comment-dots"></i>
+        </button>
+      </div>`;
+
+    card.querySelector('.message-btn').addEventListener('click', function () {
+      if (window.startChat) window.startChat(item.item_id);
+    });
+    bindItemCard(card);
+    if (window.bindReportButtons) window.bindReportButtons(card);
+    return card;
+  }
+
+  // with a search term, pages come ranked from /api/search/ and the "cursor" is the page number
+  function catalogUrl(cursor) {
+    const params = new URLSearchParams();
+    catalog.categories.forEach(c => params.append('category', c));
+    catalog.conditions.forEach(c => params.append('condition', c));
+    if (catalog.query) {
+      params.set('q', catalog.query);
+      params.set('page', cursor || '1');
+      return `/api/search/?${params.toString()}`;
+    }
+    if (cursor) params.set('cursor', cursor);
+    params.set('sort', catalog.sort);
+    return `/api/catalog/?${params.toString()}`;
+  }
+
+  function sentinelNearViewport() {
+    if (!catalogSentinel) return false;
+    return catalogSentinel.getBoundingClientRect().top < window.innerHeight + 400;
+  }
+
+  // reset=true reloads from the first page (filters or sort changed)
+  async function loadCatalogPage(reset = false) {
+    if (!catalogPaged) return;
+    if (!reset && (catalog.loading || !catalog.cursor)) return;
+
+    const generation = reset ? ++catalog.generation : catalog.generation;
+    catalog.loading = true;
+    try {
+      const res = await fetch(catalogUrl(reset ? null : catalog.cursor), { credentials: 'same-origin' });
+      if (!res.ok) throw new Error(`Catalog request failed: ${res.status}`);
+      const data = await res.json();
+      if (generation !== catalog.generation) return; // superseded by a newer reset
+
+      if (reset) catalogGrid.querySelectorAll('.item-box').forEach(n => n.remove());
+      (data.results || []).forEach(item => catalogGrid.appendChild(renderItemCard(item)));
+      if (catalog.query) catalog.cursor = data.has_more ? String((data.page || 1) + 1) : null;
+      else catalog.cursor = data.next_cursor || null;
+      if (availableTotalEl && typeof data.total === 'number') availableTotalEl.textContent = data.total;
+      document.dispatchEvent(new CustomEvent('catalog:loaded', { detail: { reset } }));
+    } catch (e) {
+      console.error('Failed to load items:', e);
+    } finally {
+      if (generation === catalog.generation) catalog.loading = false;
+    }
+
+    // short pages can leave the sentinel on screen, which won't re-trigger the observer
+    if (generation === catalog.generation && catalog.cursor && sentinelNearViewport()) {
+      loadCatalogPage(false);
+    }
+  }
+
+  if (catalogPaged && catalogSentinel && 'IntersectionObserver' in window) {
+    new IntersectionObserver(entries => {
+      if (entries.some(e => e.isIntersecting)) loadCatalogPage(false);
+    }, { rootMargin: '400px 0px' }).observe(catalogSentinel);
+  }
+
   // ---------- Simple search filtering ----------
   const searchInput = document.querySelector('.search-input');
-  const itemCards = Array.from(document.querySelectorAll('.item-box, .item-card'));
-  if (searchInput && itemCards.length) {
+
+  function cardMatchesSearch(card, term) {
+    if (!term) return true;
+    const itemName = (card.querySelector('.item-title')?.textContent || card.querySelector('h3')?.textContent || '').toLowerCase();
+    const ownerName = (card.getAttribute('data-owner-name') || card.querySelector('.item-owner')?.textContent || '').toLowerCase();
+    const description = (card.getAttribute('data-description') || card.querySelector('.item-description')?.textContent || '').toLowerCase();
+    return itemName.includes(term) || ownerName.includes(term) || description.includes(term);
+  }
+
+  function applySearch() {
+    const term = searchInput ? searchInput.value.toLowerCase().trim() : '';
+    const cards = getItemCards();
+    cards.forEach(card => {
+      card.style.display = cardMatchesSearch(card, term) ? '' : 'none';
+    });
+    const found = cards.some(c => c.style.display !== 'none');
+    window.hideTemplateNoResults && window.hideTemplateNoResults(!found);
+    window.maybeShowJSNoResults && window.maybeShowJSNoResults(!found);
+  }
+
+  let searchTimer = null;
+  if (searchInput && catalogPaged) {
+    // server-side ranked search over the whole catalog, not just the loaded cards
     searchInput.addEventListener('input', function () {
-      const searchTerm = this.value.toLowerCase().trim();
-      itemCards.forEach(card => {
-        const itemName = (card.querySelector('.item-title')?.textContent || card.querySelector('h3')?.textContent || '').toLowerCase();
-        const ownerName = (card.getAttribute('data-owner-name') || card.querySelector('.item-owner')?.textContent || '').toLowerCase();
-        const description = (card.getAttribute('data-description') || card.querySelector('.item-description')?.textContent || '').toLowerCase();
-        const matches = itemName.includes(searchTerm) || ownerName.includes(searchTerm) || description.includes(searchTerm);
-        card.style.display = matches ? '' : 'none';
-      });
-      const found = itemCards.some(c => c.style.display !== 'none');
+      clearTimeout(searchTimer);
+      searchTimer = setTimeout(() => {
+        const term = searchInput.value.trim();
+        if (term === catalog.query) return;
+        catalog.query = term;
+        loadCatalogPage(true);
+      }, 250);
+    });
+    document.addEventListener('catalog:loaded', function () {
+      const found = getItemCards().length > 0;
       window.hideTemplateNoResults && window.hideTemplateNoResults(!found);
-      maybeShowJSNoResults(!found);
+      window.maybeShowJSNoResults && window.maybeShowJSNoResults(!found);
     });
+  } else if (searchInput && getItemCards().length) {
+    searchInput.addEventListener('input', applySearch);
   }
 
   // ---------- FILTER POPUP + FILTERING LOGIC (POPUP BELOW BUTTON) ----------
@@ -405,91 +571,15 @@ document.addEventListener('DOMContentLoaded', function () {
       if (show) hideTemplateNoResults(true);
       else hideTemplateNoResults(false);
     }
+    window.maybeShowJSNoResults = maybeShowJSNoResults;
 
+    // category/condition/sort are applied server-side, by /api/catalog/ or,
+    // while a search term is set, by /api/search/
     function applyFilters() {
-      const selectedCats = categoryCheckboxes.filter(ch => ch.checked).map(ch => ch.value);
-      const selectedConds = conditionCheckboxes.filter(ch => ch.checked).map(ch => ch.value);
-      const sortVal = sortSelect ? sortSelect.value : 'recent';
-
-      let anyVisible = false;
-      const cards = itemCards.length ? itemCards : Array.from(document.querySelectorAll('.item-box, .item-card'));
-      cards.forEach(card => {
-        const cardCat = (card.getAttribute('data-category') || '').toLowerCase();
-        const cardCond = (card.getAttribute('data-condition') || '').toLowerCase();
-
-        let catOk = true;
-        if (selectedCats.length) {
-          catOk = selectedCats.includes(cardCat);
-        }
-        let condOk = true;
-        if (selectedConds.length) {
-          condOk = selectedConds.includes(cardCond);
-        }
-
-        let searchOk = true;
-        if (searchInput && searchInput.value.trim()) {
-          const term = searchInput.value.toLowerCase().trim();
-          const itemName = (card.querySelector('.item-title')?.textContent || card.querySelector('h3')?.textContent || '').toLowerCase();
-          const ownerName = (card.getAttribute('data-owner-name') || card.querySelector('.item-owner')?.textContent || '').toLowerCase();
-          const description = (card.getAttribute('data-description') || card.querySelector('.item-description')?.textContent || '').toLowerCase();
-          searchOk = itemName.includes(term) || ownerName.includes(term) || description.includes(term);
-        }
-
-        const visible = catOk && condOk && searchOk;
-        card.style.display = visible ? '' : 'none';
-        if (visible) anyVisible = true;
-      });
-
-      // --- Robust sorting: read multiple possible attributes and parse dates safely ---
-      if (sortVal && (sortVal === 'recent' || sortVal === 'oldest')) {
-        const grid = document.querySelector('.available-items.borrow-grid') || document.querySelector('.available-items') || document.querySelector('.borrow-grid');
-        if (grid) {
-          const visibleCards = Array.from(grid.querySelectorAll('.item-box, .item-card')).filter(n => n.style.display !== 'none');
-
-          function getCardTimestamp(card) {
-            // try dataset.createdAt, data-created-at, data-created_at, attribute, or .item-date inner text
-            const candidates = [
-              card.dataset.createdAt,
-              card.getAttribute('data-created-at'),
-              card.getAttribute('data-created_at'),
-              card.getAttribute('data_created_at'),
-              card.getAttribute('data_created-at'),
-              (card.querySelector('.item-date') && card.querySelector('.item-date').textContent),
-              (card.querySelector('.created-at') && card.querySelector('.created-at').textContent)
-            ];
-            for (let v of candidates) {
-              if (!v) continue;
-              const s = String(v).trim();
-              if (!s) continue;
-              const ts = Date.parse(s);
-              if (!isNaN(ts)) return ts;
-              // if looks like YYYY-MM-DD without time, Date.parse usually works; else try to normalize simple dates
-              const maybeIso = s.replace(/\//g, '-'); // convert slashes to dashes
-              const ts2 = Date.parse(maybeIso);
-              if (!isNaN(ts2)) return ts2;
-            }
-            // fallback: return 0 so missing dates go to the bottom for "recent", top for "oldest" logic handled below
-            return 0;
-          }
-
-          visibleCards.sort((a, b) => {
-            const ta = getCardTimestamp(a);
-            const tb = getCardTimestamp(b);
-
-            // both 0 -> keep original order (stable)
-            if (ta === 0 && tb === 0) return 0;
-            if (ta === 0) return sortVal === 'recent' ? 1 : -1;
-            if (tb === 0) return sortVal === 'recent' ? -1 : 1;
-
-            return sortVal === 'recent' ? (tb - ta) : (ta - tb);
-          });
-
-          visibleCards.forEach(n => grid.appendChild(n));
-        }
-      }
-
-      maybeShowJSNoResults(!anyVisible);
-      hideTemplateNoResults(!anyVisible);
+      catalog.categories = categoryCheckboxes.filter(ch => ch.checked).map(ch => ch.value);
+      catalog.conditions = conditionCheckboxes.filter(ch => ch.checked).map(ch => ch.value);
+      catalog.sort = sortSelect && sortSelect.value === 'oldest' ? 'oldest' : 'recent';
+      loadCatalogPage(true);
     }
 
     // small debounce helper for scroll/wheel/touchmove closing
@@ -577,9 +667,7 @@ document.addEventListener('DOMContentLoaded', function () {
         categoryCheckboxes.forEach(ch => ch.checked = false);
         conditionCheckboxes.forEach(ch => ch.checked = false);
         if (sortSelect) sortSelect.value = 'recent';
-        itemCards.forEach(c => c.style.display = '');
-        maybeShowJSNoResults(false);
-        hideTemplateNoResults(false);
+        applyFilters();
       });
     }
 
@@ -74,6 +74,19 @@
     let activeConversation = null;
     let channel = null;
     let headsInterval = null;
+    let convSocket = null;
+    let userSocket = null;
+    let userSocketRetry = 1000;
+    // keyset cursors returned by /api/chat/<id>/messages/ ("<created_at>|<id>")
+    let oldestCursor = null;
+    let newestCursor = null;
+    let hasOlder = false;
+    let loadingOlder = false;
+
+    function wsUrl(path) {
+      const scheme = window.location.protocol === "https:" ? "wss" : "ws";
+      return `${scheme}://${window.location.host}/${path}`;
+    }
 
     // Initialize emoji picker
     initEmojiPicker();
@@ -371,19 +384,146 @@
       chatWindow.style.display = "flex";
       messagesEl.innerHTML = "<div class='loading'>Loading messages...</div>";
 
+      oldestCursor = null;
+      newestCursor = null;
+      hasOlder = false;
+
       try {
         const res = await fetch(`/api/chat/${convId}/messages/`);
         if (!res.ok) throw new Error(`Messages request failed: ${res.status}`);
         const j = await res.json();
         const msgs = j.results || [];
         messagesEl.innerHTML = "";
-        msgs.forEach((m) => appendMessage(m.sender_id, m.content, m.created_at));
+        msgs.forEach((m) => appendMessage(m.sender_id, m.content, m.created_at, m.id));
+        oldestCursor = j.prev_cursor || null;
+        newestCursor = j.next_cursor || null;
+        hasOlder = !!j.has_more;
         messagesEl.scrollTop = messagesEl.scrollHeight;
       } catch (e) {
         console.error("Failed to fetch messages:", e);
         messagesEl.innerHTML = "<div class='error'>Failed to load messages.</div>";
       }
 
+      openConversationSocket(convId);
+    }
+
+    function messageCursor(m) {
+      return m && m.id && m.created_at ? `${m.created_at}|${m.id}` : null;
+    }
+
+    // Older history is fetched a page at a time when the user scrolls to the top.
+    async function loadOlderMessages() {
+      if (!activeConversation || !hasOlder || loadingOlder || !oldestCursor) return;
+      const convId = activeConversation;
+      loadingOlder = true;
+      try {
+        const res = await fetch(`/api/chat/${convId}/messages/?before=${encodeURIComponent(oldestCursor)}`);
+        if (!res.ok) throw new Error(`Messages request failed: ${res.status}`);
+        const j = await res.json();
+        if (convId !== activeConversation) return;
+
+        const prevHeight = messagesEl.scrollHeight;
+        const msgs = j.results || [];
+        for (let i = msgs.length - 1; i >= 0; i--) {
+          appendMessage(msgs[i].sender_id, msgs[i].content, msgs[i].created_at, msgs[i].id, true);
+        }
+        oldestCursor = j.prev_cursor || oldestCursor;
+        hasOlder = !!j.has_more;
+        // keep the viewport on the message the user was looking at
+        messagesEl.scrollTop += messagesEl.scrollHeight - prevHeight;
+      } catch (e) {
+        console.warn("Failed to load older messages:", e);
+      } finally {
+        loadingOlder = false;
+      }
+    }
+
+    // Anything sent since the last message we have (e.g. while the socket was connecting).
+    async function loadNewerMessages() {
+      const convId = activeConversation;
+      if (!convId || !newestCursor) return;
+      try {
+        let more = true;
+        while (more && convId === activeConversation) {
+          const res = await fetch(`/api/chat/${convId}/messages/?after=${encodeURIComponent(newestCursor)}`);
+          if (!res.ok) throw new Error(`Messages request failed: ${res.status}`);
+          const j = await res.json();
+          if (convId !== activeConversation) return;
+          (j.results || []).forEach((m) => appendMessage(m.sender_id, m.content, m.created_at, m.id));
+          newestCursor = j.next_cursor || newestCursor;
+          more = !!j.has_more && (j.results || []).length > 0;
+        }
+        messagesEl.scrollTop = messagesEl.scrollHeight;
+      } catch (e) {
+        console.warn("Failed to load newer messages:", e);
+      }
+    }
+
+    if (messagesEl) {
+      messagesEl.addEventListener("scroll", () => {
+        if (messagesEl.scrollTop < 40) loadOlderMessages();
+      });
+    }
+
+    // Live messages come over our own websocket (chat.consumer.ChatConsumer);
+    // Supabase realtime is only used when the socket can't be opened.
+    function openConversationSocket(convId) {
+      closeConversationSocket();
+
+      let opened = false;
+      let socket;
+      try {
+        socket = new WebSocket(wsUrl(`ws/chat/${encodeURIComponent(convId)}/`));
+      } catch (e) {
+        console.warn("Chat websocket unavailable:", e);
+        subscribeSupabase(convId);
+        return;
+      }
+      convSocket = socket;
+
+      socket.addEventListener("open", () => {
+        opened = true;
+        loadNewerMessages();
+      });
+      socket.addEventListener("message", (ev) => {
+        let data;
+        try {
+          data = JSON.parse(ev.data);
+        } catch (e) {
+          return;
+        }
+        if (data.type === "message" && data.message && String(data.message.conversation_id) === String(activeConversation)) {
+          const m = data.message;
+          appendMessage(m.sender_id, m.content, m.created_at, m.id);
+          newestCursor = messageCursor(m) || newestCursor;
+          messagesEl.scrollTop = messagesEl.scrollHeight;
+        } else if (data.type === "error") {
+          console.warn("chat socket error:", data.error);
+        }
+      });
+      socket.addEventListener("close", () => {
+        if (convSocket === socket) convSocket = null;
+        if (!opened && activeConversation === convId) subscribeSupabase(convId);
+      });
+    }
+
+    function closeConversationSocket() {
+      if (convSocket) {
+        const socket = convSocket;
+        convSocket = null;
+        try {
+          socket.close();
+        } catch (e) {}
+      }
+      if (channel) {
+        try {
+          channel.unsubscribe();
+        } catch (err) {}
+        channel = null;
+      }
+    }
+
+    function subscribeSupabase(convId) {
       if (channel) {
         try {
           channel.unsubscribe();
@@ -402,6 +542,7 @@
               try {
                 const newMsg = payload.new;
                 appendMessage(newMsg.sender_id, newMsg.content, newMsg.created_at, newMsg.id);
+                newestCursor = messageCursor(newMsg) || newestCursor;
                 messagesEl.scrollTop = messagesEl.scrollHeight;
               } catch (err) {
                 console.error("error handling realtime payload", err, payload);
@@ -420,12 +561,7 @@
       activeConversation = null;
       if (chatWindow) chatWindow.style.display = "none";
       if (messagesEl) messagesEl.innerHTML = "";
-      if (channel) {
-        try {
-          channel.unsubscribe();
-        } catch (e) {}
-        channel = null;
-      }
+      closeConversationSocket();
       clearSelectedHeads();
       setPopupHeaderTitle("Chats");
       
@@ -436,7 +572,7 @@
       }
     }
 
-    function appendMessage(senderId, text, when, msgId) {
+    function appendMessage(senderId, text, when, msgId, prepend) {
       if (!messagesEl) return;
 
       if (msgId && messagesEl.querySelector(`[data-msg-id="${msgId}"]`)) {
@@ -460,7 +596,8 @@
       else bubble.style.marginRight = "auto";
 
       row.appendChild(bubble);
-      messagesEl.appendChild(row);
+      if (prepend) messagesEl.insertBefore(row, messagesEl.firstChild);
+      else messagesEl.appendChild(row);
     }
 
     if (chatForm && chatInput) {
@@ -474,6 +611,11 @@
         if (!txt) return;
         chatInput.value = "";
 
+        if (convSocket && convSocket.readyState === WebSocket.OPEN) {
+          convSocket.send(JSON.stringify({ type: "message", content: txt }));
+          return;
+        }
+
         try {
           const res = await fetch(`/api/chat/${activeConversation}/post/`, {
             method: "POST",
@@ -575,14 +717,77 @@
       }
     }
 
+    function applyHeadUpdate(data) {
+      const headEl = chatList && chatList.querySelector(`.chat-head[data-conv="${data.conversation_id}"]`);
+      if (!headEl) {
+        if (chatPopup && chatPopup.style.display === "block") loadChatHeads();
+        return;
+      }
+      const sub = headEl.querySelector(".head-sub");
+      if (sub) sub.textContent = data.last_message || "";
+
+      const fromOther = data.sender_id && String(data.sender_id) !== String(CURRENT_USER_ID);
+      if (fromOther && String(data.conversation_id) !== String(activeConversation)) {
+        let badge = headEl.querySelector(".head-badge");
+        if (!badge) {
+          badge = document.createElement("div");
+          badge.className = "head-badge";
+          badge.textContent = "0";
+          headEl.appendChild(badge);
+        }
+        badge.textContent = String((parseInt(badge.textContent, 10) || 0) + 1);
+      }
+      // most recent conversation first
+      if (chatList.firstChild !== headEl) chatList.insertBefore(headEl, chatList.firstChild);
+    }
+
+    // One socket per page for head/unread updates; polling only runs while it is down.
+    function connectUserSocket() {
+      let socket;
+      try {
+        socket = new WebSocket(wsUrl("ws/chat/"));
+      } catch (e) {
+        console.warn("Chat websocket unavailable, polling heads instead:", e);
+        startHeadsPoll();
+        return;
+      }
+      userSocket = socket;
+
+      socket.addEventListener("open", () => {
+        userSocketRetry = 1000;
+        stopHeadsPoll();
+      });
+      socket.addEventListener("message", (ev) => {
+        let data;
+        try {
+          data = JSON.parse(ev.data);
+        } catch (e) {
+          return;
+        }
+        if (data.type === "head") applyHeadUpdate(data);
+      });
+      socket.addEventListener("close", (ev) => {
+        if (userSocket === socket) userSocket = null;
+        startHeadsPoll();
+        // 4401: not logged in -> don't retry
+        if (ev.code === 4401) return;
+        setTimeout(connectUserSocket, userSocketRetry);
+        userSocketRetry = Math.min(userSocketRetry * 2, 30000);
+      });
+    }
+
     startHeadsPoll();
+    connectUserSocket();
 
     window.toggleChat = toggleChat;
 
     window.addEventListener("beforeunload", () => {
-      if (channel) {
+      closeConversationSocket();
+      if (userSocket) {
+        const socket = userSocket;
+        userSocket = null;
         try {
-          channel.unsubscribe();
+          socket.close(1000);
         } catch (e) {}
       }
       stopHeadsPoll();
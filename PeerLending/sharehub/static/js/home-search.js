@@ -0,0 +1,123 @@
+// static/js/home-search.js - title/category suggestions under the search box (/api/typeahead/)
+document.addEventListener('DOMContentLoaded', function () {
+  const input = document.querySelector('.search-input');
+  const wrapper = input ? input.closest('.search-wrapper') : null;
+  if (!input || !wrapper) return;
+
+  const DEBOUNCE_MS = 120;
+  const list = document.createElement('ul');
+  list.className = 'search-suggestions';
+  list.setAttribute('role', 'listbox');
+  list.hidden = true;
+  wrapper.appendChild(list);
+  input.setAttribute('autocomplete', 'off');
+
+  const cache = new Map();
+  let timer = null;
+  let controller = null;
+  let active = -1;
+  let suggestions = [];
+  let choosing = false;
+
+  function hide() {
+    list.hidden = true;
+    active = -1;
+  }
+
+  function highlight(index) {
+    const rows = list.querySelectorAll('li');
+    rows.forEach((li, i) => li.classList.toggle('active', i === index));
+    active = index;
+  }
+
+  function render(results) {
+    suggestions = results || [];
+    list.innerHTML = '';
+    if (!suggestions.length || document.activeElement !== input) {
+      hide();
+      return;
+    }
+    suggestions.forEach((s, i) => {
+      const li = document.createElement('li');
+      li.setAttribute('role', 'option');
+      const label = document.createElement('span');
+      label.className = 'suggestion-label';
+      label.textContent = s.label;
+      const kind = document.createElement('span');
+      kind.className = 'suggestion-kind';
+      kind.textContent = s.kind === 'category' ? 'Category' : (s.count > 1 ? `${s.count} items` : '');
+      li.append(label, kind);
+      // mousedown fires before the input's blur, so the click isn't lost
+      li.addEventListener('mousedown', (e) => {
+        e.preventDefault();
+        choose(i);
+      });
+      li.addEventListener('mouseenter', () => highlight(i));
+      list.appendChild(li);
+    });
+    active = -1;
+    list.hidden = false;
+  }
+
+  function choose(index) {
+    const s = suggestions[index];
+    if (!s) return;
+    choosing = true;
+    input.value = s.label;
+    // borrow_items.js listens for input to run the search
+    input.dispatchEvent(new Event('input', { bubbles: true }));
+    choosing = false;
+    hide();
+  }
+
+  async function suggest(prefix) {
+    const key = prefix.toLowerCase();
+    if (cache.has(key)) {
+      render(cache.get(key));
+      return;
+    }
+    if (controller) controller.abort();
+    controller = new AbortController();
+    try {
+      const res = await fetch(`/api/typeahead/?q=${encodeURIComponent(prefix)}`, {
+        credentials: 'same-origin',
+        signal: controller.signal,
+      });
+      if (!res.ok) return;
+      const data = await res.json();
+      cache.set(key, data.results || []);
+      if (input.value.trim().toLowerCase() === key.trim()) render(data.results);
+    } catch (err) {
+      if (err.name !== 'AbortError') console.warn('typeahead failed', err);
+    }
+  }
+
+  input.addEventListener('input', function () {
+    if (choosing) return;
+    clearTimeout(timer);
+    const prefix = input.value;
+    if (!prefix.trim()) {
+      hide();
+      return;
+    }
+    timer = setTimeout(() => suggest(prefix), DEBOUNCE_MS);
+  });
+
+  input.addEventListener('keydown', function (e) {
+    if (list.hidden) return;
+    if (e.key === 'ArrowDown') {
+      e.preventDefault();
+      highlight((active + 1) % suggestions.length);
+    } else if (e.key === 'ArrowUp') {
+      e.preventDefault();
+      highlight(active <= 0 ? suggestions.length - 1 : active - 1);
+    } else if (e.key === 'Enter' && active >= 0) {
+      e.preventDefault();
+      choose(active);
+    } else if (e.key === 'Escape') {
+      hide();
+    }
+  });
+
+  input.addEventListener('blur', hide);
+});
@@ -190,6 +190,81 @@
     const listEl = popup.querySelector('.notification-list');
     if (listEl) { listEl.style.maxHeight = listEl.style.maxHeight || '500px'; listEl.style.overflowY = listEl.style.overflowY || 'auto'; }
 
+    // ---- live updates (ws/notifications/, see sharehub/consumers.py) ----
+    function setBadge(count) {
+      if (!badge) return;
+      badge.textContent = String(count);
+      badge.style.display = count > 0 ? 'flex' : 'none';
+    }
+
+    function addNotification(n) {
+      if (!listEl || !n) return;
+      const id = String(n.notification_id || '');
+      // a retried job can push the same row twice
+      if (id && listEl.querySelector(`[data-notification-id="${CSS.escape(id)}"]`)) return;
+
+      // drop the "No notifications yet." placeholder
+      listEl.querySelectorAll('.notification-item:not([data-notification-id])').forEach(el => el.remove());
+
+      const item = document.createElement('div');
+      item.className = 'notification-item unread';
+      item.setAttribute('role', 'listitem');
+      item.dataset.notificationId = id;
+      const msg = document.createElement('div');
+      msg.className = 'notification-message';
+      msg.textContent = n.message || '';
+      const meta = document.createElement('div');
+      meta.className = 'notification-meta';
+      meta.textContent = n.created_at_human || '';
+      item.append(msg, meta);
+      listEl.insertBefore(item, listEl.firstChild);
+
+      const unread = parseInt(badge && badge.style.display !== 'none' ? badge.textContent : '0', 10) || 0;
+      setBadge(unread + 1);
+    }
+
+    function markAllReadLocally() {
+      popup.querySelectorAll('.notification-item.unread').forEach(it => it.classList.remove('unread'));
+      setBadge(0);
+    }
+
+    let notifSocket = null;
+    let notifRetry = 1000;
+    function connectNotifications() {
+      if (!window.SUPABASE_USER_ID || !('WebSocket' in window)) return;
+      const proto = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+      let socket;
+      try {
+        socket = new WebSocket(`${proto}//${window.location.host}/ws/notifications/`);
+      } catch (e) {
+        console.warn('[notification.js] live notifications unavailable:', e);
+        return;
+      }
+      notifSocket = socket;
+      socket.addEventListener('open', () => { notifRetry = 1000; });
+      socket.addEventListener('message', (ev) => {
+        let data;
+        try { data = JSON.parse(ev.data); } catch (e) { return; }
+        if (data.type === 'notification') addNotification(data.notification);
+        else if (data.type === 'read') markAllReadLocally();
+      });
+      socket.addEventListener('close', (ev) => {
+        if (notifSocket === socket) notifSocket = null;
+        // 4401: not logged in -> don't retry
+        if (ev.code === 4401 || ev.code === 1000) return;
+        setTimeout(connectNotifications, notifRetry);
+        notifRetry = Math.min(notifRetry * 2, 30000);
+      });
+    }
+    connectNotifications();
+    window.addEventListener('beforeunload', () => {
+      if (notifSocket) {
+        const socket = notifSocket;
+        notifSocket = null;
+        try { socket.close(1000); } catch (e) { /* ignore */ }
+      }
+    });
+
     // final position call
     positionPopup();
     console.log('[notification.js] initialized OK');
@@ -27,14 +27,21 @@ document.addEventListener("DOMContentLoaded", () => {
     modal.style.display = "none";
   }
 
-  // Bind report buttons (they must have data-request-id and data-item-id)
-  document.querySelectorAll(".report-issue-btn").forEach(btn => {
-    btn.addEventListener("click", () => {
-      const reqId = btn.dataset.requestId || "";
-      const itemId = btn.dataset.itemId || "";
-      openModal(reqId, itemId);
+  // Bind report buttons (they must have data-request-id and data-item-id).
+  // Exposed so pages that add cards later (borrow_items paging) can bind them too.
+  function bindReportButtons(root) {
+    (root || document).querySelectorAll(".report-issue-btn").forEach(btn => {
+      if (btn.dataset.reportBound) return;
+      btn.dataset.reportBound = "1";
+      btn.addEventListener("click", () => {
+        const reqId = btn.dataset.requestId || "";
+        const itemId = btn.dataset.itemId || "";
+        openModal(reqId, itemId);
+      });
     });
-  });
+  }
+  window.bindReportButtons = bindReportButtons;
+  bindReportButtons(document);
 
   closeBtn.addEventListener("click", closeModal);
   cancelBtn.addEventListener("click", closeModal);
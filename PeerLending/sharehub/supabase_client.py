@@ -1,7 +1,357 @@
-from supabase import create_client
-import os
+"""
+Process-wide Supabase client registry.
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+Every view used to call create_client(...) per request, which rebuilt the
+httpx clients, TLS contexts and auth state each time. The helpers here hand
+out long-lived clients instead:
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)  
\ No newline at end of file
+    get_anon_client()               -> project key (SUPABASE_KEY / SUPABASE_ANON_KEY)
+    get_service_client()            -> service role key, or None if not configured
+    get_user_client(access_token)   -> PostgREST/Storage calls made as that user
+    get_auth_service()              -> stateless Auth calls (sharehub/auth_service.py)
+    get_auth_admin()                -> Auth admin API, service role key if configured
+
+    get_async_anon_client()         -> async PostgREST clients for the async views
+    get_async_service_client()         (sharehub/async_views.py, chat/async_views.py)
+
+All of them draw connections from one keep-alive pool whose limits come from
+the SUPABASE_POOL_* settings (the async clients get one pool per event
+loop, since httpx async connections can't move between loops). close_clients() tears the pool down and is
+registered with atexit. Every call is counted per request by
+sharehub/instrumentation.py; with SUPABASE_FAKE_DB set the pool is replaced by
+the local stand-in in sharehub/fake_supabase.py.
+"""
+import asyncio
+import atexit
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import httpx
+from django.conf import settings
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from supabase import Client
+from supabase.lib.client_options import SyncClientOptions
+from supabase_auth.http_clients import SyncClient as AuthHttpClient
+
+from .instrumentation import InstrumentedAsyncTransport, InstrumentedTransport
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_transport = None
+_fake_transport = None
+# event loop -> {"transport": ..., "anon": client, "service": client}
+_async_pools = weakref.WeakKeyDictionary()
+_anon_client = None
+_service_client = None
+_user_clients = OrderedDict()
+_auth_service = None
+_auth_admin = None
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=getattr(settings, "SUPABASE_POOL_MAX_CONNECTIONS", 20),
+        max_keepalive_connections=getattr(settings, "SUPABASE_POOL_MAX_KEEPALIVE", 10),
+        keepalive_expiry=getattr(settings, "SUPABASE_POOL_KEEPALIVE_EXPIRY", 30.0),
+    )
+
+
+def _get_fake_transport():
+    """The local stand-in, shared by the sync and async clients; None unless SUPABASE_FAKE_DB is set."""
+    global _fake_transport
+    if not getattr(settings, "SUPABASE_FAKE_DB", ""):
+        return None
+    with _lock:
+        if _fake_transport is None:
+            from .fake_supabase import FakeSupabaseTransport
+
+            _fake_transport = FakeSupabaseTransport(
+                settings.SUPABASE_FAKE_DB,
+                latency_ms=getattr(settings, "SUPABASE_FAKE_LATENCY_MS", 0.0),
+                jitter_ms=getattr(settings, "SUPABASE_FAKE_JITTER_MS", 0.0),
+            )
+        return _fake_transport
+
+
+def _get_transport():
+    """Return the shared connection pool, creating it on first use."""
+    global _transport
+    with _lock:
+        if _transport is None:
+            _transport = _get_fake_transport() or httpx.HTTPTransport(
+                limits=_limits(),
+                http2=getattr(settings, "SUPABASE_HTTP2", False),
+            )
+            if getattr(settings, "SUPABASE_INSTRUMENTATION", True):
+                _transport = InstrumentedTransport(_transport)
+        return _transport
+
+
+def _session(session_cls=httpx.Client):
+    """
+    A thin httpx client bound to the shared pool.
+
+    PostgREST and Storage overwrite base_url/headers on the client they are
+    given, so each of them needs its own instance; the sockets underneath are
+    still shared through the transport.
+    """
+    return session_cls(
+        transport=_get_transport(),
+        timeout=getattr(settings, "SUPABASE_HTTP_TIMEOUT", 10.0),
+        follow_redirects=True,
+    )
+
+
+class PooledClient(Client):
+    """supabase Client whose PostgREST and Storage sessions use the shared pool."""
+
+    # Both are created lazily and may be first touched from QueryPlan worker
+    # threads at the same time, hence the lock.
+
+    @property
+    def postgrest(self):
+        if self._postgrest is None:
+            with _lock:
+                if self._postgrest is None:
+                    self._postgrest = self._init_postgrest_client(
+                        rest_url=self.rest_url,
+                        headers=self.options.headers,
+                        schema=self.options.schema,
+                        http_client=_session(),
+                    )
+        return self._postgrest
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            with _lock:
+                if self._storage is None:
+                    self._storage = self._init_storage_client(
+                        storage_url=self.storage_url,
+                        headers=self.options.headers,
+                        http_client=_session(),
+                    )
+        return self._storage
+
+
+def _project_key():
+    return settings.SUPABASE_KEY or getattr(settings, "SUPABASE_ANON_KEY", None)
+
+
+def _build_client(key, headers=None, **option_kwargs):
+    options = SyncClientOptions(
+        # only GoTrue reads this one; it always sends absolute URLs
+        httpx_client=_session(AuthHttpClient),
+        **option_kwargs,
+    )
+    if headers:
+        options.headers.update(headers)
+    return PooledClient.create(settings.SUPABASE_URL, key, options)
+
+
+def get_anon_client():
+    global _anon_client
+    with _lock:
+        if _anon_client is None:
+            _anon_client = _build_client(_project_key())
+        return _anon_client
+
+
+def get_service_client():
+    """Service-role client, or None when SUPABASE_SERVICE_ROLE_KEY is missing."""
+    global _service_client
+    key = getattr(settings, "SUPABASE_SERVICE_ROLE_KEY", None)
+    if not key:
+        return None
+    with _lock:
+        if _service_client is None:
+            _service_client = _build_client(key, persist_session=False, auto_refresh_token=False)
+        return _service_client
+
+
+def get_user_client(access_token):
+    """
+    Client that sends access_token as the bearer, so RLS applies to that user.
+    Clients are kept in a small LRU keyed by token (SUPABASE_USER_CLIENT_CACHE_SIZE).
+    """
+    if not access_token:
+        return get_anon_client()
+
+    with _lock:
+        client = _user_clients.get(access_token)
+        if client is not None:
+            _user_clients.move_to_end(access_token)
+            return client
+
+        client = _build_client(
+            _project_key(),
+            headers={"Authorization": f"Bearer {access_token}"},
+            persist_session=False,
+            auto_refresh_token=False,
+        )
+        _user_clients[access_token] = client
+        while len(_user_clients) > getattr(settings, "SUPABASE_USER_CLIENT_CACHE_SIZE", 256):
+            _user_clients.popitem(last=False)
+        return client
+
+
+def _auth_kwargs(key):
+    return {
+        "url": f"{settings.SUPABASE_URL}/auth/v1",
+        "headers": {"apiKey": key, "Authorization": f"Bearer {key}"},
+        "http_client": _session(AuthHttpClient),
+    }
+
+
+def get_auth_service():
+    """
+    Auth client for sign-in, sign-up, sign-out and token-bound user calls.
+    It keeps no session, so unlike client.auth it can be shared by every thread.
+    """
+    global _auth_service
+    from .auth_service import StatelessAuthClient
+
+    with _lock:
+        if _auth_service is None:
+            _auth_service = StatelessAuthClient(**_auth_kwargs(_project_key()))
+        return _auth_service
+
+
+def get_auth_admin():
+    """Auth admin API, with the service role key when it is configured."""
+    global _auth_admin
+    from supabase_auth._sync.gotrue_admin_api import SyncGoTrueAdminAPI
+
+    with _lock:
+        if _auth_admin is None:
+            key = getattr(settings, "SUPABASE_SERVICE_ROLE_KEY", None) or _project_key()
+            _auth_admin = SyncGoTrueAdminAPI(**_auth_kwargs(key))
+        return _auth_admin
+
+
+def _async_pool():
+    """This event loop's async transport and clients."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        pool = _async_pools.get(loop)
+        if pool is None:
+            transport = _get_fake_transport() or httpx.AsyncHTTPTransport(
+                limits=_limits(),
+                http2=getattr(settings, "SUPABASE_HTTP2", False),
+            )
+            if getattr(settings, "SUPABASE_INSTRUMENTATION", True):
+                transport = InstrumentedAsyncTransport(transport)
+            pool = _async_pools[loop] = {"transport": transport}
+        return pool
+
+
+def _async_client(role, key):
+    pool = _async_pool()
+    with _lock:
+        client = pool.get(role)
+        if client is None:
+            client = pool[role] = AsyncPostgrestClient(
+                f"{settings.SUPABASE_URL}/rest/v1",
+                headers={**DEFAULT_POSTGREST_CLIENT_HEADERS, "apiKey": key, "Authorization": f"Bearer {key}"},
+                http_client=httpx.AsyncClient(
+                    transport=pool["transport"],
+                    timeout=getattr(settings, "SUPABASE_HTTP_TIMEOUT", 10.0),
+                    follow_redirects=True,
+                ),
+            )
+        return client
+
+
+def get_async_anon_client():
+    """
+    Async PostgREST client (project key) for the running event loop. Same
+    query builders as client.table()/rpc(), with `await ....execute()`.
+    """
+    return _async_client("anon", _project_key())
+
+
+def get_async_service_client():
+    """Async PostgREST client with the service role key, or None when it is missing."""
+    key = getattr(settings, "SUPABASE_SERVICE_ROLE_KEY", None)
+    if not key:
+        return None
+    return _async_client("service", key)
+
+
+# PostgREST's answers for "no such function/table": schema cache misses, the
+# Postgres errors behind them, and the bare status when the body isn't JSON
+MISSING_OBJECT_CODES = frozenset({"PGRST202", "PGRST205", "42883", "42P01", "404"})
+
+
+class OptionalFeature:
+    """
+    Whether an optional SQL object -- an RPC or table from a .sql file the
+    project may not have applied -- is worth trying before the fallback:
+
+        if _chat_heads_rpc.available:
+            try:
+                return _chat_heads_rpc_call(...)
+            except Exception as e:
+                _chat_heads_rpc.failed(e)
+        return fallback(...)
+
+    An error saying the object doesn't exist switches it off for the rest of
+    the process. Any other error (timeout, 5xx, dropped connection) only for
+    retry_after seconds, so one blip doesn't lose the fast path until restart.
+    """
+
+    def __init__(self, name, retry_after=60):
+        self.name = name
+        self.retry_after = retry_after
+        self._off_until = 0.0
+
+    @property
+    def available(self):
+        return time.monotonic() >= self._off_until
+
+    def failed(self, exc):
+        if str(getattr(exc, "code", "") or "") in MISSING_OBJECT_CODES:
+            self._off_until = float("inf")
+            logger.warning("%s is not deployed, using the fallback: %s", self.name, exc)
+        else:
+            self._off_until = time.monotonic() + self.retry_after
+            logger.warning("%s failed, using the fallback for %ss: %s", self.name, self.retry_after, exc)
+
+    def disable(self):
+        self._off_until = float("inf")
+
+    def reset(self):
+        self._off_until = 0.0
+
+
+def get_fake_backend():
+    """The FakeSupabaseTransport in use (for seeding), or None against a real project."""
+    return _get_fake_transport()
+
+
+def close_clients():
+    """Drop every cached client and close the pooled connections."""
+    global _transport, _fake_transport, _anon_client, _service_client, _auth_service, _auth_admin
+    with _lock:
+        _anon_client = None
+        _service_client = None
+        _auth_service = None
+        _auth_admin = None
+        _user_clients.clear()
+        # the async pools go away with their event loops
+        _async_pools.clear()
+        if _transport is not None:
+            try:
+                _transport.close()
+            except Exception:
+                logger.exception("Error closing Supabase connection pool")
+            _transport = None
+        _fake_transport = None
+
+
+atexit.register(close_clients)
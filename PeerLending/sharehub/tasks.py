@@ -0,0 +1,114 @@
+"""
+Background job handlers (see sharehub/jobs.py) and the helpers views use to
+queue them.
+"""
+import logging
+import uuid
+from datetime import datetime
+
+from . import images, realtime
+from .jobs import enqueue, job
+from .supabase_client import get_anon_client, get_service_client
+
+logger = logging.getLogger(__name__)
+
+
+def _client():
+    return get_service_client() or get_anon_client()
+
+
+# ---------- notifications ----------
+
+def notify(user_id, message, notif_type, key=None):
+    """
+    Queue an in-app notification for user_id. The row id and timestamp are
+    fixed now, so a retried job writes the same row and ordering follows the
+    event, not the worker.
+    """
+    if not user_id:
+        return None
+    notification_id = str(uuid.uuid4())
+    return enqueue("notify", {
+        "notification_id": notification_id,
+        "user_id": user_id,
+        "message": message,
+        "notif_type": notif_type,
+        "created_at": datetime.utcnow().isoformat(),
+    }, key=key or f"notify:{notification_id}")
+
+
+def notify_many(notifications):
+    """
+    Queue several notifications as one job, written in one request:
+    notifications is [(user_id, message, notif_type, key)].
+    """
+    created_at = datetime.utcnow().isoformat()
+    rows = [
+        {
+            # derived from the key, so the same event always maps to the same row
+            "notification_id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"sharehub:notification:{key}")),
+            "user_id": user_id,
+            "message": message,
+            "notif_type": notif_type,
+            "created_at": created_at,
+        }
+        for user_id, message, notif_type, key in notifications
+        if user_id
+    ]
+    if rows:
+        return enqueue("notify_many", {"rows": rows})
+    return None
+
+
+def _notification_row(payload):
+    return {
+        "notification_id": payload["notification_id"],
+        "user_id": payload["user_id"],
+        "message": payload["message"],
+        "notif_type": payload["notif_type"],
+        "is_read": False,
+        "created_at": payload["created_at"],
+    }
+
+
+@job("notify")
+def send_notification(payload):
+    # upsert on the id: a retry after a lost ack doesn't duplicate the notification
+    row = _notification_row(payload)
+    _client().table("notification").upsert(row, on_conflict="notification_id").execute()
+    realtime.push_notifications([row])
+
+
+@job("notify_many")
+def send_notifications(payload):
+    rows = [_notification_row(p) for p in payload.get("rows") or []]
+    for start in range(0, len(rows), 500):
+        _client().table("notification").upsert(rows[start:start + 500], on_conflict="notification_id").execute()
+    realtime.push_notifications(rows)
+
+
+# ---------- item cleanup ----------
+
+def delete_item_requests(client, item_id):
+    client.table("request").delete().eq("item_id", item_id).execute()
+
+
+def cleanup_deleted_item(item_id, image_url=None):
+    """Queue removal of a deleted item's requests and stored photos."""
+    return enqueue("item_cleanup", {"item_id": item_id, "image_url": image_url or ""},
+                   key=f"item_cleanup:{item_id}")
+
+
+@job("item_cleanup")
+def item_cleanup(payload):
+    client = get_service_client()
+    if client is None:
+        raise RuntimeError("SUPABASE_SERVICE_ROLE_KEY is required for item cleanup")
+    delete_item_requests(client, payload["item_id"])
+
+    url = payload.get("image_url") or ""
+    path = images.object_path(url)
+    if path:
+        paths = [images.variant_url(path, v) for v in images.VARIANT_NAMES] if images.has_variants(path) else [path]
+        # removing an object that is already gone is not an error
+        client.storage.from_(images.bucket()).remove(paths)
@@ -0,0 +1,65 @@
+"""
+Test base class: views run against the local Supabase stand-in.
+
+FakeSupabaseTestCase points SUPABASE_FAKE_DB at an in-memory stand-in
+(sharehub/fake_supabase.py), seeds it once per test run with a small data set
+from seed_fake_supabase and signs users in through the real login view. Query
+budgets are strict, so a view over its @query_budget fails the test:
+
+    class HomeTests(FakeSupabaseTestCase):
+        def test_lists_available_items(self):
+            resp = self.login(1).get("/home/")
+            ...
+
+The seeded rows are shared by every test (the stand-in is not rolled back
+with the test database), so tests that write to it should add their own rows
+rather than change the seeded ones.
+"""
+from django.core.cache import caches
+from django.test import Client, TestCase, override_settings
+
+from . import overdue
+from .fake_supabase import FAKE_JWT_SECRET
+from .management.commands.seed_fake_supabase import PASSWORD, seed
+from .profiles import PROFILE_CACHE_ALIAS
+from .supabase_client import get_fake_backend, get_service_client
+
+SEED = dict(users=6, items=60, requests=80, conversations=12)
+
+_seeded_backend = None
+_user_ids = []
+
+
+@override_settings(
+    SUPABASE_FAKE_DB=":memory:",
+    SUPABASE_FAKE_LATENCY_MS=0,
+    SUPABASE_FAKE_JITTER_MS=0,
+    SUPABASE_JWT_SECRET=FAKE_JWT_SECRET,
+    JOBS_EAGER=True,
+    SUPABASE_QUERY_BUDGET_STRICT=True,
+)
+class FakeSupabaseTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        global _seeded_backend, _user_ids
+        backend = get_fake_backend()
+        if backend is not _seeded_backend:
+            _user_ids = seed(backend, **SEED)
+            _seeded_backend = backend
+        cls.backend = backend
+        cls.user_ids = _user_ids
+        cls.supabase = get_service_client()
+
+    def setUp(self):
+        # start every test cold: display names and profiles are cached across
+        # requests, and overdue checks for a recent scan once a minute
+        caches[PROFILE_CACHE_ALIAS].clear()
+        overdue._freshness = (0.0, False)
+
+    def login(self, user=1):
+        """A test client signed in as seeded user{user} (user0 is the admin)."""
+        client = Client(HTTP_HOST="localhost")
+        client.post("/login/", {"email": f"user{user}@example.edu", "password": PASSWORD})
+        self.assertEqual(client.session.get("supabase_user_id"), self.user_ids[user])
+        return client
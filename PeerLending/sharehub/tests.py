@@ -1,3 +1,263 @@
-zfrom django.test import TestCase
+import uuid
+from datetime import datetime, timezone
+
+from django.core.cache import caches
+from django.test import Client, TestCase, override_settings
+
+from . import overdue
+from .catalog import parse_cursor
+from .instrumentation import assert_max_calls, record_calls
+from .models import Job
+from .profiles import PROFILE_CACHE_ALIAS
+from .management.commands.seed_fake_supabase import PASSWORD
+from .testing import FakeSupabaseTestCase
+from .uploads import sniff_image_type
+
+
+class CatalogCursorTests(TestCase):
+    def test_round_trips_a_valid_cursor(self):
+        self.assertEqual(
+            parse_cursor("2025-03-01T10:00:00+00:00|3f2b8a7e-1c4d-4e5f-9a6b-7c8d9e0f1a2b"),
+            ("2025-03-01T10:00:00+00:00", "3f2b8a7e-1c4d-4e5f-9a6b-7c8d9e0f1a2b"),
+        )
+
+    def test_rejects_filter_syntax(self):
+        for value in ("", "no-separator", "2025-03-01|x),id.neq.0", "now()|3f2b8a7e-1c4d-4e5f-9a6b-7c8d9e0f1a2b"):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_cursor(value)
+
+
+class SniffImageTypeTests(TestCase):
+    def test_accepts_what_the_variant_pipeline_can_resize(self):
+        self.assertEqual(sniff_image_type(b"\xff\xd8\xff\xe0" + bytes(12)), "image/jpeg")
+        self.assertEqual(sniff_image_type(b"RIFF\x00\x00\x00\x00WEBPVP8 "), "image/webp")
+        self.assertEqual(sniff_image_type(b"\x00\x00\x00\x20ftypavif\x00\x00\x00\x00"), "image/avif")
+
+    def test_rejects_heic(self):
+        # Pillow can't decode it, so it would be stored raw with no variants
+        for brand in (b"heic", b"heix", b"mif1"):
+            with self.subTest(brand=brand):
+                self.assertIsNone(sniff_image_type(b"\x00\x00\x00\x18ftyp" + brand + bytes(4)))
+
+
+class ViewTests(FakeSupabaseTestCase):
+    def test_pages_need_a_session(self):
+        resp = self.client.get("/home/", HTTP_HOST="localhost")
+        self.assertEqual(resp.status_code, 302)
+
+    def test_home_lists_other_peoples_available_items(self):
+        user_id = self.user_ids[1]
+        resp = self.login(1).get("/home/")
+        self.assertEqual(resp.status_code, 200)
+        items = resp.context["available_items"]
+        self.assertTrue(items)
+        self.assertTrue(all(i["available"] and i["user_id"] != user_id for i in items))
+        self.assertEqual(resp.context["user_info"]["id"], user_id)
+        for item in items:
+            self.assertContains(resp, item["title"])
+
+    def test_home_lists_approved_unreturned_borrows(self):
+        user_id = self.user_ids[1]
+        rows = (
+            self.supabase.table("request").select("item_id")
+            .eq("user_id", user_id).eq("status", "approved").neq("return", True)
+            .execute().data
+        )
+        self.assertTrue(rows)
+        resp = self.login(1).get("/home/")
+        self.assertEqual(
+            sorted(b["item_id"] for b in resp.context["borrowed_items"]),
+            sorted(r["item_id"] for r in rows),
+        )
+
+    def test_borrow_items_first_page(self):
+        user_id = self.user_ids[1]
+        available = (
+            self.supabase.table("item").select("item_id", count="exact")
+            .eq("available", True).neq("user_id", user_id).execute()
+        )
+        resp = self.login(1).get("/borrow_items/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context["available_total"], available.count)
+        items = resp.context["available_items"]
+        self.assertTrue(items)
+        self.assertTrue(all(i["user_id"] != user_id for i in items))
+        self.assertEqual([i["created_at"] for i in items], sorted((i["created_at"] for i in items), reverse=True))
+
+    def test_catalog_api_pages_without_gaps_or_repeats(self):
+        client = self.login(1)
+        seen, cursor = [], ""
+        while True:
+            data = client.get("/api/catalog/", {"limit": 7, "cursor": cursor}).json()
+            seen += [i["item_id"] for i in data["results"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        expected = (
+            self.supabase.table("item").select("item_id")
+            .eq("available", True).neq("user_id", self.user_ids[1]).execute().data
+        )
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(set(seen), {r["item_id"] for r in expected})
+
+    def test_catalog_api_rejects_a_bad_cursor(self):
+        resp = self.login(1).get("/api/catalog/", {"cursor": "2025-01-01|x),user_id.neq.0"})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_admin_dashboard_marks_overdue_loans(self):
+        rows = (
+            self.supabase.table("request").select("request_id,return_date")
+            .eq("status", "approved").neq("return", True).execute().data
+        )
+        now = datetime.now(timezone.utc)
+        late = {r["request_id"] for r in rows if overdue.due_state(r["return_date"], now) == overdue.STATE_OVERDUE}
+        self.assertTrue(late)
+        resp = self.login(0).get("/admindashboard/")
+        self.assertEqual(resp.status_code, 200)
+        table = resp.context["borrowed_items"]
+        self.assertEqual(len(table), len(rows))
+        self.assertEqual({b["request_id"] for b in table if b["status_label"] == "Late"}, late)
+
+    def test_profile_counts_the_users_requests(self):
+        total = (
+            self.supabase.table("request").select("request_id", count="exact")
+            .eq("user_id", self.user_ids[1]).execute().count
+        )
+        resp = self.login(1).get("/profile/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context["borrow_stats"]["total_requests"], total)
+
+    def test_profile_counts_overdue_loans(self):
+        rows = (
+            self.supabase.table("request").select("return_date")
+            .eq("user_id", self.user_ids[1]).eq("status", "approved").neq("return", True).execute().data
+        )
+        now = datetime.now(timezone.utc)
+        late = sum(1 for r in rows if overdue.due_state(r["return_date"], now) == overdue.STATE_OVERDUE)
+        resp = self.login(1).get("/profile/")
+        self.assertEqual(resp.context["borrow_stats"]["currently_borrowed"], len(rows))
+        self.assertEqual(resp.context["borrow_stats"]["overdue"], late)
+
+
+class QueryBudgetTests(FakeSupabaseTestCase):
+    """
+    Supabase calls per page with cold caches, including overdue's check for a
+    recent scan. A budget goes up only together with the change that needs
+    the extra call.
+    """
+
+    def assertWithinBudget(self, client, url, max_calls):
+        caches[PROFILE_CACHE_ALIAS].clear()  # login and earlier requests warmed it
+        with assert_max_calls(max_calls, url):
+            resp = client.get(url)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_home(self):
+        client = self.login(1)
+        # the plan's chains run concurrently, so available items, incoming
+        # requests and borrowed items may each miss the display name cache
+        self.assertWithinBudget(client, "/home/", 12)
+        self.assertWithinBudget(client, "/async/home/", 10)
+
+    def test_borrow_items(self):
+        client = self.login(1)
+        self.assertWithinBudget(client, "/borrow_items/", 4)
+        self.assertWithinBudget(client, "/async/borrow_items/", 4)
+
+    def test_profile(self):
+        self.assertWithinBudget(self.login(1), "/profile/", 4)
+
+    def test_home_with_warm_caches(self):
+        client = self.login(1)
+        client.get("/home/")
+        with assert_max_calls(7, "warm /home/"):
+            client.get("/home/")
+
+
+@override_settings(JOBS_EAGER=False, JOBS_BACKEND="db")
+class RespondRequestTests(FakeSupabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        item = (
+            self.supabase.table("item").select("item_id")
+            .eq("user_id", self.user_ids[2]).limit(1).execute().data[0]
+        )
+        self.request_id = str(uuid.uuid4())
+        self.supabase.table("request").insert({
+            "request_id": self.request_id,
+            "item_id": item["item_id"],
+            "user_id": self.user_ids[1],
+            "status": "pending",
+            "return": False,
+            "request_date": datetime.now(timezone.utc).isoformat(),
+        }).execute()
+
+    def respond(self, client, action):
+        return client.post("/api/request/respond/", {"request_id": self.request_id, "action": action},
+                           content_type="application/json")
+
+    def notify_keys(self):
+        return sorted(Job.objects.filter(name="notify").values_list("key", flat=True))
+
+    def test_retried_decision_notifies_once(self):
+        owner = self.login(2)
+        self.assertEqual(self.respond(owner, "approve").status_code, 200)
+        self.assertEqual(self.respond(owner, "approve").status_code, 409)
+        admin = self.login(0)
+        for _ in range(2):
+            self.assertEqual(self.respond(admin, "approve").status_code, 200)
+        self.assertEqual(self.notify_keys(), [
+            f"request_approved:{self.request_id}",
+            f"request_approved:{self.request_id}:overwritten",
+        ])
+
+    def test_admin_overwrite_notifies(self):
+        self.respond(self.login(2), "approve")
+        self.respond(self.login(0), "deny")
+        self.assertEqual(self.notify_keys(), [
+            f"request_approved:{self.request_id}",
+            f"request_denied:{self.request_id}:overwritten",
+        ])
+
+
+class AccountSettingsTests(FakeSupabaseTestCase):
+    """Each test signs up its own user: these views change credentials."""
+
+    def setUp(self):
+        super().setUp()
+        self.email = f"settings-{uuid.uuid4().hex[:8]}@example.edu"
+        user_id = self.backend.create_user(self.email, PASSWORD)
+        self.backend.insert_rows("user", [{"id": user_id, "email": self.email, "first_name": "Set",
+                                           "last_name": "Tings", "is_admin": False, "is_block": False}])
+        self.client = Client(HTTP_HOST="localhost")
+        self.assertEqual(self.sign_in(PASSWORD).status_code, 302)
+
+    def sign_in(self, password):
+        return self.client.post("/login/", {"email": self.email, "password": password})
+
+    def post(self, url, payload):
+        with record_calls() as log:
+            resp = self.client.post(url, payload, content_type="application/json")
+        return resp, [c["target"] for c in log.calls if c["service"] == "auth"]
+
+    def test_update_password_revokes_the_check_session(self):
+        resp, auth_calls = self.post("/settings/update_password/",
+                                     {"current_password": PASSWORD, "new_password": "a-new-password"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(auth_calls[-1], "logout")
+        self.assertEqual(self.sign_in("a-new-password").status_code, 302)
+
+    def test_wrong_password_opens_no_session(self):
+        resp, auth_calls = self.post("/settings/update_password/",
+                                     {"current_password": "wrong", "new_password": "a-new-password"})
+        self.assertEqual(resp.status_code, 400)
+        self.assertNotIn("logout", auth_calls)
+
+    def test_update_email_revokes_the_check_session(self):
+        new_email = f"moved-{uuid.uuid4().hex[:8]}@example.edu"
+        resp, auth_calls = self.post("/settings/update_email/",
+                                     {"current_password": PASSWORD, "new_email": new_email})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(auth_calls.count("logout"), 1)
+        self.assertEqual(self.client.session["user_email"], new_email)
 
-# Create your tests here.
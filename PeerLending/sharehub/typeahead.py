@@ -0,0 +1,174 @@
+"""
+Prefix completion for the item search box (/api/typeahead/).
+
+Titles and categories of available items are kept in one sorted array of
+keys. Every word of a label starts a key ("graphing calculator" is found by
+"gra" and by "calc"), so a completion is a bisect plus a short scan. The
+array is loaded from Supabase on first use, rebuilt every
+TYPEAHEAD_REBUILD_SECONDS, and patched in place by add_item / edit_item /
+delete_item through sharehub.catalog.sync_item_indexes.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .search import tokenize
+
+logger = logging.getLogger(__name__)
+
+KIND_TITLE = "title"
+KIND_CATEGORY = "category"
+
+# how many matching keys to look at before ranking; keeps a one-letter prefix cheap
+SCAN_LIMIT = 200
+
+
+def _normalize(text):
+    return " ".join(tokenize(text))
+
+
+class CompletionIndex:
+    def __init__(self):
+        self._keys = []        # sorted (key, kind, label)
+        self._counts = {}      # (kind, label) -> available items carrying it
+        self._items = {}       # item_id -> ((kind, label), ...)
+
+    def __len__(self):
+        return len(self._counts)
+
+    def _label_keys(self, kind, label):
+        words = _normalize(label).split()
+        return [(" ".join(words[i:]), kind, label) for i in range(len(words))]
+
+    def _acquire(self, entry):
+        if self._counts.get(entry, 0) == 0:
+            for key in self._label_keys(*entry):
+                insort(self._keys, key)
+        self._counts[entry] = self._counts.get(entry, 0) + 1
+
+    def _release(self, entry):
+        left = self._counts.get(entry, 0) - 1
+        if left > 0:
+            self._counts[entry] = left
+            return
+        self._counts.pop(entry, None)
+        for key in self._label_keys(*entry):
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
+    @staticmethod
+    def _entries(item):
+        return tuple(
+            (kind, (item.get(field) or "").strip())
+            for kind, field in ((KIND_TITLE, "title"), (KIND_CATEGORY, "category"))
+            if (item.get(field) or "").strip()
+        )
+
+    @classmethod
+    def build(cls, items):
+        """An index over items, sorted once rather than insert by insert."""
+        index = cls()
+        for item in items:
+            item_id = item.get("item_id")
+            if not item_id or not item.get("available", True):
+                continue
+            entries = index._entries(item)
+            for entry in entries:
+                index._counts[entry] = index._counts.get(entry, 0) + 1
+            index._items[item_id] = entries
+        index._keys = sorted(key for entry in index._counts for key in index._label_keys(*entry))
+        return index
+
+    def add(self, item):
+        item_id = item.get("item_id")
+        if not item_id:
+            return
+        self.remove(item_id)
+        if not item.get("available", True):
+            return
+        entries = self._entries(item)
+        for entry in entries:
+            self._acquire(entry)
+        self._items[item_id] = entries
+
+    def remove(self, item_id):
+        for entry in self._items.pop(item_id, ()):
+            self._release(entry)
+
+    def complete(self, prefix, limit=8):
+        """
+        Up to `limit` {"label", "kind", "count"} suggestions for prefix.
+        Labels that start with the prefix come before mid-label word matches,
+        then the more common ones.
+        """
+        p = _normalize(prefix)
+        if not p:
+            return []
+        if prefix[-1:].isspace():
+            p += " "
+
+        keys = self._keys
+        i = bisect_left(keys, (p,))
+        seen = {}
+        scanned = 0
+        while i < len(keys) and scanned < SCAN_LIMIT and keys[i][0].startswith(p):
+            key, kind, label = keys[i]
+            starts_label = key == _normalize(label)
+            if (kind, label) not in seen or starts_label:
+                seen[(kind, label)] = starts_label
+            i += 1
+            scanned += 1
+
+        ranked = sorted(
+            seen.items(),
+            key=lambda e: (not e[1], -self._counts.get(e[0], 0), len(e[0][1]), e[0][1].lower()),
+        )
+        return [
+            {"label": label, "kind": kind, "count": self._counts.get((kind, label), 0)}
+            for (kind, label), _ in ranked[:limit]
+        ]
+
+
+_index = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+
+def index_built():
+    return _index is not None
+
+
+def get_index(client):
+    global _index, _built_at
+    ttl = getattr(settings, "TYPEAHEAD_REBUILD_SECONDS", 900)
+    with _lock:
+        if _index is None or time.monotonic() - _built_at > ttl:
+            from .catalog import iter_available_items
+
+            started = time.perf_counter()
+            index = CompletionIndex.build(iter_available_items(client, "item_id,title,category,available"))
+            _index, _built_at = index, time.monotonic()
+            logger.info("typeahead: %d labels in %.0f ms", len(index), (time.perf_counter() - started) * 1000)
+        return _index
+
+
+def complete(client, prefix, limit=8):
+    index = get_index(client)
+    with _lock:
+        return index.complete(prefix, limit=limit)
+
+
+def index_item(item):
+    with _lock:
+        if _index is not None:
+            _index.add(item)
+
+
+def unindex_item(item_id):
+    with _lock:
+        if _index is not None:
+            _index.remove(item_id)
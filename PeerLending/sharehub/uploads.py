@@ -0,0 +1,147 @@
+"""
+Size-bounded, type-checked handling of uploaded images.
+
+BoundedImageUploadHandler replaces Django's default upload handlers
+(FILE_UPLOAD_HANDLERS in settings). Every file field in this app is a photo,
+so it:
+
+- sniffs the type from the first chunk's magic bytes and skips anything that
+  isn't JPEG/PNG/GIF/WebP/AVIF, without reading the rest into memory (all
+  formats Pillow can resize and browsers can show; HEIC is neither);
+- skips a file as soon as it grows past UPLOAD_MAX_BYTES, or before its first
+  byte when the request's Content-Length already says it is too big;
+- keeps at most FILE_UPLOAD_MAX_MEMORY_SIZE bytes in memory per file and
+  spills the rest to a temporary file, so concurrent large uploads don't grow
+  worker RSS;
+- logs receive throughput.
+
+A skipped file never reaches request.FILES; the reason is available from
+upload_error(request, field) so the view can tell the user.
+"""
+import io
+import logging
+import time
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+
+logger = logging.getLogger(__name__)
+
+# (offset, magic, content_type)
+SIGNATURES = (
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+)
+# ISO-BMFF brands at bytes 8..12 (after "ftyp" at 4..8)
+ISOBMFF_BRANDS = {b"avif": "image/avif"}
+
+
+def sniff_image_type(head):
+    """The image content type for a file's first bytes, or None."""
+    for offset, magic, content_type in SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            if magic == b"WEBP" and head[:4] != b"RIFF":
+                continue
+            return content_type
+    if head[4:8] == b"ftyp":
+        return ISOBMFF_BRANDS.get(head[8:12])
+    return None
+
+
+def max_upload_bytes():
+    return getattr(settings, "UPLOAD_MAX_BYTES", 10 * 1024 * 1024)
+
+
+def upload_error(request, field_name=None):
+    """Why an uploaded file was rejected (for field_name, or any field), or None."""
+    errors = getattr(request, "upload_errors", None) or {}
+    if field_name is None:
+        return next(iter(errors.values()), None)
+    return errors.get(field_name)
+
+
+def storage_body(uploaded):
+    """
+    What to hand to storage3's upload(): the temp file path for spilled uploads
+    (storage3 opens it and httpx streams it), else the in-memory bytes, which
+    are bounded by FILE_UPLOAD_MAX_MEMORY_SIZE.
+    """
+    if hasattr(uploaded, "temporary_file_path"):
+        return uploaded.temporary_file_path()
+    uploaded.seek(0)
+    return uploaded.read()
+
+
+class BoundedImageUploadHandler(FileUploadHandler):
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request_too_large = bool(content_length) and content_length > max_upload_bytes() + 64 * 1024
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.max_bytes = max_upload_bytes()
+        self.memory_limit = getattr(settings, "FILE_UPLOAD_MAX_MEMORY_SIZE", 2621440)
+        self.buffer = io.BytesIO()
+        self.spill = None
+        self.started = time.perf_counter()
+        if getattr(self, "request_too_large", False) or (self.content_length or 0) > self.max_bytes:
+            self._reject(self._too_large_message())
+
+    def _too_large_message(self):
+        return f"Image is too large (max {self.max_bytes // (1024 * 1024)} MB)."
+
+    def _reject(self, message):
+        if self.request is not None:
+            if not hasattr(self.request, "upload_errors"):
+                self.request.upload_errors = {}
+            self.request.upload_errors[self.field_name] = message
+        logger.info("upload: rejected %s (%s): %s", self.field_name, self.file_name, message)
+        self.upload_interrupted()
+        raise SkipFile(message)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0:
+            sniffed = sniff_image_type(raw_data[:16])
+            if sniffed is None:
+                self._reject("Unsupported file type; upload a JPEG, PNG, GIF, WebP or AVIF image.")
+            self.content_type = sniffed
+        if start + len(raw_data) > self.max_bytes:
+            self._reject(self._too_large_message())
+
+        if self.spill is None and start + len(raw_data) > self.memory_limit:
+            self.spill = TemporaryUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+            self.spill.write(self.buffer.getvalue())
+            self.buffer = None
+        (self.spill if self.spill is not None else self.buffer).write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        elapsed = time.perf_counter() - self.started
+        logger.info(
+            "upload: received %s %d bytes in %.0f ms (%.1f MB/s, %s)",
+            self.field_name, file_size, elapsed * 1000,
+            file_size / (1024 * 1024) / elapsed if elapsed > 0 else 0.0,
+            "spooled to disk" if self.spill is not None else "in memory",
+        )
+        if self.spill is not None:
+            self.spill.seek(0)
+            self.spill.size = file_size
+            return self.spill
+        self.buffer.seek(0)
+        return InMemoryUploadedFile(
+            self.buffer, self.field_name, self.file_name, self.content_type,
+            file_size, self.charset, self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        spill = getattr(self, "spill", None)
+        if spill is not None:
+            try:
+                spill.close()
+            except FileNotFoundError:
+                pass
+            self.spill = None
+        self.buffer = None
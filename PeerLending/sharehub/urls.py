@@ -1,13 +1,17 @@
+from django.conf import settings
 from django.urls import path, include
 from django.shortcuts import redirect
-from . import views
+from . import async_views, health, views
+
+# ASYNC_VIEWS picks which version serves the canonical URLs
+hot_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', lambda request: redirect('login')), 
     path('register/', views.register_view, name="register"),
     path('login/', views.login_view, name="login"),
     path('logout/', views.logout_view, name="logout"),
-    path("home/", views.home, name="home"),
+    path("home/", hot_views.home, name="home"),
     path("profile/", views.profile, name="profile"),
     path("profile/edit/", views.edit_profile, name="edit_profile"),
     path("settings/", views.settings_view, name="settings"),
@@ -18,7 +22,10 @@ urlpatterns = [
     path("forgot-password", views.forgot_password, name="forgot_password"),
     path("reset-password", views.reset_password_page, name="reset_password_page"),
     path("add-item/", views.add_item, name="add_item"),
-    path("borrow_items/", views.borrow_items, name="borrow_items"),
+    path("borrow_items/", hot_views.borrow_items, name="borrow_items"),
+    path("api/catalog/", views.catalog_api, name="catalog_api"),
+    path("api/search/", views.search_api, name="search_api"),
+    path("api/typeahead/", views.typeahead_api, name="typeahead_api"),
     path("request-borrow/", views.create_request, name="request_borrow"),
     path('api/request/respond/', views.respond_request, name='api_respond_request'),
     path('return-items/', views.return_items, name='return_items'),
@@ -30,6 +37,9 @@ urlpatterns = [
     path('my-items/<str:item_id>/delete/', views.delete_item, name='delete_item'),
     path('item/<str:item_id>/edit/', views.edit_item, name='edit_item'),
     path('', include('chat.urls')),
+    path("async/home/", async_views.home, name="async_home"),
+    path("async/borrow_items/", async_views.borrow_items, name="async_borrow_items"),
+    path("healthz/ready/", health.ready, name="healthz_ready"),
     path('approve-requests/', views.approve_requests_view, name='approve_requests'),
     path('manage-users/', views.manage_users_view, name='manage_users'),
      path('reports/', views.admin_reports_view, name='admin_reports'),
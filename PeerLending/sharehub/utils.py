@@ -1,4 +1,5 @@
 from functools import wraps
+from asgiref.sync import iscoroutinefunction
 from django.shortcuts import redirect
 from django.views.decorators.cache import never_cache
 from .models import CustomUser
@@ -17,7 +18,47 @@ def _is_json_or_ajax_request(request):
         return True
     return False
 
+def _no_store(resp):
+    try:
+        resp["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+        resp["Pragma"] = "no-cache"
+        resp["Expires"] = "0"
+    except Exception:
+        pass
+    return resp
+
+
+def _not_authenticated(request):
+    if _is_json_or_ajax_request(request):
+        return JsonResponse(
+            {'errors': {'general': [{'message': 'Not authenticated'}]}},
+            status=401
+        )
+    return redirect("login")
+
+
+def _async_login_required(view_func):
+    """supabase_login_required for async views; the session is read without blocking the loop."""
+    @wraps(view_func)
+    @never_cache
+    async def _wrapped(request, *args, **kwargs):
+        allowed = await request.session.aget("supabase_user_id") or await request.session.aget("is_admin")
+        if not allowed:
+            try:
+                user = await request.auser()
+                allowed = getattr(user, "is_staff", False) or getattr(user, "is_superuser", False)
+            except Exception:
+                allowed = False
+        if allowed:
+            return _no_store(await view_func(request, *args, **kwargs))
+        return _not_authenticated(request)
+    return _wrapped
+
+
 def supabase_login_required(view_func):
+    if iscoroutinefunction(view_func):
+        return _async_login_required(view_func)
+
     @wraps(view_func)
     @never_cache
     def _wrapped(request, *args, **kwargs):
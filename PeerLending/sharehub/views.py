@@ -6,25 +6,30 @@ from django.http import JsonResponse
 from django.views.decorators.cache import never_cache
 from django.urls import reverse
 from django.contrib.auth import logout
-from supabase import create_client   
-from supabase import create_client, Client
+from supabase import Client
 from django.views.decorators.http import require_http_methods
 from supabase_auth._sync.gotrue_client import AuthApiError
 from django.views.decorators.http import require_GET
  
 from .forms import CustomUserCreationForm
 from .utils import supabase_login_required
-from datetime import datetime, timedelta
-from django.utils import timezone
+from datetime import datetime, timedelta, timezone
 import logging
 from .utils import sync_user_to_orm
+from .supabase_client import get_anon_client, get_service_client
+from .request_context import get_user_context
+from .profiles import get_profile, invalidate_profile, display_name, resolve_display_names
+from .query_plan import QueryPlan
+from .instrumentation import query_budget
+from .admin_stats import get_admin_stats
+from .catalog import SORTS as CATALOG_SORTS, decorate_items, fetch_catalog_page, page_size as catalog_page_size, sync_item_indexes
+from . import auth_service, auth_tokens, images, overdue, realtime, search, tasks, typeahead, uploads
  
 import os
 import uuid
 import json
 import re
 from django.views.decorators.http import require_POST
-from supabase import create_client as create_supabase_client
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.http import url_has_allowed_host_and_scheme
 from supabase_auth._sync.gotrue_client import AuthApiError
@@ -37,11 +42,13 @@ SUPABASE_URL = settings.SUPABASE_URL
 SUPABASE_KEY = settings.SUPABASE_KEY
 SUPABASE_SERVICE_ROLE_KEY = getattr(settings, "SUPABASE_SERVICE_ROLE_KEY", None)
 SUPABASE_ANON_KEY = getattr(settings, "SUPABASE_ANON_KEY", None)
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) 
+supabase: Client = get_anon_client()
 
 EMAIL_REGEX = re.compile(r"[^@]+@[^@]+\.[^@]+")
 
-server_client = create_supabase_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+logger = logging.getLogger(__name__)
+
+server_client = get_service_client()
 
 def ajax_require_auth(view_func):
     @wraps(view_func)
@@ -84,10 +91,7 @@ def register_view(request):
                 year_val = None
 
             try:
-                response = supabase.auth.sign_up({
-                    "email": data["email"],
-                    "password": data["password1"],
-                })
+                response = auth_service.sign_up(data["email"], data["password1"])
 
                 if not getattr(response, "user", None):
                     return JsonResponse({
@@ -112,7 +116,7 @@ def register_view(request):
 
                 if getattr(insert, "error", None):
                     try:
-                        supabase.auth.admin.delete_user(user_id)
+                        auth_service.admin().delete_user(user_id)
                     except Exception:
                         pass
 
@@ -163,13 +167,10 @@ def admin_required(view_func):
         if not user_id:
             return HttpResponseForbidden("Not authenticated")
 
-        try:
-            resp = supabase.table("user").select("is_admin").eq("id", user_id).maybe_single().execute()
-            if getattr(resp, "data", None) and resp.data.get("is_admin"):
-                request.session["is_admin"] = True
-                return view_func(request, *args, **kwargs)
-        except Exception:
-            pass
+        profile = get_profile(user_id)
+        if profile and profile.get("is_admin"):
+            request.session["is_admin"] = True
+            return view_func(request, *args, **kwargs)
 
         return HttpResponseForbidden("Admin only")
     return _wrapped
@@ -183,7 +184,7 @@ def login_view(request):
         raw_next = request.POST.get("next") or request.GET.get("next") or ""
 
         try:
-            response = supabase.auth.sign_in_with_password({"email": email, "password": password})
+            response = auth_service.sign_in(email, password)
         except AuthApiError as e:
             error_msg = "Invalid credentials"
             try:
@@ -204,14 +205,18 @@ def login_view(request):
             })
 
         user_id = response.user.id
+        access_token = response.session.access_token if response.session else None
+
+        # one fresh read of the user row covers both is_block and is_admin,
+        # and warms the profile cache for the pages that follow
+        profile = get_profile(user_id, refresh=True) or {}
 
         # --- NEW: check is_block in your Supabase user row ---
         try:
-            uresp = supabase.table("user").select("is_block").eq("id", user_id).maybe_single().execute()
-            if getattr(uresp, "data", None) and uresp.data.get("is_block"):
+            if profile.get("is_block"):
                 # immediately sign out the session, prevent login
                 try:
-                    supabase.auth.sign_out()
+                    auth_service.sign_out(access_token)
                 except Exception:
                     pass
                 # render with error
@@ -226,14 +231,12 @@ def login_view(request):
         # normal session setup
         request.session["supabase_user_id"] = user_id
         request.session["user_email"] = email
+        # the tokens identify the user on later pages without asking Supabase Auth
+        # (sharehub/auth_tokens.py), and let logout revoke this session only
+        if response.session:
+            auth_tokens.store_session(request.session, response.session)
 
-        is_admin = False
-        try:
-            uresp = supabase.table("user").select("is_admin").eq("id", user_id).maybe_single().execute()
-            if getattr(uresp, "data", None):
-                is_admin = bool(uresp.data.get("is_admin"))
-        except Exception:
-            is_admin = False
+        is_admin = bool(profile.get("is_admin"))
 
         request.session["is_admin"] = bool(is_admin)
 
@@ -273,7 +276,7 @@ def toggle_block_user(request):
         return JsonResponse({"success": False, "error": "Server misconfigured"}, status=500)
 
     try:
-        admin_client = create_supabase_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+        admin_client = get_service_client()
         # get current value
         resp = admin_client.table('user').select('is_block').eq('id', user_id).maybe_single().execute()
         current_block = False
@@ -284,6 +287,7 @@ def toggle_block_user(request):
         upd = admin_client.table('user').update({'is_block': new_block}).eq('id', user_id).execute()
         if getattr(upd, "error", None):
             return JsonResponse({"success": False, "error": "Failed to update user"}, status=500)
+        invalidate_profile(user_id)
 
         # optionally keep Django ORM in sync (if you have local CustomUser rows)
         try:
@@ -307,10 +311,11 @@ def toggle_block_user(request):
 # ---------- Logout ----------
 @never_cache
 def logout_view(request):
+    access_token = request.session.get(auth_tokens.SESSION_ACCESS_TOKEN)
     request.session.flush()
 
     try:
-        supabase.auth.sign_out()
+        auth_service.sign_out(access_token)
     except Exception:
         pass
  
@@ -321,98 +326,86 @@ def logout_view(request):
     return resp
    
  
-@supabase_login_required
-def home(request):
-    logger = logging.getLogger(__name__)
-    user_id = request.session.get("supabase_user_id")
+# ---------- home ----------
+# Queries and row shaping for the home page, shared by home() and the async
+# version in sharehub/async_views.py: the *_query() helpers return PostgREST
+# builders for either kind of client, the rest turn rows into template data.
 
-    profile_resp = supabase.table("user").select("*").eq("id", user_id).single().execute()
-    user_info = profile_resp.data if profile_resp and getattr(profile_resp, "data", None) else None
+def home_my_items_query(client, user_id):
+    return client.table('item').select('item_id,title').eq('user_id', user_id)
+
+
+def home_incoming_requests_query(client, my_item_ids):
+    return client.table('request') \
+        .select('request_id,item_id,user_id,request_date,status') \
+        .in_('item_id', my_item_ids) \
+        .eq('status', 'pending') \
+        .order('request_date', desc=True)
+
+
+def home_lent_out_query(client, my_item_ids):
+    # items you own that are currently lent out
+    return client.table('request') \
+        .select('request_id', count='exact', head=True) \
+        .in_('item_id', my_item_ids) \
+        .eq('status', 'approved') \
+        .neq('return', True)
+
+
+def home_available_items_query(client, user_id, ordered=True):
+    q = client.table("item").select("*").eq("available", True).neq("user_id", user_id)
+    return q.order("created_at", desc=True).limit(7) if ordered else q
 
-    # ALWAYS get email from Supabase Auth (source of truth)
-    if user_info:
-        try:
-            auth_user_resp = supabase.auth.admin.get_user_by_id(user_id)
-            if auth_user_resp.user:
-                user_info["email"] = auth_user_resp.user.email
-                request.session['user_email'] = auth_user_resp.user.email
-        except Exception as e:
-            print(f"Error fetching auth email: {e}")
-            if request.session.get('user_email'):
-                user_info["email"] = request.session.get('user_email')
 
-    notifications, unread_count = fetch_notifications_for(user_id)
+def home_borrowed_requests_query(client, user_id):
+    return client.table('request') \
+        .select('request_id,item_id,user_id,request_date,return_date,status,return') \
+        .eq('user_id', user_id) \
+        .eq('status', 'approved') \
+        .neq('return', True) \
+        .order('request_date', desc=True)
 
 
-    incoming_requests = []
+def home_borrowed_items_query(client, item_ids):
+    return client.table('item').select('item_id,title,user_id,image_url,description').in_('item_id', item_ids)
+
+
+def item_ids_of(rows):
+    return [r.get('item_id') for r in (rows or []) if r.get('item_id')]
+
+
+def decorate_incoming_requests(incoming_requests, my_items):
+    users_map = resolve_display_names(r.get('user_id') for r in incoming_requests)
+
+    items_map = {it.get('item_id'): it.get('title') for it in (my_items or [])}
+    for r in incoming_requests:
+        r['requester_name'] = users_map.get(r.get('user_id'), r.get('user_id'))
+        r['item_title'] = items_map.get(r.get('item_id'), r.get('item_id'))
+        rd = r.get('request_date')
+        try:
+            r_dt = datetime.fromisoformat(rd) if isinstance(rd, str) else rd
+            r['request_date_human'] = r_dt.strftime("%Y-%m-%d %H:%M") if r_dt else rd
+        except Exception:
+            r['request_date_human'] = rd or ''
+    return incoming_requests
+
+
+def sort_items_newest_first(fetched_items):
+    """Client-side ordering for when the ordered available-items query fails."""
+    def _sort_key(it):
+        for k in ("created_at", "created", "inserted_at"):
+            v = it.get(k)
+            if v:
+                return v
+        return it.get("item_id") or ""
     try:
-        items_resp = supabase.table('item').select('item_id,title').eq('user_id', user_id).execute()
-        my_items = items_resp.data or []
-        my_item_ids = [it.get('item_id') for it in my_items if it.get('item_id')]
-
-        if my_item_ids:
-            req_resp = supabase.table('request') \
-                        .select('request_id,item_id,user_id,request_date,status') \
-                        .in_('item_id', my_item_ids) \
-                        .eq('status', 'pending') \
-                        .order('request_date', desc=True) \
-                        .execute()
-            incoming_requests = req_resp.data or []
-
-            req_user_ids = list({r.get('user_id') for r in incoming_requests if r.get('user_id')})
-            users_map = {}
-            if req_user_ids:
-                uresp = supabase.table('user').select('id,first_name,last_name,email').in_('id', req_user_ids).execute()
-                for u in (uresp.data or []):
-                    display = ((u.get('first_name') or '') + ' ' + (u.get('last_name') or '')).strip()
-                    if not display:
-                        display = u.get('email') or u.get('id')
-                    users_map[u.get('id')] = display
-
-            items_map = {it.get('item_id'): it.get('title') for it in (my_items or [])}
-            for r in incoming_requests:
-                r['requester_name'] = users_map.get(r.get('user_id'), r.get('user_id'))
-                r['item_title'] = items_map.get(r.get('item_id'), r.get('item_id'))
-                rd = r.get('request_date')
-                try:
-                    r_dt = datetime.fromisoformat(rd) if isinstance(rd, str) else rd
-                    r['request_date_human'] = r_dt.strftime("%Y-%m-%d %H:%M") if r_dt else rd
-                except Exception:
-                    r['request_date_human'] = rd or ''
+        return sorted(fetched_items, key=_sort_key, reverse=True)
     except Exception:
-        incoming_requests = []
+        return fetched_items
 
-    fetched_items = []
-    try:
-        try:
-            items_resp = supabase.table("item") \
-                .select("*") \
-                .eq("available", True) \
-                .neq("user_id", user_id) \
-                .order("created_at", desc=True) \
-                .limit(7) \
-                .execute()
-            if getattr(items_resp, "error", None):
-                raise Exception("Ordered query error")
-            fetched_items = items_resp.data or []
-        except Exception as q_exc:
-            items_resp = supabase.table("item").select("*").eq("available", True).neq("user_id", user_id).execute()
-            fetched_items = items_resp.data or []
-            def _sort_key(it):
-                for k in ("created_at", "created", "inserted_at"):
-                    v = it.get(k)
-                    if v:
-                        return v
-                return it.get("item_id") or ""
-            try:
-                fetched_items = sorted(fetched_items, key=_sort_key, reverse=True)
-            except Exception:
-                pass
-    except Exception as e:
-        logger.exception("Exception fetching available items: %s", e)
-        fetched_items = []
 
-    show_more = len(fetched_items) > 6
+def decorate_available_items(fetched_items):
+    """The first six items with display dates, owner names and thumbnails, and whether there are more."""
     available_items = fetched_items[:6]
 
     for itm in available_items:
@@ -430,191 +423,149 @@ def home(request):
         itm["created_at_iso"] = iso
         itm["created_at_human"] = human
 
-    owner_ids = [itm.get('user_id') for itm in available_items if itm.get('user_id')]
-    owner_map = {}
-    if owner_ids:
-        try:
-            owner_list = list(set(owner_ids))
-            owners_resp = supabase.table("user").select("id,first_name,last_name,email").in_("id", owner_list).execute()
-            if not getattr(owners_resp, "error", None):
-                for o in (owners_resp.data or []):
-                    display = ((o.get('first_name') or '') + ' ' + (o.get('last_name') or '')).strip() or o.get('email') or o.get('id')
-                    owner_map[o.get('id')] = display
-        except Exception:
-            for oid in owner_ids:
-                if oid in owner_map:
-                    continue
-                try:
-                    oresp = supabase.table('user').select('id,first_name,last_name,email').eq('id', oid).single().execute()
-                    if getattr(oresp, 'error', None):
-                        owner_map[oid] = str(oid)
-                    else:
-                        o = oresp.data or {}
-                        display = ((o.get('first_name') or '') + ' ' + (o.get('last_name') or '')).strip() or o.get('email') or o.get('id') or str(oid)
-                        owner_map[oid] = display
-                except Exception:
-                    owner_map[oid] = str(oid)
+    owner_map = resolve_display_names(itm.get('user_id') for itm in available_items)
 
     for itm in available_items:
         owner_id = itm.get('user_id') or itm.get('owner') or itm.get('user')
         itm['owner_display'] = owner_map.get(owner_id, 'Unknown')
         itm['owner_id'] = owner_id
+        itm['thumb_url'] = images.variant_url(itm.get('image_url'), 'card')
 
+    return available_items, len(fetched_items) > 6
 
-    borrowed_items = []
-    try:
-        br_req_resp = supabase.table('request') \
-              .select('request_id,item_id,user_id,request_date,return_date,status,return') \
-              .eq('user_id', user_id) \
-              .eq('status', 'approved') \
-              .neq('return', True) \
-              .order('request_date', desc=True) \
-              .execute()
-        br_reqs = br_req_resp.data or []
-
-        if br_reqs:
-            item_ids = [r.get('item_id') for r in br_reqs if r.get('item_id')]
-            items_map = {}
-            if item_ids:
-                items_resp2 = supabase.table('item').select('item_id,title,user_id,image_url,description').in_('item_id', item_ids).execute()
-                for it in (items_resp2.data or []):
-                    items_map[it.get('item_id')] = it
-
-            owner_ids = [ (items_map.get(r.get('item_id')) or {}).get('user_id') for r in br_reqs ]
-            owner_ids = [oid for oid in owner_ids if oid]
-
-            owner_map = {}
-            if owner_ids:
-                try:
-                    owners_resp = supabase.table('user').select('id,first_name,last_name,email').in_('id', list(set(owner_ids))).execute()
-                    if not getattr(owners_resp, 'error', None):
-                        for o in (owners_resp.data or []):
-                            display = ((o.get('first_name') or '') + ' ' + (o.get('last_name') or '')).strip() or o.get('email') or o.get('id')
-                            owner_map[o.get('id')] = display
-                except Exception:
-                    for oid in owner_ids:
-                        owner_map.setdefault(oid, str(oid))
-
-            for r in br_reqs:
-                itm = items_map.get(r.get('item_id')) or {}
-                rd = r.get('return_date') or r.get('request_date')
-                try:
-                    r_dt = datetime.fromisoformat(rd) if isinstance(rd, str) else rd
-                    return_date_human = r_dt.strftime("%b %d, %Y · %I:%M %p") if r_dt else rd
-                except Exception:
-                    return_date_human = rd or ''
-
-                borrowed_items.append({
-                    "request_id": r.get('request_id'),
-                    "item_id": r.get('item_id'),
-                    "item_title": itm.get('title') or r.get('item_id'),
-                    "owner_id": itm.get('user_id'),
-                    "owner_display": owner_map.get(itm.get('user_id'), "Unknown"),
-                    "item_image": itm.get('image_url') or None,
-                    "item_description": itm.get('description') or '',
-                    "borrow_date": r.get('request_date'),
-                    "return_date": r.get('return_date'),
-                    "return_date_human": return_date_human,
-                    "status": r.get('status')
-                })
-    except Exception:
-        borrowed_items = []
 
+def borrowed_item_rows(br_reqs, borrowed_items_rows):
+    items_map = {it.get('item_id'): it for it in (borrowed_items_rows or [])}
+    owner_map = resolve_display_names((items_map.get(r.get('item_id')) or {}).get('user_id') for r in br_reqs)
 
-    overdue_items = []
-    overdue_count = 0
-    try:
-        now_utc = datetime.now(timezone.utc)
-        for b in borrowed_items:
-            rd = b.get("return_date")
-            if not rd:
-                continue
-            try:
-                if isinstance(rd, str):
-                    parsed = datetime.fromisoformat(rd)
-                else:
-                    parsed = rd
-
-                if parsed.tzinfo is None:
-                    parsed_utc = parsed.replace(tzinfo=timezone.utc)
-                else:
-                    parsed_utc = parsed.astimezone(timezone.utc)
-
-                if parsed_utc < now_utc:
-                    overdue_items.append(b)
-            except Exception:
-                continue
-        overdue_count = len(overdue_items)
-    except Exception:
-        overdue_items = []
-        overdue_count = 0
-
-    
-    # compute lent_out_count (items you own that are currently lent out)
-    lent_out_count = 0
-    try:
-        # ensure we have my_item_ids (list of item_id strings)
-        if 'my_item_ids' not in locals():
-            items_resp = supabase.table('item').select('item_id').eq('user_id', user_id).execute()
-            my_item_ids = [it.get('item_id') for it in (items_resp.data or [])]
+    borrowed_items = []
+    for r in br_reqs:
+        itm = items_map.get(r.get('item_id')) or {}
+        rd = r.get('return_date') or r.get('request_date')
+        try:
+            r_dt = datetime.fromisoformat(rd) if isinstance(rd, str) else rd
+            return_date_human = r_dt.strftime("%b %d, %Y · %I:%M %p") if r_dt else rd
+        except Exception:
+            return_date_human = rd or ''
+
+        borrowed_items.append({
+            "request_id": r.get('request_id'),
+            "item_id": r.get('item_id'),
+            "item_title": itm.get('title') or r.get('item_id'),
+            "owner_id": itm.get('user_id'),
+            "owner_display": owner_map.get(itm.get('user_id'), "Unknown"),
+            "item_image": itm.get('image_url') or None,
+            "item_description": itm.get('description') or '',
+            "borrow_date": r.get('request_date'),
+            "return_date": r.get('return_date'),
+            "return_date_human": return_date_human,
+            "status": r.get('status')
+        })
+    return borrowed_items
 
-        if my_item_ids:
-            try:
-                # Query active approved requests for your items
-                reqs_resp = supabase.table('request') \
-                    .select('request_id,item_id,status,return') \
-                    .in_('item_id', my_item_ids) \
-                    .eq('status', 'approved') \
-                    .neq('return', True) \
-                    .execute()
-
-                lent_out_count = len(reqs_resp.data or [])
-            except Exception:
-                # Fallback: fetch all matching requests then filter in Python
-                all_reqs_resp = supabase.table('request').select('request_id,item_id,status,return').in_('item_id', my_item_ids).execute()
-                lent_out_count = sum(1 for r in (all_reqs_resp.data or []) if r.get('status') == 'approved' and not r.get('return'))
-        else:
-            lent_out_count = 0
-    except Exception:
-        lent_out_count = 0
 
+def home_context(results):
+    """Template context for home.html from the results of the home plan."""
+    user_info = results["user_info"] or None
+    notifications, unread_count = results["notifications"]
+    available_items, show_more = results["available_items"]
+    borrowed_items = results["borrowed_items"]
 
+    due_states = results["due_states"]
+    for b in borrowed_items:
+        b["due_state"] = overdue.state_for(b, due_states)
+    overdue_items = [b for b in borrowed_items if b["due_state"] == overdue.STATE_OVERDUE]
 
-    return render(request, "home.html", {
+    return {
         "user_info": user_info,
         "available_items": available_items,
         "show_more": show_more,
         "SUPABASE_URL": SUPABASE_URL,
         "SUPABASE_ANON_KEY": settings.SUPABASE_ANON_KEY,
-        "incoming_requests": incoming_requests,
+        "incoming_requests": results["incoming_requests"],
         "borrowed_items": borrowed_items,
         "notifications": notifications,
         "overdue_items": overdue_items,
-        "overdue_count": overdue_count,
+        "overdue_count": len(overdue_items),
         "unread_count": unread_count,
-        "lent_out_count": lent_out_count,
-    })
+        "lent_out_count": results["lent_out_count"],
+    }
+
+
+@query_budget(20)
+@supabase_login_required
+def home(request):
+    user_id = request.session.get("supabase_user_id")
+
+    user_ctx = get_user_context(request)
+
+    def fetch_my_items():
+        return home_my_items_query(supabase, user_id).execute().data or []
+
+    def fetch_incoming_requests(my_items):
+        my_item_ids = item_ids_of(my_items)
+        if not my_item_ids:
+            return []
+        incoming_requests = home_incoming_requests_query(supabase, my_item_ids).execute().data or []
+        return decorate_incoming_requests(incoming_requests, my_items)
+
+    def fetch_lent_out_count(my_items):
+        my_item_ids = item_ids_of(my_items)
+        if not my_item_ids:
+            return 0
+        return home_lent_out_query(supabase, my_item_ids).execute().count or 0
+
+    def fetch_available_items():
+        try:
+            items_resp = home_available_items_query(supabase, user_id).execute()
+            if getattr(items_resp, "error", None):
+                raise Exception("Ordered query error")
+            fetched_items = items_resp.data or []
+        except Exception as q_exc:
+            items_resp = home_available_items_query(supabase, user_id, ordered=False).execute()
+            fetched_items = sort_items_newest_first(items_resp.data or [])
+        return decorate_available_items(fetched_items)
+
+    def fetch_borrowed_items():
+        br_reqs = home_borrowed_requests_query(supabase, user_id).execute().data or []
+        if not br_reqs:
+            return []
+        item_ids = item_ids_of(br_reqs)
+        items_rows = (home_borrowed_items_query(supabase, item_ids).execute().data or []) if item_ids else []
+        return borrowed_item_rows(br_reqs, items_rows)
+
+    # independent chains run concurrently (see sharehub/query_plan.py)
+    plan = QueryPlan("home")
+    plan.add("user_info", lambda: user_ctx.user_info)
+    plan.add("notifications", lambda: (user_ctx.notifications, user_ctx.unread_count), default=([], 0))
+    plan.add("my_items", fetch_my_items, default=[])
+    plan.add("incoming_requests", fetch_incoming_requests, after=["my_items"], default=[])
+    plan.add("lent_out_count", fetch_lent_out_count, after=["my_items"], default=0)
+    plan.add("available_items", fetch_available_items, default=([], False))
+    plan.add("borrowed_items", fetch_borrowed_items, default=[])
+    plan.add("due_states", lambda: overdue.fetch_states(user_id=user_id), default=None)
+    results = plan.run()
+
+    return render(request, "home.html", home_context(results))
  
  
 @supabase_login_required
 def profile(request):
     user_id = request.session.get("supabase_user_id")
-    
-    # Fetch from database
-    profile_resp = supabase.table("user").select("*").eq("id", user_id).single().execute()
-    user_info = profile_resp.data if profile_resp.data else {}
+    user_ctx = get_user_context(request)
 
-    # ALWAYS get email from Supabase Auth (source of truth)
-    try:
-        auth_user_resp = supabase.auth.admin.get_user_by_id(user_id)
-        if auth_user_resp.user:
-            user_info["email"] = auth_user_resp.user.email
-            request.session['user_email'] = auth_user_resp.user.email  # Update session too
-    except Exception as e:
-        print(f"Error fetching auth email: {e}")
-        # Fallback to session
-        if request.session.get('user_email'):
-            user_info["email"] = request.session.get('user_email')
+    def fetch_requests():
+        req_resp = supabase.table("request").select("request_id,status,return,return_date,request_date").eq("user_id", user_id).execute()
+        return req_resp.data or []
+
+    plan = QueryPlan("profile")
+    plan.add("user_info", lambda: user_ctx.user_info)
+    plan.add("notifications", lambda: (user_ctx.notifications, user_ctx.unread_count), default=([], 0))
+    plan.add("requests", fetch_requests, default=[])
+    plan.add("due_states", lambda: overdue.fetch_states(user_id=user_id), default=None)
+    results = plan.run()
+
+    user_info = results["user_info"] or {}
 
     # ... rest of your existing borrow_stats code ...
     borrow_stats = {
@@ -628,9 +579,9 @@ def profile(request):
     }
 
     try:
-        req_resp = supabase.table("request").select("*").eq("user_id", user_id).execute()
-        reqs = req_resp.data or []
+        reqs = results["requests"]
         borrow_stats["total_requests"] = len(reqs)
+        due_states = results["due_states"]
 
         now_utc = datetime.now(timezone.utc)
 
@@ -655,18 +606,8 @@ def profile(request):
                 borrow_stats["total_returned"] += 1
 
             if status == "approved" and not is_returned:
-                rd = r.get("return_date")
-                if rd:
-                    try:
-                        parsed = datetime.fromisoformat(rd) if isinstance(rd, str) else rd
-                        if parsed.tzinfo is None:
-                            parsed_utc = parsed.replace(tzinfo=timezone.utc)
-                        else:
-                            parsed_utc = parsed.astimezone(timezone.utc)
-                        if parsed_utc < now_utc:
-                            borrow_stats["overdue"] += 1
-                    except Exception:
-                        pass
+                if overdue.state_for(r, due_states, now_utc) == overdue.STATE_OVERDUE:
+                    borrow_stats["overdue"] += 1
 
             rd = r.get("request_date")
             if rd:
@@ -697,7 +638,7 @@ def profile(request):
         "month_counts": borrow_stats["month_counts"],
     })
 
-    notifications, unread_count = fetch_notifications_for(user_id)
+    notifications, unread_count = results["notifications"]
     return render(request, "profile/profile.html", {
         "user_info": user_info,
         "notifications": notifications,
@@ -710,20 +651,8 @@ def profile(request):
 @supabase_login_required
 def edit_profile(request):
     user_id = request.session.get("supabase_user_id")
- 
-    profile_resp = supabase.table("user").select("*").eq("id", user_id).single().execute()
-    user_info = profile_resp.data or {}
- 
-    # ALWAYS get email from Supabase Auth (source of truth)
-    try:
-        auth_user_resp = supabase.auth.admin.get_user_by_id(user_id)
-        if auth_user_resp.user:
-            user_info["email"] = auth_user_resp.user.email
-            request.session['user_email'] = auth_user_resp.user.email
-    except Exception as e:
-        print(f"Error fetching auth email: {e}")
-        if request.session.get('user_email'):
-            user_info["email"] = request.session.get('user_email')
+    user_ctx = get_user_context(request)
+    user_info = user_ctx.user_info or {}
  
     if request.method == "POST":
         first_name = request.POST.get("first_name")
@@ -736,13 +665,17 @@ def edit_profile(request):
  
         file = request.FILES.get("profile_picture")
         profile_picture_url = user_info.get("profile_picture")
+        upload_err = uploads.upload_error(request, "profile_picture")
+        if upload_err:
+            messages.error(request, upload_err)
 
         if file:
             ext = os.path.splitext(file.name)[1]
             file_name = f"{user_id}/{uuid.uuid4()}{ext}"
-            file_bytes = file.read()
  
-            upload_res = supabase.storage.from_("profile-pics").upload(file_name, file_bytes)
+            upload_res = supabase.storage.from_("profile-pics").upload(
+                file_name, uploads.storage_body(file), {"content-type": file.content_type}
+            )
             if hasattr(upload_res, "error") and upload_res.error:
                 messages.error(request, "Failed to upload image.")
             else:
@@ -759,6 +692,7 @@ def edit_profile(request):
             "year_level": year_level,
             "profile_picture": profile_picture_url,
         }).eq("id", user_id).execute()
+        invalidate_profile(user_id)
  
         if getattr(update_response, "error", None):
             messages.error(request, "Failed to update your profile.")
@@ -781,6 +715,7 @@ def edit_profile(request):
         req_resp = supabase.table("request").select("*").eq("user_id", user_id).execute()
         reqs = req_resp.data or []
         borrow_stats["total_requests"] = len(reqs)
+        due_states = overdue.fetch_states(user_id=user_id)
 
         now_utc = datetime.now(timezone.utc)
 
@@ -805,18 +740,8 @@ def edit_profile(request):
                 borrow_stats["total_returned"] += 1
 
             if status == "approved" and not is_returned:
-                rd = r.get("return_date")
-                if rd:
-                    try:
-                        parsed = datetime.fromisoformat(rd) if isinstance(rd, str) else rd
-                        if parsed.tzinfo is None:
-                            parsed_utc = parsed.replace(tzinfo=timezone.utc)
-                        else:
-                            parsed_utc = parsed.astimezone(timezone.utc)
-                        if parsed_utc < now_utc:
-                            borrow_stats["overdue"] += 1
-                    except Exception:
-                        pass
+                if overdue.state_for(r, due_states, now_utc) == overdue.STATE_OVERDUE:
+                    borrow_stats["overdue"] += 1
 
             rd = r.get("request_date")
             if rd:
@@ -846,7 +771,7 @@ def edit_profile(request):
         "month_counts": borrow_stats["month_counts"],
     })
 
-    notifications, unread_count = fetch_notifications_for(user_id)
+    notifications, unread_count = user_ctx.notifications, user_ctx.unread_count
 
     return render(request, "profile/edit_profile.html", {
         "user_info": user_info,
@@ -859,23 +784,17 @@ def edit_profile(request):
  
 @supabase_login_required
 def settings_view(request):
-    user_id = request.session.get("supabase_user_id")
- 
-    profile_resp = supabase.table("user").select("*").eq("id", user_id).single().execute()
-    user_info = profile_resp.data if profile_resp.data else {}
+    user_info = get_user_context(request).user_info or {}
  
-    # ALWAYS get email from Supabase Auth (source of truth)
+    return render(request, "settings.html", {"user_info": user_info})
+
+
+def _end_password_check(session_obj):
+    """Revoke the GoTrue session sign_in() opened to check a password, so it doesn't linger with a live refresh token."""
     try:
-        auth_user_resp = supabase.auth.admin.get_user_by_id(user_id)
-        if auth_user_resp.user:
-            user_info["email"] = auth_user_resp.user.email
-            request.session['user_email'] = auth_user_resp.user.email
+        auth_service.sign_out(getattr(session_obj, "access_token", None))
     except Exception as e:
-        print(f"Error fetching auth email: {e}")
-        if request.session.get('user_email'):
-            user_info["email"] = request.session.get('user_email')
- 
-    return render(request, "settings.html", {"user_info": user_info})
+        logger.warning("Could not revoke password-check session: %s", e)
 
 
 @require_POST
@@ -902,40 +821,32 @@ def update_email(request):
     current_email = request.session.get('user_email')
     
     if not current_email:
-        try:
-            user_data = supabase.table('user').select('email').eq('id', user_id).execute()
-            if user_data.data and len(user_data.data) > 0:
-                current_email = user_data.data[0].get('email')
-        except:
-            pass
+        current_email = (get_profile(user_id) or {}).get('email')
     
     if not current_email:
         return JsonResponse({'errors': {'general': [{'message': 'Unable to determine current email'}]}}, status=400)
 
     # Step 1: Verify password
+    session_obj = None
     try:
-        signin_resp = supabase.auth.sign_in_with_password({
-            'email': current_email, 
-            'password': current_password
-        })
+        signin_resp = auth_service.sign_in(current_email, current_password)
         user_obj = getattr(signin_resp, 'user', None)
         session_obj = getattr(signin_resp, 'session', None)
         
         if not user_obj or not session_obj:
             return JsonResponse({'errors': {'current_password': [{'message': 'Invalid password'}]}}, status=400)
         
-        access_token = session_obj.access_token
-        refresh_token = session_obj.refresh_token
-        
     except Exception as e:
         return JsonResponse({'errors': {'current_password': [{'message': 'Invalid password'}]}}, status=400)
+    finally:
+        _end_password_check(session_obj)
 
     # Step 2: Update email in Supabase Auth (with service role - no email verification needed)
     try:
-        sync_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+        sync_client = get_service_client()
         
         # ✅ KEY: Use admin API to update without verification
-        update_resp = sync_client.auth.admin.update_user_by_id(
+        update_resp = auth_service.admin().update_user_by_id(
             user_id, 
             {"email": new_email, "email_confirm": True}  # Skip verification!
         )
@@ -950,9 +861,11 @@ def update_email(request):
             }).eq('id', user_id).execute()
         except Exception as sync_err:
             print(f'⚠️ Table sync warning: {sync_err}')
+        invalidate_profile(user_id)
         
-        # Step 4: Update session
+        # Step 4: Update session (a refreshed token carries the new email claim)
         request.session['user_email'] = new_email
+        auth_tokens.refresh(request)
         request.session.modified = True
         
         return JsonResponse({
@@ -976,13 +889,8 @@ def confirm_email_change(request):
         token_type = request.GET.get('type')
         
         if token_type == 'email_change' and access_token:
-            # Exchange the session
-            from supabase import create_client
-            temp_client = create_client(SUPABASE_URL, SUPABASE_KEY)
-            temp_client.auth.set_session(access_token, refresh_token)
-            
             # Get updated user
-            user_resp = temp_client.auth.get_user()
+            user_resp = auth_service.get_user(access_token)
             updated_user = getattr(user_resp, 'user', None)
             
             if updated_user:
@@ -990,12 +898,15 @@ def confirm_email_change(request):
                 user_id = updated_user.id
                 
                 # Update user table
-                sync_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+                sync_client = get_service_client()
                 sync_client.table('user').update({'email': new_email}).eq('id', user_id).execute()
+                invalidate_profile(user_id)
                 
                 # Update session
                 request.session['user_email'] = new_email
                 request.session['supabase_user_id'] = user_id
+                if refresh_token:
+                    auth_tokens.store_tokens(request.session, access_token, refresh_token)
                 request.session.modified = True
                 
                 messages.success(request, f'Email successfully changed to {new_email}!')
@@ -1035,52 +946,46 @@ def update_password(request):
     current_email = request.session.get('user_email')
     
     if not current_email:
-        try:
-            user_data = supabase.table('user').select('email').eq('id', user_id).execute()
-            if user_data.data and len(user_data.data) > 0:
-                current_email = user_data.data[0].get('email')
-        except:
-            pass
+        current_email = (get_profile(user_id) or {}).get('email')
     
     if not current_email:
         return JsonResponse({'errors': {'general': [{'message': 'Unable to determine current email'}]}}, status=400)
 
-    print(f'DEBUG: Attempting sign-in with email: {current_email}')
+    logger.debug("update_password: verifying the current password of %s", user_id)
 
+    session_obj = None
     try:
-        signin_resp = supabase.auth.sign_in_with_password({'email': current_email, 'password': current_password})
-        user_obj = getattr(signin_resp, 'user', None)
-        session_obj = getattr(signin_resp, 'session', None)
-        
-        if not user_obj or not session_obj:
-            print('DEBUG: Sign-in failed')
+        try:
+            signin_resp = auth_service.sign_in(current_email, current_password)
+            user_obj = getattr(signin_resp, 'user', None)
+            session_obj = getattr(signin_resp, 'session', None)
+
+            if not user_obj or not session_obj:
+                logger.debug("update_password: sign-in failed for %s", user_id)
+                return JsonResponse({'errors': {'current_password': [{'message': 'Invalid password'}]}}, status=400)
+
+            access_token = session_obj.access_token
+            logger.debug("update_password: sign-in succeeded for %s", user_id)
+
+        except Exception as e:
+            logger.debug("update_password: sign-in error for %s: %s", user_id, e)
             return JsonResponse({'errors': {'current_password': [{'message': 'Invalid password'}]}}, status=400)
-        
-        access_token = session_obj.access_token
-        refresh_token = session_obj.refresh_token
-        print('DEBUG: Sign-in successful!')
-        
-    except Exception as e:
-        print(f'Sign-in error: {e}')
-        return JsonResponse({'errors': {'current_password': [{'message': 'Invalid password'}]}}, status=400)
 
-  
-    try:
-        from supabase import create_client
-        user_supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        user_supabase.auth.set_session(access_token, refresh_token)
-        update_resp = user_supabase.auth.update_user({'password': new_password})
-        
-        if hasattr(update_resp, 'error') and update_resp.error:
-            print(f'Password update error: {update_resp.error}')
-            return JsonResponse({'errors': {'general': [{'message': 'Failed to update password'}]}}, status=400)
-        
-        print(f'✅ Password updated successfully for user {user_id}')
-        return JsonResponse({'success': True, 'message': 'Password updated successfully!'})
-        
-    except Exception as e:
-        print(f'❌ Password update exception: {e}')
-        return JsonResponse({'errors': {'general': [{'message': str(e)}]}}, status=400)
+        try:
+            update_resp = auth_service.update_user(access_token, {'password': new_password})
+
+            if hasattr(update_resp, 'error') and update_resp.error:
+                logger.warning("update_password: update failed for %s: %s", user_id, update_resp.error)
+                return JsonResponse({'errors': {'general': [{'message': 'Failed to update password'}]}}, status=400)
+
+            logger.info("update_password: password updated for %s", user_id)
+            return JsonResponse({'success': True, 'message': 'Password updated successfully!'})
+
+        except Exception as e:
+            logger.warning("update_password: update raised for %s: %s", user_id, e)
+            return JsonResponse({'errors': {'general': [{'message': str(e)}]}}, status=400)
+    finally:
+        _end_password_check(session_obj)
 
 
 
@@ -1097,99 +1002,19 @@ def admin_dashboard(request):
       - borrowing_chart and return_chart (JSON serializable dicts)
       - borrowed_items list (for table) and borrowed_items_json
     """
-    now = datetime.utcnow()
-    # safe supabase client (already configured at module top)
+    now = datetime.now(timezone.utc)
     ctx = {}
-    try:
-        # Total users
-        users_resp = supabase.table("user").select("id").execute()
-        total_users = len(getattr(users_resp, "data", []) or [])
-    except Exception:
-        total_users = 0
-
-    try:
-        # Total items and available items
-        items_resp = supabase.table("item").select("item_id,available").execute()
-        items_data = getattr(items_resp, "data", []) or []
-        total_items = len(items_data)
-        available_items_count = sum(1 for it in items_data if bool(it.get("available")))
-    except Exception:
-        total_items = 0
-        available_items_count = 0
-
-    try:
-        # Requests: active / pending / approved
-        req_resp = supabase.table("request").select(
-            "request_id,item_id,user_id,request_date,return_date,status,return"
-        ).execute()
-        reqs = getattr(req_resp, "data", []) or []
-        active_requests = len([r for r in reqs if (r.get("status") or "").lower() in ("pending","approved")])
-        pending_requests = len([r for r in reqs if (r.get("status") or "").lower() == "pending"])
-    except Exception:
-        reqs = []
-        active_requests = 0
-        pending_requests = 0
 
-    # Issues & overdue heuristic: requests approved and past return_date
-    overdue_count = 0
-    try:
-        for r in reqs:
-            status = (r.get("status") or "").lower()
-            if status == "approved":
-                rd = r.get("return_date")
-                if rd:
-                    try:
-                        parsed = datetime.fromisoformat(rd) if isinstance(rd, str) else rd
-                        parsed_utc = parsed if parsed.tzinfo else parsed.replace(tzinfo=None)
-                        if parsed_utc < now:
-                            overdue_count += 1
-                    except Exception:
-                        pass
-    except Exception:
-        overdue_count = 0
-
-    # Borrowing chart data
-    try:
-        total_lent = len([r for r in reqs if (r.get("status") or "").lower() == "approved" or (r.get("status") or "").lower() == "returned"])
-        currently_borrowed = len([r for r in reqs if (r.get("status") or "").lower() == "approved" and not bool(r.get("return") in (True, "True", "true", 1, "1"))])
-        borrowing_chart = {
-            "labels": ["Total Lent", "Currently Borrowed"],
-            "values": [total_lent, currently_borrowed]
-        }
-    except Exception:
-        borrowing_chart = {"labels": ["Total Lent", "Currently Borrowed"], "values": [0,0]}
-
-    # Return performance pie (on-time, late, missing/lost heuristic)
-    try:
-        on_time = late = missing = 0
-        for r in reqs:
-            status = (r.get("status") or "").lower()
-            if status in ("approved", "returned"):
-                if r.get("return") in (True, "True", "true", 1, "1"):
-                    # returned: check return_date vs due
-                    rd = r.get("return_date") or r.get("request_date")
-                    due = r.get("return_date")  # we only have return_date; treat lacking as on-time for simplicity
-                    # best-effort: if return_date exists and is past the request_date => on-time/late detection is limited
-                    try:
-                        if r.get("return"):
-                            # treat these as on_time for now (unless return_date beyond expected logic)
-                            on_time += 1
-                        else:
-                            # not returned yet but approved -> count as late if past due
-                            rd_due = r.get("return_date")
-                            if rd_due:
-                                parsed = datetime.fromisoformat(rd_due) if isinstance(rd_due, str) else rd_due
-                                if parsed < now:
-                                    late += 1
-                                else:
-                                    on_time += 1
-                            else:
-                                on_time += 1
-                    except Exception:
-                        on_time += 1
-        return_chart = {"labels": ["On Time", "Late", "Missing/Lost"], "values": [on_time, late, missing]}
-    except Exception:
-        return_chart = {"labels": ["On Time", "Late", "Missing/Lost"], "values": [0,0,0]}
+    # counts come from one cached, server-side aggregate (sharehub/admin_stats.py)
+    stats = get_admin_stats(refresh=request.GET.get("refresh") == "1")
+    borrowing_chart = {
+        "labels": ["Total Lent", "Currently Borrowed"],
+        "values": [stats["total_lent"], stats["currently_borrowed"]]
+    }
+    return_chart = {
+        "labels": ["On Time", "Late", "Missing/Lost"],
+        "values": [stats["on_time"], stats["late"], 0]
+    }
 
     # Build borrowed_items rows for the table: approved and not returned
     borrowed_items = []
@@ -1200,51 +1025,36 @@ def admin_dashboard(request):
         active_borrowed = getattr(active_borrowed_resp, "data", []) or []
         # fetch items and users for mapping
         item_ids = [r.get("item_id") for r in active_borrowed if r.get("item_id")]
-        user_ids = [r.get("user_id") for r in active_borrowed if r.get("user_id")]
         items_map = {}
-        users_map = {}
         if item_ids:
             its = supabase.table("item").select("item_id,title,user_id").in_("item_id", list(set(item_ids))).execute()
             for it in getattr(its, "data", []) or []:
                 items_map[it.get("item_id")] = it
-        if user_ids:
-            us = supabase.table("user").select("id,first_name,last_name,email").in_("id", list(set(user_ids))).execute()
-            for u in getattr(us, "data", []) or []:
-                display = ((u.get("first_name") or "") + " " + (u.get("last_name") or "")).strip() or u.get("email") or u.get("id")
-                users_map[u.get("id")] = display
+        # borrowers and item owners resolved together in one lookup
+        users_map = resolve_display_names(
+            [r.get("user_id") for r in active_borrowed]
+            + [it.get("user_id") for it in items_map.values()]
+        )
+        # due/overdue state from the last scan (sharehub/overdue.py), computed when there is none
+        due_states = overdue.fetch_states()
 
         for r in active_borrowed:
             it = items_map.get(r.get("item_id"), {})
             item_name = it.get("title") or r.get("item_id")
             owner_id = it.get("user_id") or None
-            owner_display = None
-            if owner_id:
-                # try fetch owner display
-                try:
-                    oresp = supabase.table("user").select("id,first_name,last_name,email").eq("id", owner_id).maybe_single().execute()
-                    od = getattr(oresp, "data", None) or {}
-                    owner_display = ((od.get("first_name") or "") + " " + (od.get("last_name") or "")).strip() or od.get("email") or owner_id
-                except Exception:
-                    owner_display = str(owner_id)
+            owner_display = users_map.get(owner_id, str(owner_id)) if owner_id else None
             borrower = users_map.get(r.get("user_id")) or r.get("user_id")
             due_raw = r.get("return_date") or ""
-            due_text = ""
+            due = overdue.parse_due(due_raw)
+            due_text = due.strftime("%b %d, %Y") if due else str(due_raw)
             overdue_text = ""
             remaining_text = ""
-            if due_raw:
-                try:
-                    parsed = datetime.fromisoformat(due_raw) if isinstance(due_raw, str) else due_raw
-                    parsed_naive = parsed if parsed.tzinfo else parsed
-                    due_text = parsed_naive.strftime("%b %d, %Y")
-                    if parsed_naive < now:
-                        # overdue days
-                        delta = now - parsed_naive
-                        overdue_text = f"{delta.days} days overdue" if delta.days > 0 else "Overdue"
-                    else:
-                        delta = parsed_naive - now
-                        remaining_text = f"{delta.days} days remaining" if delta.days > 0 else ""
-                except Exception:
-                    due_text = str(due_raw)
+            if overdue.state_for(r, due_states, now) == overdue.STATE_OVERDUE:
+                days = (now - due).days if due else 0
+                overdue_text = f"{days} days overdue" if days > 0 else "Overdue"
+            elif due:
+                days = (due - now).days
+                remaining_text = f"{days} days remaining" if days > 0 else ""
             status_label = r.get("status") or ""
             status_class = "on-time"
             sl = status_label.lower()
@@ -1271,13 +1081,14 @@ def admin_dashboard(request):
 
     # context assembly
     ctx.update({
-        "total_users": total_users,
-        "total_items": total_items,
-        "available_items": f"{available_items_count} available",
-        "active_requests": active_requests,
-        "pending_requests": f"{pending_requests} pending",
+        "total_users": stats["total_users"],
+        "total_items": stats["total_items"],
+        "available_items": f"{stats['available_items']} available",
+        "active_requests": stats["active_requests"],
+        "pending_requests": f"{stats['pending_requests']} pending",
         "issues_count": 0,
-        "overdue": f"{overdue_count} overdue",
+        "overdue": f"{stats['overdue']} overdue",
+        "stats_generated_at": stats.get("generated_at"),
         "borrowing_chart": json.dumps(borrowing_chart),
         "return_chart": json.dumps(return_chart),
         "borrowed_items": borrowed_items,
@@ -1291,8 +1102,8 @@ def admin_dashboard(request):
 @never_cache
 @supabase_login_required
 def approve_requests_view(request):
-    user_id = request.session.get("supabase_user_id")
-    notifications, unread_count = fetch_notifications_for(user_id)
+    user_ctx = get_user_context(request)
+    notifications, unread_count = user_ctx.notifications, user_ctx.unread_count
 
     pending_requests = []
     try:
@@ -1304,20 +1115,14 @@ def approve_requests_view(request):
         pending_requests = r.data or []
         # fetch item titles + requester display names
         item_ids = [p.get('item_id') for p in pending_requests if p.get('item_id')]
-        users = list({p.get('user_id') for p in pending_requests if p.get('user_id')})
         items_map = {}
-        users_map = {}
 
         if item_ids:
             items_resp = supabase.table('item').select('item_id,title').in_('item_id', item_ids).execute()
             for it in (items_resp.data or []):
                 items_map[it.get('item_id')] = it.get('title')
 
-        if users:
-            uresp = supabase.table('user').select('id,first_name,last_name,email').in_('id', list(users)).execute()
-            for u in (uresp.data or []):
-                display = ((u.get('first_name') or '') + ' ' + (u.get('last_name') or '')).strip() or u.get('email') or u.get('id')
-                users_map[u.get('id')] = display
+        users_map = resolve_display_names(p.get('user_id') for p in pending_requests)
 
         # attach metadata used by template
         for p in pending_requests:
@@ -1332,14 +1137,17 @@ def approve_requests_view(request):
         "unread_count": unread_count,
     })
 
-def _get_public_or_signed_url(path):
+def _get_public_or_signed_url(path, variant=None):
     """
     Your DB already stores the full public URL for the image.
-    So we simply return it unchanged.
+    So we simply return it -- or, with variant="thumb"/"card"/"full", the
+    URL of that resized copy when the image has them (see sharehub/images.py).
     """
     if not path:
         return ""
 
+    path = images.variant_url(path, variant)
+
     # If already a full URL (Supabase public object URL), return it as-is
     if path.startswith("http://") or path.startswith("https://"):
         return path
@@ -1364,8 +1172,8 @@ def _get_public_or_signed_url(path):
 @never_cache
 @supabase_login_required
 def manage_users_view(request):
-    user_id = request.session.get("supabase_user_id")
-    notifications, unread_count = fetch_notifications_for(user_id)
+    user_ctx = get_user_context(request)
+    notifications, unread_count = user_ctx.notifications, user_ctx.unread_count
 
     users = []
     try:
@@ -1379,11 +1187,7 @@ def manage_users_view(request):
         users = resp.data or []
 
         for u in users:
-            u['display_name'] = (
-                ((u.get('first_name') or '') + ' ' + (u.get('last_name') or '')).strip()
-                or u.get('email')
-                or u.get('id')
-            )
+            u['display_name'] = display_name(u)
             # ensure booleans
             u['is_admin'] = bool(u.get('is_admin'))
             u['is_block'] = bool(u.get('is_block'))
@@ -1407,7 +1211,7 @@ def _ensure_get_public_or_signed_url():
         return globals()["_get_public_or_signed_url"]
 
     # otherwise provide a conservative fallback that returns empty string (or placeholder)
-    def _fallback_get_public_or_signed_url(path):
+    def _fallback_get_public_or_signed_url(path, variant=None):
         return ""  # we let view replace with placeholder later
     return _fallback_get_public_or_signed_url
 
@@ -1473,7 +1277,7 @@ def admin_user_details_api(request):
             raw_path = (it.get("image_url") or it.get("image") or it.get("image_path") or "") if isinstance(it, dict) else ""
             thumbnail_url = ""
             try:
-                thumbnail_url = _get_url(raw_path) if raw_path else ""
+                thumbnail_url = _get_url(raw_path, "thumb") if raw_path else ""
             except Exception as e:
                 print("DEBUG: _get_url failed for owned:", e)
                 thumbnail_url = ""
@@ -1535,7 +1339,7 @@ def admin_user_details_api(request):
                     raw_path = itm.get("image_url") or itm.get("image") or itm.get("image_path") or ""
                     thumbnail = ""
                     try:
-                        thumbnail = _get_url(raw_path) if raw_path else ""
+                        thumbnail = _get_url(raw_path, "thumb") if raw_path else ""
                     except Exception as e:
                         print("DEBUG: _get_url failed for borrowed item:", e)
                         thumbnail = ""
@@ -1613,11 +1417,12 @@ def toggle_user_admin(request):
     if not settings.SUPABASE_SERVICE_ROLE_KEY:
         return JsonResponse({'error': 'Server misconfigured'}, status=500)
 
-    admin_client = create_supabase_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+    admin_client = get_service_client()
     try:
         upd = admin_client.table('user').update({'is_admin': make_admin}).eq('id', target_id).execute()
         if getattr(upd, 'error', None):
             return JsonResponse({'error': 'Failed to update'}, status=500)
+        invalidate_profile(target_id)
         return JsonResponse({'success': True, 'is_admin': make_admin})
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -1660,7 +1465,7 @@ def report_issue_api(request):
         "title": title,
         "description": description,
         "status": "open",
-        "created_at": timezone.now().isoformat()
+        "created_at": datetime.now(timezone.utc).isoformat()
     }
 
     try:
@@ -1749,7 +1554,7 @@ def forgot_password(request):
     redirect_to = getattr(settings, "SUPABASE_RESET_REDIRECT", None) or "http://127.0.0.1:8000/reset-password"
 
     try:
-        supabase.auth.reset_password_for_email(email, {"redirect_to": redirect_to})
+        auth_service.reset_password_for_email(email, redirect_to=redirect_to)
         return JsonResponse({"success": True, "message": "A reset link has been sent to your email."})
     except AuthApiError as e:
         if getattr(settings, "DEBUG", False):
@@ -1805,29 +1610,20 @@ def add_item(request):
 
     file = request.FILES.get("image") or request.FILES.get("itemImage")
     image_url = None
+    upload_err = uploads.upload_error(request)
+    if upload_err:
+        return JsonResponse({"errors": {"image": [{"message": upload_err}]}}, status=400)
 
     if not SUPABASE_SERVICE_ROLE_KEY:
         logger.error("Missing SUPABASE_SERVICE_ROLE_KEY")
         return JsonResponse({"errors": {"general": [{"message": "Server misconfigured: missing service role key"}]}}, status=500)
 
-    admin_client = create_supabase_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    admin_client = get_service_client()
 
     try:
         if file:
-            ext = os.path.splitext(file.name)[1] or ".bin"
-            filename = f"{user_id}/{uuid.uuid4()}{ext}"
-            file_bytes = file.read()
-
-            upload_res = admin_client.storage.from_("item-images").upload(filename, file_bytes)
-            if getattr(upload_res, "error", None):
-                err = upload_res.error
-                msg = getattr(err, "message", str(err))
-                logger.error("Upload error: %s", msg)
-                return JsonResponse({"errors": {"image": [{"message": f"Failed to upload image: {msg}"}]}}, status=500)
-
-            public = admin_client.storage.from_("item-images").get_public_url(filename)
-            image_url = (public.get("publicUrl") if isinstance(public, dict) and public.get("publicUrl") else
-                         getattr(public, "public_url", None) or getattr(public, "publicUrl", None) or (public if isinstance(public, str) else None))
+            # resized thumb/card/full variants when possible (see sharehub/images.py)
+            image_url = images.upload_item_image(admin_client, user_id, file)
             logger.info("   image_url=%s", image_url)
     except Exception as e:
         logger.exception("Image upload exception")
@@ -1857,6 +1653,7 @@ def add_item(request):
             return JsonResponse({"errors": {"general": [{"message": f"Failed to create item: {msg}"}]}}, status=500)
 
         logger.info("✅ [add_item] success item_id=%s", item_id)
+        sync_item_indexes(supabase, item_id, item=payload)
         return JsonResponse({
             "success": True,
             "item_id": item_id,
@@ -1874,62 +1671,137 @@ def add_item(request):
 @supabase_login_required
 def borrow_items(request):
     """
-    Render borrow_items.html with available_items including owner_display and owner_id
+    Render borrow_items.html with the first page of available items; the rest
+    is loaded from /api/catalog/ as the user scrolls.
     """
     user_id = request.session.get("supabase_user_id")
-    available_items = []
-
-    try:
-        items_resp = supabase.table("item").select("*").eq("available", True).neq("user_id", user_id).execute()
-        if getattr(items_resp, "error", None):
-            available_items = []
-        else:
-            available_items = items_resp.data or []
-    except Exception:
-        available_items = []
-
+    user_ctx = get_user_context(request)
 
-    owner_ids = {itm.get("user_id") for itm in available_items if itm.get("user_id")}
-    owner_map = {}
-    if owner_ids:
-        try:
-            owners_resp = supabase.table("user").select("id,first_name,last_name,email").in_("id", list(owner_ids)).execute()
-            if not getattr(owners_resp, "error", None):
-                for o in (owners_resp.data or []):
-                    display = ( (o.get("first_name") or "") + " " + (o.get("last_name") or "") ).strip()
-                    if not display:
-                        display = o.get("email") or o.get("id")
-                    owner_map[o.get("id")] = display
-        except Exception:
+    plan = QueryPlan("borrow_items")
+    plan.add("catalog", lambda: fetch_catalog_page(supabase, user_id, catalog_page_size(None), with_total=True),
+             default=([], None, None))
+    # fetch notifications for current user to show in borrow_items header
+    plan.add("notifications", lambda: (user_ctx.notifications, user_ctx.unread_count), default=([], 0))
+    results = plan.run()
 
-            for oid in owner_ids:
-                try:
-                    oresp = supabase.table("user").select("id,first_name,last_name,email").eq("id", oid).single().execute()
-                    o = getattr(oresp, "data", None)
-                    if o:
-                        display = ( (o.get("first_name") or "") + " " + (o.get("last_name") or "") ).strip() or o.get("email") or o.get("id")
-                        owner_map[oid] = display
-                except Exception:
-                    owner_map[oid] = str(oid)
+    return render(request, "borrow_items.html", borrow_items_context(results))
 
-    for itm in available_items:
-        owner_id = itm.get("user_id") or itm.get("owner") or itm.get("user")
-        itm["owner_display"] = owner_map.get(owner_id, "Unknown")
-        itm["owner_id"] = owner_id
 
-    # fetch notifications for current user to show in borrow_items header
-    notifications, unread_count = fetch_notifications_for(user_id)
-
-    return render(request, "borrow_items.html", {
+def borrow_items_context(results):
+    """Template context for borrow_items.html from the results of its plan (also used by the async view)."""
+    available_items, next_cursor, total = results["catalog"]
+    notifications, unread_count = results["notifications"]
+    return {
         "available_items": available_items,
+        "available_total": total if total is not None else len(available_items),
+        "next_cursor": next_cursor or "",
         "SUPABASE_URL": SUPABASE_URL,
         "SUPABASE_ANON_KEY": SUPABASE_ANON_KEY,
         "REQUEST_BORROW_URL": "/request-borrow/",
         "notifications": notifications,
         "unread_count": unread_count,
+    }
+
+
+@require_GET
+@supabase_login_required
+def catalog_api(request):
+    """
+    GET /api/catalog/?cursor=&limit=&sort=recent|oldest&category=..&condition=..&owner=
+
+    category and condition may be repeated. Returns
+    {"results": [...], "next_cursor": "..." | null, "total": int | null};
+    total is only counted for the first page.
+    """
+    user_id = request.session.get("supabase_user_id")
+    sort = request.GET.get("sort") or "recent"
+    if sort not in CATALOG_SORTS:
+        return JsonResponse({"error": "Invalid sort"}, status=400)
+    cursor = request.GET.get("cursor") or None
+
+    try:
+        items, next_cursor, total = fetch_catalog_page(
+            supabase,
+            user_id,
+            catalog_page_size(request.GET.get("limit")),
+            cursor=cursor,
+            categories=[c for c in request.GET.getlist("category") if c],
+            conditions=[c for c in request.GET.getlist("condition") if c],
+            owner_id=request.GET.get("owner") or None,
+            sort=sort,
+            with_total=cursor is None,
+        )
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+    except Exception as e:
+        logging.getLogger(__name__).exception("catalog_api error: %s", e)
+        return JsonResponse({"error": "Failed to load items"}, status=500)
+
+    return JsonResponse({"results": items, "next_cursor": next_cursor, "total": total})
+
+
+@require_GET
+@supabase_login_required
+def search_api(request):
+    """
+    GET /api/search/?q=&page=&limit=&category=..&condition=..
+
+    Ranked available items matching q (title, category, description);
+    category and condition may be repeated, as for /api/catalog/.
+    Returns {"results": [...], "total": int, "page": int, "has_more": bool}.
+    """
+    user_id = request.session.get("supabase_user_id")
+    query = (request.GET.get("q") or "").strip()[:200]
+    limit = catalog_page_size(request.GET.get("limit"))
+    try:
+        page = max(1, int(request.GET.get("page") or 1))
+    except ValueError:
+        page = 1
+
+    try:
+        rows, total = search.search_items(
+            supabase, query, viewer_id=user_id, limit=limit, offset=(page - 1) * limit,
+            categories=[c for c in request.GET.getlist("category") if c],
+            conditions=[c for c in request.GET.getlist("condition") if c],
+        )
+    except Exception as e:
+        logging.getLogger(__name__).exception("search_api error: %s", e)
+        return JsonResponse({"error": "Search failed"}, status=500)
+
+    return JsonResponse({
+        "results": decorate_items(rows),
+        "total": total,
+        "page": page,
+        "has_more": page * limit < total,
     })
 
 
+@require_GET
+@supabase_login_required
+def typeahead_api(request):
+    """
+    GET /api/typeahead/?q=&limit=
+
+    Item titles and categories completing q, for the search box.
+    Returns {"results": [{"label": str, "kind": "title"|"category", "count": int}]}.
+    """
+    prefix = (request.GET.get("q") or "")[:100]
+    try:
+        limit = max(1, min(int(request.GET.get("limit") or 8), 20))
+    except ValueError:
+        limit = 8
+
+    try:
+        results = typeahead.complete(supabase, prefix, limit=limit)
+    except Exception as e:
+        logging.getLogger(__name__).exception("typeahead_api error: %s", e)
+        return JsonResponse({"error": "Suggestions unavailable"}, status=500)
+
+    response = JsonResponse({"results": results})
+    response["Cache-Control"] = "private, max-age=30"
+    return response
+
+
 @require_POST
 @supabase_login_required
 def create_request(request):
@@ -2003,15 +1875,7 @@ def create_request(request):
 
     try:
         message = f"{request.session.get('user_email','Someone')} requested your item \"{item.get('title','item')}\"."
-        notif_payload = {
-            'notification_id': str(uuid.uuid4()),
-            'user_id': owner_id,
-            'message': message,
-            'notif_type': 'request',
-            'is_read': False,
-            'created_at': datetime.utcnow().isoformat(),
-        }
-        supabase.table('notification').insert(notif_payload).execute()
+        tasks.notify(owner_id, message, 'request', key=f"request_created:{req_id}")
     except Exception:
         pass
 
@@ -2149,6 +2013,7 @@ def respond_request(request):
     if new_status == 'approved':
         try:
             supabase.table('item').update({'available': False}).eq('item_id', item_id).execute()
+            sync_item_indexes(supabase, item_id, removed=True)
         except Exception:
             pass
 
@@ -2164,15 +2029,9 @@ def respond_request(request):
         else:
             msg = f'Your request for "{safe_title}" was {new_status}.'
 
-        notif_payload = {
-            'notification_id': str(uuid.uuid4()),
-            'user_id': requester_id,
-            'message': msg,
-            'notif_type': f'request_{new_status}',
-            'is_read': False,
-            'created_at': datetime.utcnow().isoformat(),
-        }
-        supabase.table('notification').insert(notif_payload).execute()
+        # a retried approve/deny queues nothing new; an admin overwrite is a new decision
+        key = f"request_{new_status}:{req_id}" + (":overwritten" if overwritten else "")
+        tasks.notify(requester_id, msg, f'request_{new_status}', key=key)
     except Exception:
         pass
 
@@ -2192,10 +2051,9 @@ def return_items(request):
     and shows a history of items already marked as returned.
     """
     user_id = request.session.get("supabase_user_id")
-    borrowed_items = []
-    returned_items = [] 
 
-    try:
+    def fetch_borrowed():
+        borrowed_items = []
         # --- 1. FETCH BORROWED (same as your working version) ---
         br_req_resp = supabase.table('request') \
               .select('request_id,item_id,user_id,request_date,return_date,status,return') \
@@ -2216,28 +2074,9 @@ def return_items(request):
                 for it in (items_resp2.data or []):
                     items_map[it.get('item_id')] = it
 
-            owner_ids = [
+            owner_map = resolve_display_names(
                 (items_map.get(r.get('item_id')) or {}).get('user_id') for r in br_reqs
-            ]
-            owner_ids = [oid for oid in owner_ids if oid]
-
-            owner_map = {}
-            if owner_ids:
-                try:
-                    owners_resp = supabase.table('user').select(
-                        'id,first_name,last_name,email'
-                    ).in_('id', list(set(owner_ids))).execute()
-                    if not getattr(owners_resp, 'error', None):
-                        for o in (owners_resp.data or []):
-                            display = (
-                                ((o.get('first_name') or '') + ' ' + (o.get('last_name') or '')).strip()
-                                or o.get('email')
-                                or o.get('id')
-                            )
-                            owner_map[o.get('id')] = display
-                except Exception:
-                    for oid in owner_ids:
-                        owner_map.setdefault(oid, str(oid))
+            )
 
             for r in br_reqs:
                 itm = items_map.get(r.get('item_id')) or {}
@@ -2271,7 +2110,10 @@ def return_items(request):
                     "return_date_human": return_date_human,
                     "status": r.get('status'),
                 })
+        return borrowed_items
 
+    def fetch_returned():
+        returned_items = []
         # --- 2. FETCH RETURNED ITEMS (fixed version without updated_at) ---
         ret_req_resp = supabase.table('request') \
             .select('request_id,item_id,user_id,request_date,return_date,status,return') \
@@ -2319,14 +2161,19 @@ def return_items(request):
                     "return_date_human": return_date_human,
                     "status": r.get('status'),
                 })
+        return returned_items
 
-    except Exception as e:
-        print("Error in return_items:", e)
-        borrowed_items = []
-        returned_items = []
+    user_ctx = get_user_context(request)
+
+    plan = QueryPlan("return_items")
+    plan.add("borrowed_items", fetch_borrowed, default=[])
+    plan.add("returned_items", fetch_returned, default=[])
+    plan.add("notifications", lambda: (user_ctx.notifications, user_ctx.unread_count), default=([], 0))
+    results = plan.run()
 
-     # after your try/except and before final render:
-    notifications, unread_count = fetch_notifications_for(user_id)
+    borrowed_items = results["borrowed_items"]
+    returned_items = results["returned_items"]
+    notifications, unread_count = results["notifications"]
 
     return render(request, "return_items.html", {
         "borrowed_items": borrowed_items,
@@ -2372,6 +2219,7 @@ def mark_notifications_read(request):
                 updated_count = len(upd.data)
         except Exception:
             updated_count = 0
+        realtime.push_read(user_id)
         return JsonResponse({"success": True, "updated": updated_count})
     except Exception as e:
         logging.getLogger(__name__).exception("Error marking notifications read: %s", e)
@@ -2405,23 +2253,19 @@ def mark_returned(request):
 
         # FIX: Make the item available again so new requests make sense
         supabase.table('item').update({'available': True}).eq('item_id', item_id).execute()
+        sync_item_indexes(supabase, item_id)
 
         # Optional: notify the owner
         try:
             item_resp = supabase.table('item').select('title,user_id').eq('item_id', item_id).maybe_single().execute()
             if getattr(item_resp, 'data', None):
                 title = item_resp.data.get('title', 'an item')
-                owner_id = item_resp.data.get('user_id')
-                if owner_id:
-                    notif_payload = {
-                        'notification_id': str(uuid.uuid4()),
-                        'user_id': owner_id,
-                        'message': f"{request.session.get('user_email','Someone')} marked \"{title}\" as returned.",
-                        'notif_type': 'return_notification',
-                        'is_read': False,
-                        'created_at': datetime.utcnow().isoformat(),
-                    }
-                    supabase.table('notification').insert(notif_payload).execute()
+                tasks.notify(
+                    item_resp.data.get('user_id'),
+                    f"{request.session.get('user_email','Someone')} marked \"{title}\" as returned.",
+                    'return_notification',
+                    key=f"returned:{req_id}",
+                )
         except Exception:
             pass
 
@@ -2443,121 +2287,94 @@ def fetch_notifications_for(user_id, limit=10):
         return [], 0
 
     try:
-        resp = supabase.table('notification') \
-            .select('*') \
-            .eq('user_id', user_id) \
-            .order('created_at', desc=True) \
-            .limit(limit) \
-            .execute()
-        notifications = resp.data or []
+        resp = notifications_query(supabase, user_id, limit).execute()
+        return decorate_notifications(resp.data or [])
+    except Exception:
+        return [], 0
 
-        for n in notifications:
-            created = n.get('created_at')
-            try:
-                if isinstance(created, str):
-                    dt = datetime.fromisoformat(created)
-                    n['created_at_human'] = dt.strftime("%b %d, %Y • %I:%M %p")
-                elif isinstance(created, datetime):
-                    n['created_at_human'] = created.strftime("%b %d, %Y • %I:%M %p")
-                else:
-                    n['created_at_human'] = created or ''
-            except Exception:
+
+def notifications_query(client, user_id, limit=10):
+    return client.table('notification') \
+        .select('*') \
+        .eq('user_id', user_id) \
+        .order('created_at', desc=True) \
+        .limit(limit)
+
+
+def decorate_notifications(notifications):
+    """(notifications with created_at_human, unread count)"""
+    for n in notifications:
+        created = n.get('created_at')
+        try:
+            if isinstance(created, str):
+                dt = datetime.fromisoformat(created)
+                n['created_at_human'] = dt.strftime("%b %d, %Y • %I:%M %p")
+            elif isinstance(created, datetime):
+                n['created_at_human'] = created.strftime("%b %d, %Y • %I:%M %p")
+            else:
                 n['created_at_human'] = created or ''
+        except Exception:
+            n['created_at_human'] = created or ''
 
-        unread_count = sum(1 for n in notifications if not n.get('is_read'))
-        return notifications, unread_count
-    except Exception:
-        return [], 0
+    unread_count = sum(1 for n in notifications if not n.get('is_read'))
+    return notifications, unread_count
 
 def user_context(request):
     """
     Add user info and notification count to all templates
     This replaces the need for passing these in every view
+
+    Values are callables so the template only triggers the Supabase calls
+    when it actually reads them, and they share the request-scoped cache
+    with whatever the view already fetched.
     """
-    context = {
-        'user_info': None,
-        'notifications': [],
-        'unread_count': 0,
+    user_ctx = get_user_context(request)
+    return {
+        'user_info': lambda: user_ctx.user_info,
+        'notifications': lambda: user_ctx.notifications,
+        'unread_count': lambda: user_ctx.unread_count,
     }
-    
-    user_id = request.session.get('supabase_user_id')
-    
-    if user_id:
-        try:
-            # Initialize Supabase client
-            supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-            
-            # Fetch user info
-            profile_resp = supabase.table("user").select("*").eq("id", user_id).single().execute()
-            user_info = profile_resp.data if profile_resp and getattr(profile_resp, "data", None) else {}
-            
-            # Get email from Supabase Auth (source of truth)
-            if user_info:
-                try:
-                    auth_user_resp = supabase.auth.admin.get_user_by_id(user_id)
-                    if auth_user_resp.user:
-                        user_info["email"] = auth_user_resp.user.email
-                        request.session['user_email'] = auth_user_resp.user.email
-                except Exception as e:
-                    if request.session.get('user_email'):
-                        user_info["email"] = request.session.get('user_email')
-            
-            context['user_info'] = user_info
-            
-            # Use your existing fetch_notifications_for function
-            from .views import fetch_notifications_for
-            notifications, unread_count = fetch_notifications_for(user_id)
-            
-            context['notifications'] = notifications
-            context['unread_count'] = unread_count
-            
-        except Exception as e:
-            print(f"Error in user_context: {e}")
-            # Return empty context on error
-            pass
-    
-    return context
 
 
 @supabase_login_required
 def my_items(request):
     user_id = request.session.get("supabase_user_id")
-    notifications, unread_count = fetch_notifications_for(user_id)
+    user_ctx = get_user_context(request)
 
-    items = []
-    try:
+    def fetch_items():
         items_resp = supabase.table("item") \
             .select("*") \
             .eq("user_id", user_id) \
             .order("created_at", desc=True) \
             .execute()
-        items = items_resp.data or []
-    except Exception as exc:
-        print("Error fetching items:", exc)
-        items = []
+        return items_resp.data or []
+
+    def fetch_requests(items):
+        item_ids = [itm.get("item_id") for itm in items if itm.get("item_id")]
+        if not item_ids:
+            return []
+        req_resp = supabase.table("request") \
+            .select("request_id,item_id,user_id,request_date,return,status") \
+            .in_("item_id", item_ids) \
+            .order("request_date", desc=True) \
+            .execute()
+        return req_resp.data or []
+
+    plan = QueryPlan("my_items")
+    plan.add("notifications", lambda: (user_ctx.notifications, user_ctx.unread_count), default=([], 0))
+    plan.add("items", fetch_items, default=[])
+    plan.add("requests", fetch_requests, after=["items"], default=[])
+    results = plan.run()
+
+    notifications, unread_count = results["notifications"]
+    items = results["items"]
 
     items_with_requests = []
     try:
-        item_ids = [itm.get("item_id") for itm in items if itm.get("item_id")]
-        reqs = []
-        if item_ids:
-            req_resp = supabase.table("request") \
-                .select("request_id,item_id,user_id,request_date,return,status") \
-                .in_("item_id", item_ids) \
-                .order("request_date", desc=True) \
-                .execute()
-            reqs = req_resp.data or []
+        reqs = results["requests"]
 
         # build user map for requester display
-        requester_ids = list({r.get("user_id") for r in reqs if r.get("user_id")})
-        users_map = {}
-        if requester_ids:
-            uresp = supabase.table("user").select("id,first_name,last_name,email").in_("id", requester_ids).execute()
-            for u in (uresp.data or []):
-                display = ((u.get("first_name") or "") + " " + (u.get("last_name") or "")).strip()
-                if not display:
-                    display = u.get("email") or u.get("id")
-                users_map[u.get("id")] = display
+        users_map = resolve_display_names(r.get("user_id") for r in reqs)
 
         # group requests by item_id (already ordered desc)
         reqs_by_item = {}
@@ -2622,6 +2439,7 @@ def my_items(request):
                 "title": it.get("title"),
                 "description": it.get("description") or "",
                 "image_url": it.get("image_url") or "",
+                "thumb_url": images.variant_url(it.get("image_url") or "", "card"),
                 "category": it.get("category") or "",
                 "condition": it.get("condition") or "",
                 "available": bool(it.get("available")),
@@ -2674,19 +2492,13 @@ def edit_item(request, item_id):
         # handle uploaded image (optional)
         file = request.FILES.get("image")
         image_url = item.get("image_url")
+        upload_err = uploads.upload_error(request, "image")
+        if upload_err:
+            messages.error(request, upload_err)
         if file and SUPABASE_SERVICE_ROLE_KEY:
             try:
-                admin_client = create_supabase_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-                ext = os.path.splitext(file.name)[1] or ".bin"
-                filename = f"{user_id}/{uuid.uuid4()}{ext}"
-                upload_res = admin_client.storage.from_("item-images").upload(filename, file.read())
-                if getattr(upload_res, "error", None):
-                    messages.error(request, "Failed to upload image.")
-                else:
-                    public = admin_client.storage.from_("item-images").get_public_url(filename)
-                    # public might be dict or object; try safe retrieval
-                    image_url = (public.get("publicUrl") if isinstance(public, dict) and public.get("publicUrl")
-                                 else getattr(public, "public_url", None) or getattr(public, "publicUrl", None) or public)
+                admin_client = get_service_client()
+                image_url = images.upload_item_image(admin_client, user_id, file)
             except Exception as e:
                 messages.error(request, "Image upload failed.")
         # update the item record
@@ -2703,6 +2515,7 @@ def edit_item(request, item_id):
             if getattr(update_resp, "error", None):
                 messages.error(request, "Failed to update item.")
             else:
+                sync_item_indexes(supabase, item_id)
                 messages.success(request, "Item updated.")
                 return redirect("my_items")
         except Exception as e:
@@ -2713,6 +2526,25 @@ def edit_item(request, item_id):
     return render(request, "edit_item.html", {"item": item})
 
 
+def _pending_request_count(item_id):
+    try:
+        resp = supabase.table('request').select('request_id', count='exact', head=True) \
+            .eq('item_id', item_id).eq('status', 'pending').execute()
+        return getattr(resp, 'count', None) or 0
+    except Exception:
+        return 0
+
+
+def _delete_item_row(admin, item_id):
+    """Delete the item row; requests still referencing it are normally left to the cleanup job."""
+    try:
+        return admin.table('item').delete().eq('item_id', item_id).execute()
+    except Exception:
+        # a foreign key from request blocks the delete: clear them first
+        tasks.delete_item_requests(admin, item_id)
+        return admin.table('item').delete().eq('item_id', item_id).execute()
+
+
 @require_POST
 @supabase_login_required
 def delete_item(request, item_id):
@@ -2722,7 +2554,7 @@ def delete_item(request, item_id):
 
     # fetch item
     try:
-        r = supabase.table('item').select('item_id,user_id,available').eq('item_id', item_id).maybe_single().execute()
+        r = supabase.table('item').select('item_id,user_id,available,image_url').eq('item_id', item_id).maybe_single().execute()
         if getattr(r, 'error', None) or not r.data:
             return JsonResponse({"error": "Item not found"}, status=404)
         item = r.data
@@ -2736,29 +2568,20 @@ def delete_item(request, item_id):
     if not SUPABASE_SERVICE_ROLE_KEY:
         return JsonResponse({"error": "Server misconfigured"}, status=500)
 
-    admin = create_supabase_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    admin = get_service_client()
     try:
-        # Optionally delete requests for this item (cleanup)
-        try:
-            admin.table('request').delete().eq('item_id', item_id).execute()
-        except Exception:
-            pass
+        # Tell client whether counts should change; pending requests are
+        # counted before the cleanup job removes them
+        dec_available = bool(item.get('available'))
+        pending_num = _pending_request_count(item_id)
 
-        # Delete item row
-        del_resp = admin.table('item').delete().eq('item_id', item_id).execute()
+        del_resp = _delete_item_row(admin, item_id)
         if getattr(del_resp, 'error', None):
             return JsonResponse({"error": "Failed to delete item"}, status=500)
+        sync_item_indexes(admin, item_id, removed=True)
 
-        # If you want to delete the stored image object from storage, you can do it here
-        # image_url = item.get('image_url') or ''
-        # parse and remove file path from your storage bucket (skip if not needed)
-
-        # Tell client whether counts should change
-        dec_available = bool(item.get('available'))
-        # pending: compute quickly whether there were pending requests previously (optional)
-        # We'll return decrement flags; JS will update counters
-        pending_count_resp = supabase.table('request').select('request_id').eq('item_id', item_id).eq('status','pending').execute()
-        pending_num = len(pending_count_resp.data or []) if getattr(pending_count_resp, 'data', None) else 0
+        # requests and the stored photos are removed in the background
+        tasks.cleanup_deleted_item(item_id, item.get('image_url'))
 
         return JsonResponse({
             "success": True,
@@ -2779,29 +2602,23 @@ def admin_delete_item(request, item_id):
 
     # fetch item to know owner/available, and to verify exists
     try:
-        r = supabase.table('item').select('item_id,available').eq('item_id', item_id).maybe_single().execute()
+        r = supabase.table('item').select('item_id,available,image_url').eq('item_id', item_id).maybe_single().execute()
         if getattr(r, 'error', None) or not r.data:
             return JsonResponse({"error": "Item not found"}, status=404)
         item = r.data
     except Exception as e:
         return JsonResponse({"error": "Failed to fetch item"}, status=500)
 
-    admin = create_supabase_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    admin = get_service_client()
     try:
-        # delete requests referencing item
-        try:
-            admin.table('request').delete().eq('item_id', item_id).execute()
-        except Exception:
-            pass
+        dec_available = bool(item.get('available'))
+        pending_num = _pending_request_count(item_id)
 
-        # delete item row
-        del_resp = admin.table('item').delete().eq('item_id', item_id).execute()
+        del_resp = _delete_item_row(admin, item_id)
         if getattr(del_resp, 'error', None):
             return JsonResponse({"error": "Failed to delete item"}, status=500)
-
-        dec_available = bool(item.get('available'))
-        pending_count_resp = supabase.table('request').select('request_id').eq('item_id', item_id).eq('status','pending').execute()
-        pending_num = len(pending_count_resp.data or []) if getattr(pending_count_resp, 'data', None) else 0
+        sync_item_indexes(admin, item_id, removed=True)
+        tasks.cleanup_deleted_item(item_id, item.get('image_url'))
 
         return JsonResponse({
             "success": True,
@@ -2829,24 +2646,7 @@ def admin_all_items(request):
         items = []
 
     # 2. Fetch owners (users table)
-    owner_ids = sorted({it["user_id"] for it in items if it.get("user_id")})
-    owner_map = {}
-
-    if owner_ids:
-        try:
-            owners_resp = supabase.table("user").select(
-                "id,first_name,last_name,email"
-            ).in_("id", owner_ids).execute()
-
-            for u in owners_resp.data or []:
-                full = f"{u.get('first_name','').strip()} {u.get('last_name','').strip()}".strip()
-                if not full:
-                    full = u.get("email") or u.get("id")
-                owner_map[u["id"]] = full
-
-        except Exception:
-            for oid in owner_ids:
-                owner_map[oid] = oid[:8] + "..."
+    owner_map = resolve_display_names(it.get("user_id") for it in items)
 
     # 3. ENRICH items
     enriched = []
@@ -2855,7 +2655,7 @@ def admin_all_items(request):
         owner_display = owner_map.get(it["user_id"], it["user_id"][:8] + "...")
 
         # image fallback: ONLY image_url exists in your DB
-        thumbnail = it.get("image_url") or ""
+        thumbnail = images.variant_url(it.get("image_url") or "", "card")
 
         # available → status text
         status_label = "available" if it.get("available") else "borrowed"